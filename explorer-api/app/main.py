@@ -19,25 +19,43 @@
 #  main.py
 
 import falcon
+from falcon.media import Handlers
 
 from dogpile.cache import make_region
 
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
-from app.settings import DB_CONNECTION, DEBUG, DOGPILE_CACHE_SETTINGS
+from app.settings import DB_CONNECTION, DEBUG, DOGPILE_CACHE_SETTINGS, CHAIN_STATE_REDIS_URL, \
+    CHAIN_STATE_REFRESH_INTERVAL, DB_REPLICA_CONNECTIONS, DB_REPLICA_MAX_LAG, DB_REPLICA_CHECK_INTERVAL
 
 from app.middleware.context import ContextMiddleware
-from app.middleware.sessionmanager import SQLAlchemySessionManager
-from app.middleware.cache import CacheMiddleware
+from app.middleware.sessionmanager import SQLAlchemySessionManager, ReplicaPool
+from app.middleware.cache import CacheMiddleware, LocalCache
 
-from app.resources import polkascan
+from app.resources import polkascan, export
+from app.utils.chain_state import ChainState
+from app.utils.media import JSONHandler
 
 
 # Database connection
 engine = create_engine(DB_CONNECTION, echo=DEBUG, isolation_level="READ_UNCOMMITTED", pool_pre_ping=True)
 session_factory = sessionmaker(bind=engine, autoflush=False, autocommit=False)
 
+# Read replicas
+if DB_REPLICA_CONNECTIONS:
+    replica_pool = ReplicaPool(
+        primary_engine=engine,
+        replica_engines=[
+            create_engine(connection.strip(), echo=DEBUG, isolation_level="READ_UNCOMMITTED", pool_pre_ping=True)
+            for connection in DB_REPLICA_CONNECTIONS
+        ],
+        max_lag=DB_REPLICA_MAX_LAG,
+        check_interval=DB_REPLICA_CHECK_INTERVAL
+    )
+else:
+    replica_pool = None
+
 # Define cache region
 cache_region = make_region().configure(
             'dogpile.cache.redis',
@@ -50,13 +68,27 @@ cache_region = make_region().configure(
             }
 )
 
+# In-process cache in front of the cache region
+local_cache = LocalCache(
+    max_bytes=DOGPILE_CACHE_SETTINGS['local_cache_max_bytes'],
+    expiration_time=DOGPILE_CACHE_SETTINGS['local_cache_expiration_time']
+)
+
+# Chain state published by the harvester, used to version cache keys
+chain_state = ChainState(CHAIN_STATE_REDIS_URL, CHAIN_STATE_REFRESH_INTERVAL) if CHAIN_STATE_REDIS_URL else None
+
 # Define application
 app = falcon.API(middleware=[
     ContextMiddleware(),
-    SQLAlchemySessionManager(session_factory),
-    CacheMiddleware(cache_region)
+    SQLAlchemySessionManager(session_factory, replica_pool),
+    CacheMiddleware(cache_region, local_cache, chain_state)
 ])
 
+# Faster JSON encoding of responses
+json_handlers = Handlers({'application/json': JSONHandler()})
+app.req_options.media_handlers = json_handlers
+app.resp_options.media_handlers = json_handlers
+
 # Application routes
 app.add_route('/block', polkascan.BlockListResource())
 app.add_route('/block/{block_id}', polkascan.BlockDetailsResource())
@@ -96,3 +128,5 @@ app.add_route('/contract/contract', polkascan.ContractListResource())
 app.add_route('/contract/contract/{item_id}', polkascan.ContractDetailResource())
 app.add_route('/contract/instance', polkascan.ContractInstanceListResource())
 app.add_route('/contract/instance/{item_id}', polkascan.ContractInstanceDetailResource())
+app.add_route('/export/extrinsic', export.ExtrinsicExportResource())
+app.add_route('/export/balances/transfer', export.BalanceTransferExportResource())
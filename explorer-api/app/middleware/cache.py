@@ -17,18 +17,81 @@
 #  along with Polkascan. If not, see <http://www.gnu.org/licenses/>.
 #
 #  cache.py
+import threading
+import time
+from collections import OrderedDict
+
+
+class LocalCache:
+    """
+    Bounded in-process LRU cache of encoded responses. The total size of the stored bytes is limited to `max_bytes`,
+    entries expire after at most `expiration_time` seconds.
+    """
+
+    def __init__(self, max_bytes, expiration_time):
+        self.max_bytes = max_bytes
+        self.expiration_time = expiration_time
+        self.size = 0
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+
+            if entry is None:
+                return None
+
+            expires_at, size, value = entry
+
+            if expires_at < time.monotonic():
+                self.remove(key)
+                return None
+
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, size, expiration_time=None):
+        expiration_time = min(expiration_time or self.expiration_time, self.expiration_time)
+
+        if expiration_time <= 0 or size > self.max_bytes:
+            return
+
+        with self.lock:
+            if key in self.entries:
+                self.remove(key)
+
+            self.entries[key] = (time.monotonic() + expiration_time, size, value)
+            self.size += size
+
+            # Evict least recently used entries
+            while self.size > self.max_bytes:
+                self.remove(next(iter(self.entries)))
+
+    def remove(self, key):
+        expires_at, size, value = self.entries.pop(key)
+        self.size -= size
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
 
 
 class CacheMiddleware:
 
-    def __init__(self, cache_region):
+    def __init__(self, cache_region, local_cache=None, chain_state=None):
         self.cache_region = cache_region
+        self.local_cache = local_cache
+        self.chain_state = chain_state
 
     def process_request(self, req, resp):
         pass
 
     def process_resource(self, req, resp, resource, params):
         resource.cache_region = self.cache_region
+        resource.local_cache = self.local_cache
+        resource.chain_state = self.chain_state
 
     def process_response(self, req, resp, resource, req_succeeded):
         pass
@@ -17,17 +17,106 @@
 #  along with Polkascan. If not, see <http://www.gnu.org/licenses/>.
 #
 #  sessionmanager.py
+import itertools
+import threading
+import time
 
-from sqlalchemy.orm import scoped_session
+from sqlalchemy import func
+from sqlalchemy.orm import scoped_session, sessionmaker
+
+from app.models.data import BlockTotal
+
+
+class ReplicaPool:
+    """
+    Read replicas with periodic health and lag checks. Replication lag is measured as the difference between the
+    sequencer head (`max(BlockTotal.id)`) of the primary and of the replica.
+
+    Parameters
+    ----------
+    primary_engine: Engine of the primary database, used when no replica is available
+    replica_engines: list of Engines of the read replicas
+    max_lag: maximum number of blocks a replica may lag behind the primary
+    check_interval: seconds between checks
+    """
+
+    def __init__(self, primary_engine, replica_engines, max_lag=10, check_interval=5.0):
+        self.primary_engine = primary_engine
+        self.replica_engines = replica_engines
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+
+        self.replica_lag = {engine: None for engine in replica_engines}
+        self.available_engines = []
+        self.round_robin = itertools.cycle([])
+        self.checked_at = None
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def get_sequencer_head(engine):
+        with engine.connect() as connection:
+            return connection.execute(func.max(BlockTotal.id).select()).scalar() or 0
+
+    def check_replicas(self):
+        try:
+            primary_head = self.get_sequencer_head(self.primary_engine)
+        except Exception as e:
+            # Without a reference the lag is unknown, keep the current selection
+            print('! Replica check: primary unavailable: {}'.format(e))
+            return
+
+        for engine in self.replica_engines:
+            try:
+                self.replica_lag[engine] = max(primary_head - self.get_sequencer_head(engine), 0)
+            except Exception as e:
+                print('! Replica check: {} unavailable: {}'.format(engine.url, e))
+                # Unhealthy
+                self.replica_lag[engine] = None
+
+        self.available_engines = [
+            engine for engine in self.replica_engines
+            if self.replica_lag[engine] is not None and self.replica_lag[engine] <= self.max_lag
+        ]
+        self.round_robin = itertools.cycle(self.available_engines)
+
+    def get_engine(self):
+        """
+        Returns a healthy replica within the lag threshold, round robin, or the primary engine if there is none
+        """
+        now = time.monotonic()
+
+        if self.checked_at is None or now - self.checked_at >= self.check_interval:
+            with self.lock:
+                if self.checked_at is None or now - self.checked_at >= self.check_interval:
+                    self.check_replicas()
+                    self.checked_at = now
+
+        if not self.available_engines:
+            return self.primary_engine
+
+        return next(self.round_robin)
 
 
 class SQLAlchemySessionManager:
 
-    def __init__(self, session_factory):
+    def __init__(self, session_factory, replica_pool=None):
         self.session_factory = session_factory
+        self.replica_pool = replica_pool
+        self.replica_session_factories = {}
+
+        if replica_pool:
+            for engine in replica_pool.replica_engines:
+                self.replica_session_factories[engine] = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+
+    def get_session_factory(self, req):
+        # Only reads are routed to replicas
+        if self.replica_pool and req.method in ['GET', 'HEAD']:
+            return self.replica_session_factories.get(self.replica_pool.get_engine(), self.session_factory)
+
+        return self.session_factory
 
     def process_resource(self, req, resp, resource, params):
-        resource.session = scoped_session(self.session_factory)
+        resource.session = scoped_session(self.get_session_factory(req))
 
     def process_response(self, req, resp, resource, req_succeeded):
         if hasattr(resource, 'session'):
@@ -17,10 +17,8 @@
 #  along with Polkascan. If not, see <http://www.gnu.org/licenses/>.
 #
 #  base.py
-import decimal
-from datetime import datetime
-
 import pytz
+import sqlalchemy as sa
 from dictalchemy import DictableModel
 from sqlalchemy.ext.declarative import declarative_base
 from substrateinterface.utils.ss58 import ss58_encode
@@ -28,6 +26,14 @@ from substrateinterface.utils.ss58 import ss58_encode
 from app.settings import SUBSTRATE_ADDRESS_TYPE
 
 
+def serialize_datetime(value):
+    return value.replace(tzinfo=pytz.UTC).isoformat()
+
+
+# Compiled serializers per model class and exclude list, see `BaseModelObj.get_serialize_columns`
+serialize_columns_cache = {}
+
+
 class BaseModelObj(DictableModel):
 
     serialize_exclude = None
@@ -47,29 +53,58 @@ class BaseModelObj(DictableModel):
         """ Hook to be able to process data before being serialized """
         return obj_dict
 
+    @classmethod
+    def get_serialize_columns(cls, exclude=None):
+        """ Compiles the list of serialized attributes of this model once per exclude list
+        :param exclude: list of property names to exclude in serialization
+        :returns: list of (attribute name, converter) tuples, converter is None when the value is JSON compatible
+        """
+        cache_key = (cls, tuple(exclude or ()))
+        columns = serialize_columns_cache.get(cache_key)
+
+        if columns is None:
+            columns = []
+
+            # Same attributes as `asdict`: mapped columns, except excluded and underscored names
+            for column_attr in sa.inspect(cls).column_attrs:
+                if column_attr.key.startswith('_') or column_attr.key in (exclude or ()):
+                    continue
+
+                column_type = column_attr.columns[0].type
+
+                if isinstance(column_type, sa.DateTime):
+                    converter = serialize_datetime
+                elif isinstance(column_type, sa.Numeric) and column_type.asdecimal:
+                    converter = float
+                else:
+                    converter = None
+
+                columns.append((column_attr.key, converter))
+
+            serialize_columns_cache[cache_key] = columns
+
+        return columns
+
     def serialize(self, exclude=None):
         """ Serializes current model to a dict representation
         :param exclude: list of property names to exclude in serialization
         :returns: dict respresentation of current model
         """
 
+        attributes = {}
+        for key, converter in self.get_serialize_columns(exclude or self.serialize_exclude):
+            value = getattr(self, key)
+            if converter is not None and value is not None:
+                value = converter(value)
+            attributes[key] = value
+
         obj_dict = {
             'type': self.serialize_type,
             'id': self.serialize_id(),
-            'attributes': self.asdict(exclude=exclude or self.serialize_exclude)
+            'attributes': attributes
         }
 
-        obj_dict = self.serialize_formatting_hook(obj_dict)
-
-        # Reformat certain data type
-        for key, value in obj_dict['attributes'].items():
-            if type(value) is datetime:
-                obj_dict['attributes'][key] = value.replace(tzinfo=pytz.UTC).isoformat()
-
-            if isinstance(value, decimal.Decimal):
-                obj_dict['attributes'][key] = float(value)
-
-        return obj_dict
+        return self.serialize_formatting_hook(obj_dict)
 
     @classmethod
     def query(cls, session):
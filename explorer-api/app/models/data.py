@@ -25,7 +25,7 @@ from sqlalchemy.dialects.mysql import LONGTEXT
 
 from app import settings
 from app.models.base import BaseModel
-from app.utils.ss58 import ss58_encode, ss58_encode, get_account_id_and_ss58_address
+from app.utils.ss58 import ss58_encode, ss58_encode_batch, get_account_id_and_ss58_address
 from app.settings import LOG_TYPE_AUTHORITIESCHANGE, SUBSTRATE_ADDRESS_TYPE
 
 class Account(BaseModel):
@@ -415,8 +415,9 @@ class Log(BaseModel):
 
         if self.type_id == LOG_TYPE_AUTHORITIESCHANGE:
 
-            for idx, item in enumerate(obj_dict['attributes']['data']['value']):
-                obj_dict['attributes']['data']['value'][idx] = ss58_encode(item.replace('0x', ''), SUBSTRATE_ADDRESS_TYPE)
+            obj_dict['attributes']['data']['value'] = ss58_encode_batch(
+                obj_dict['attributes']['data']['value'], SUBSTRATE_ADDRESS_TYPE
+            )
 
         return obj_dict
 
@@ -813,6 +814,12 @@ class IdentityJudgement(BaseModel):
 
 class SearchIndex(BaseModel):
     __tablename__ = 'data_account_search_index'
+    __table_args__ = (
+        sa.Index(
+            'ix_data_account_search_index_account_type_block',
+            'account_id', 'index_type_id', sa.text('block_id DESC'), 'extrinsic_idx', 'event_idx'
+        ),
+    )
 
     id = sa.Column(sa.Integer(), primary_key=True, autoincrement=True)
     block_id = sa.Column(sa.Integer(), nullable=False, index=True)
@@ -17,21 +17,30 @@
 #  along with Polkascan. If not, see <http://www.gnu.org/licenses/>.
 #
 #  base.py
+from hashlib import blake2b
 from abc import ABC, abstractmethod
+from urllib.parse import urlencode
 
 import falcon
 from dogpile.cache import CacheRegion
 from dogpile.cache.api import NO_VALUE
+from sqlalchemy import and_, or_
 from sqlalchemy.orm import Session
 
+from app.middleware.cache import LocalCache
 from app.models.base import BaseModel
+from app.models.data import Account
 from app.settings import MAX_RESOURCE_PAGE_SIZE, DOGPILE_CACHE_SETTINGS
+from app.utils.chain_state import ChainState
+from app.utils.media import dumps
 
 
 class BaseResource(object):
 
     session: Session
     cache_region: CacheRegion
+    local_cache: LocalCache
+    chain_state: ChainState
 
 
 class JSONAPIResource(BaseResource):
@@ -93,59 +102,255 @@ class JSONAPIResource(BaseResource):
 
         return result
 
-    def on_get(self, req, resp, **kwargs):
+    def encode_response(self, response):
+        """ Replaces the media of given response by its JSON encoding, the representation stored in the caches """
+        media = response.get('media')
+        data = None if media is None else dumps(media)
+
+        return {
+            'status': response.get('status'),
+            'data': data,
+            'etag': None if data is None else '"{}"'.format(blake2b(data, digest_size=16).hexdigest()),
+            'cacheable': response.get('cacheable')
+        }
+
+    @staticmethod
+    def etag_matches(req, etag):
+        if not etag or not req.if_none_match:
+            return False
+
+        # Weak comparison, as prescribed for If-None-Match
+        candidates = [candidate.strip() for candidate in req.if_none_match.split(',')]
+        return '*' in candidates or etag in [
+            candidate[2:] if candidate.startswith('W/') else candidate for candidate in candidates
+        ]
+
+    def send_encoded_response(self, req, resp, cache_response):
+        resp.status = cache_response.get('status')
 
+        if cache_response.get('data') is None:
+            return
+
+        etag = cache_response.get('etag')
+
+        if etag and resp.status == falcon.HTTP_200:
+            resp.etag = etag
+
+            if self.etag_matches(req, etag):
+                resp.status = falcon.HTTP_304
+                return
+
+        resp.data = cache_response.get('data')
+
+    def get_cache_keys(self, req):
+        """
+        Cache keys of the request with their expiration time, in lookup order. With the chain state published by the
+        harvester, keys are versioned on it, so cached responses are replaced exactly when new data is harvested.
+        Responses about finalized blocks only change on a reorg and have no expiration time (None) of their own; they
+        are kept until evicted by the Redis TTL of the cache region (redis_expiration_time) or the local cache.
+        """
         cache_key = '{}-{}'.format(req.method, req.url)
+        chain_state = self.chain_state.get() if self.chain_state else None
 
-        if self.cache_expiration_time:
-            # Try to retrieve request from cache
-            cache_response = self.cache_region.get(cache_key, self.cache_expiration_time)
+        if not chain_state:
+            return {'latest': (cache_key, self.cache_expiration_time)}
+
+        cache_keys = {}
+
+        if getattr(self, 'get_item_block_id', None):
+            cache_keys['finalized'] = ('{}-reorg:{}'.format(cache_key, chain_state['reorg_count'] or 0), None)
 
-            if cache_response is not NO_VALUE:
-                resp.set_header('X-Cache', 'HIT')
+        cache_keys['latest'] = (
+            '{}-version:{}'.format(cache_key, chain_state['version']),
+            DOGPILE_CACHE_SETTINGS['versioned_cache_expiration_time']
+        )
 
+        return cache_keys
+
+    def get_cached_response(self, cache_key, expiration_time, resp):
+        # Try to retrieve request from the in-process cache (L1), then from the shared Redis cache (L2)
+        cache_response = self.local_cache.get(cache_key) if self.local_cache else None
+
+        if cache_response is not None:
+            resp.set_header('X-Cache-L1', 'HIT')
+            return cache_response
+
+        resp.set_header('X-Cache-L1', 'MISS')
+        # -1 ignores a default expiration time of the region
+        cache_response = self.cache_region.get(cache_key, expiration_time if expiration_time is not None else -1)
+
+        # Entries without encoded data are stored by previous versions
+        if cache_response is not NO_VALUE and 'etag' in cache_response:
+            resp.set_header('X-Cache-L2', 'HIT')
+            self.set_local_cached_response(cache_key, cache_response, expiration_time)
+            return cache_response
+
+        resp.set_header('X-Cache-L2', 'MISS')
+
+    def set_local_cached_response(self, cache_key, cache_response, expiration_time):
+        if self.local_cache:
+            self.local_cache.set(cache_key, cache_response, len(cache_response.get('data') or b''), expiration_time)
+
+    def on_get(self, req, resp, **kwargs):
+
+        if self.cache_expiration_time:
+            cache_keys = self.get_cache_keys(req)
+
+            for cache_key, expiration_time in cache_keys.values():
+                cache_response = self.get_cached_response(cache_key, expiration_time, resp)
+                if cache_response is not None:
+                    resp.set_header('X-Cache', 'HIT')
+                    break
             else:
                 # Process request
-                cache_response = self.process_get_response(req, resp, **kwargs)
+                response = self.process_get_response(req, resp, **kwargs)
+                cache_response = self.encode_response(response)
 
                 if cache_response.get('cacheable'):
+                    if 'finalized' in cache_keys and self.chain_state.is_finalized(response.get('block_id')):
+                        cache_key, expiration_time = cache_keys['finalized']
+                    else:
+                        cache_key, expiration_time = cache_keys['latest']
+
                     # Store result in cache
                     self.cache_region.set(cache_key, cache_response)
+                    self.set_local_cached_response(cache_key, cache_response, expiration_time)
                     resp.set_header('X-Cache', 'MISS')
-        else:
-            cache_response = self.process_get_response(req, resp, **kwargs)
 
-        resp.status = cache_response.get('status')
-        resp.media = cache_response.get('media')
+            self.send_encoded_response(req, resp, cache_response)
+        else:
+            self.send_encoded_response(req, resp, self.encode_response(self.process_get_response(req, resp, **kwargs)))
 
 
 class JSONAPIListResource(JSONAPIResource, ABC):
 
     cache_expiration_time = DOGPILE_CACHE_SETTINGS['default_list_cache_expiration_time']
 
+    # Columns of the natural (descending) ordering key, enables cursor paging with page[after] and page[before]
+    cursor_columns = None
+
+    # Rows referenced by the current page, resolved once per request by `prefetch_page`
+    identity_map: dict
+
     def get_included_items(self, items):
         return []
 
+    def get_referenced_account_ids(self, items):
+        """ Account ids referenced by the items of a page, resolved in a single query before serialization """
+        return []
+
+    def prefetch_page(self, items):
+        account_ids = {account_id for account_id in self.get_referenced_account_ids(items) if account_id}
+
+        accounts = {}
+        if account_ids:
+            accounts = {
+                account.id: account for account in Account.query(self.session).filter(Account.id.in_(account_ids))
+            }
+
+        self.identity_map = {Account: accounts}
+
+    def get_prefetched(self, model, item_id):
+        return self.identity_map.get(model, {}).get(item_id)
+
     @abstractmethod
     def get_query(self):
         raise NotImplementedError()
 
+    def get_page_size(self, params):
+        return min(int(params.get('page[size]', 25)), MAX_RESOURCE_PAGE_SIZE)
+
     def apply_paging(self, query, params):
+        page_size = self.get_page_size(params)
+
+        if self.cursor_columns:
+            query = query.order_by(None)
+
+            if params.get('page[after]'):
+                cursor = self.parse_cursor(params.get('page[after]'))
+                return query.filter(self.get_cursor_filter(cursor, before=False)).order_by(
+                    *[column.desc() for column in self.cursor_columns]
+                )[:page_size]
+
+            if params.get('page[before]'):
+                cursor = self.parse_cursor(params.get('page[before]'))
+                items = query.filter(self.get_cursor_filter(cursor, before=True)).order_by(
+                    *[column.asc() for column in self.cursor_columns]
+                )[:page_size]
+                return list(reversed(items))
+
+            query = query.order_by(*[column.desc() for column in self.cursor_columns])
+
         page = int(params.get('page[number]', 1)) - 1
-        page_size = min(int(params.get('page[size]', 25)), MAX_RESOURCE_PAGE_SIZE)
         return query[page * page_size: page * page_size + page_size]
 
+    def parse_cursor(self, value):
+        try:
+            cursor = [int(part) for part in value.split('-')]
+        except ValueError:
+            cursor = []
+
+        if len(cursor) != len(self.cursor_columns):
+            raise falcon.HTTPBadRequest(title='Invalid page cursor', description='Invalid cursor "{}"'.format(value))
+
+        return cursor
+
+    def get_cursor_filter(self, cursor, before=False):
+        # Expanded row comparison, so MySQL can use a range scan on the leading column
+        conditions = []
+        for idx, column in enumerate(self.cursor_columns):
+            comparison = column > cursor[idx] if before else column < cursor[idx]
+            conditions.append(and_(*[self.cursor_columns[i] == cursor[i] for i in range(idx)], comparison))
+
+        if before:
+            leading_bound = self.cursor_columns[0] >= cursor[0]
+        else:
+            leading_bound = self.cursor_columns[0] <= cursor[0]
+
+        return and_(leading_bound, or_(*conditions))
+
+    def get_item_cursor(self, item):
+        if isinstance(item, tuple):
+            # Query with multiple entities, first one determines the ordering
+            item = item[0]
+        return '-'.join([str(getattr(item, column.key)) for column in self.cursor_columns])
+
+    def get_paging_links(self, req, items):
+        if not self.cursor_columns or not items:
+            return {}
+
+        page_size = self.get_page_size(req.params)
+
+        params = {key: value for key, value in req.params.items()
+                  if key not in ['page[number]', 'page[after]', 'page[before]']}
+
+        def page_url(cursor_param, cursor):
+            return '{}{}?{}'.format(req.prefix, req.path, urlencode(dict(params, **{cursor_param: cursor}), doseq=True))
+
+        links = {}
+
+        if len(items) == page_size or req.params.get('page[before]'):
+            links['next'] = page_url('page[after]', self.get_item_cursor(items[-1]))
+
+        if req.params.get('page[after]') or (req.params.get('page[before]') and len(items) == page_size) or \
+                int(req.params.get('page[number]', 1)) > 1:
+            links['prev'] = page_url('page[before]', self.get_item_cursor(items[0]))
+
+        return links
+
     def process_get_response(self, req, resp, **kwargs):
         items = self.get_query()
         items = self.apply_filters(items, req.params)
         items = self.apply_paging(items, req.params)
+        self.prefetch_page(items)
 
         return {
             'status': falcon.HTTP_200,
             'media': self.get_jsonapi_response(
                 data=[self.serialize_item(item) for item in items],
                 meta=self.get_meta(),
-                included=self.get_included_items(items)
+                included=self.get_included_items(items),
+                links=self.get_paging_links(req, items)
             ),
             'cacheable': True
         }
@@ -155,6 +360,9 @@ class JSONAPIDetailResource(JSONAPIResource, ABC):
 
     cache_expiration_time = DOGPILE_CACHE_SETTINGS['default_detail_cache_expiration_time']
 
+    # Method returning the block number an item belongs to, for items that never change once their block is finalized
+    get_item_block_id = None
+
     def get_item_url_name(self):
         return 'item_id'
 
@@ -184,7 +392,8 @@ class JSONAPIDetailResource(JSONAPIResource, ABC):
                     relationships=self.get_relationships(req.params.get('include', []), item),
                     meta=self.get_meta()
                 ),
-                'cacheable': True
+                'cacheable': True,
+                'block_id': self.get_item_block_id(item) if self.get_item_block_id else None
             }
 
         return response
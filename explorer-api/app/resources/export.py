@@ -0,0 +1,271 @@
+#  Polkascan PRE Explorer API
+#
+#  Copyright 2018-2020 openAware BV (NL).
+#  This file is part of Polkascan.
+#
+#  Polkascan is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  Polkascan is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with Polkascan. If not, see <http://www.gnu.org/licenses/>.
+#
+#  export.py
+import csv
+import io
+from abc import abstractmethod
+
+import falcon
+from sqlalchemy import tuple_, and_, or_
+from sqlalchemy.orm import Session, noload
+
+from app import settings
+from app.models.base import serialize_datetime
+from app.models.data import Extrinsic, Event, Block, SearchIndex, AccountPrivate
+from app.resources.base import BaseResource
+from app.utils.media import dumps
+from app.utils.ss58 import ss58_decode, get_account_id_and_ss58_address
+
+
+class ExportResource(BaseResource):
+    """
+    Streams all rows of an account history as NDJSON or CSV. Rows are retrieved in chunks of `chunk_size` rows by
+    keyset pagination on (`block_column`, `idx_column`), so memory use is constant.
+
+    Parameters: filter[address] (required), filter[block_from], filter[block_to] and format ('ndjson' or 'csv')
+    """
+
+    name = None
+    # Table columns, as model attributes are descriptors that can't be read from a resource instance
+    block_column = None
+    idx_column = None
+    csv_fields = ()
+    chunk_size = 1000
+
+    @abstractmethod
+    def get_query(self, session, account_id):
+        raise NotImplementedError()
+
+    @abstractmethod
+    def serialize_row(self, row):
+        raise NotImplementedError()
+
+    def parse_block_param(self, params, key):
+        if not params.get(key):
+            return None
+
+        try:
+            return int(params.get(key))
+        except ValueError:
+            raise falcon.HTTPBadRequest(title='Invalid block number', description='Invalid value for {}'.format(key))
+
+    def parse_address(self, params):
+        address = params.get('filter[address]')
+
+        if not address:
+            raise falcon.HTTPBadRequest(title='Missing address', description='filter[address] is required')
+
+        if len(address) == 64:
+            return address
+
+        try:
+            return ss58_decode(address, settings.SUBSTRATE_ADDRESS_TYPE)
+        except ValueError:
+            raise falcon.HTTPBadRequest(title='Invalid address', description='Invalid address "{}"'.format(address))
+
+    def on_get(self, req, resp, **kwargs):
+        export_format = req.params.get('format', 'ndjson')
+
+        if export_format not in ['ndjson', 'csv']:
+            raise falcon.HTTPBadRequest(title='Invalid format', description='Supported formats: ndjson, csv')
+
+        account_id = self.parse_address(req.params)
+        block_from = self.parse_block_param(req.params, 'filter[block_from]')
+        block_to = self.parse_block_param(req.params, 'filter[block_to]')
+
+        resp.status = falcon.HTTP_200
+        resp.content_type = 'text/csv; charset=utf-8' if export_format == 'csv' else 'application/x-ndjson'
+        resp.set_header('Content-Disposition', 'attachment; filename="{}-{}.{}"'.format(
+            self.name, req.params.get('filter[address]'), export_format
+        ))
+
+        # The body is streamed after the request session is removed by the session middleware, rows are read with
+        # a separate session owned by the generator
+        resp.stream = self.stream_rows(self.session.get_bind(), account_id, block_from, block_to, export_format)
+
+    def stream_rows(self, engine, account_id, block_from, block_to, export_format):
+        session = Session(bind=engine, autoflush=False)
+
+        try:
+            query = self.get_query(session, account_id)
+
+            if block_from is not None:
+                query = query.filter(self.block_column >= block_from)
+
+            if block_to is not None:
+                query = query.filter(self.block_column <= block_to)
+
+            buffer = io.StringIO()
+            writer = None
+
+            if export_format == 'csv':
+                writer = csv.DictWriter(buffer, fieldnames=self.csv_fields, extrasaction='ignore')
+                writer.writeheader()
+
+            chunk = []
+            last_key = None
+
+            while True:
+                # The MySQL driver buffers complete result sets, so every chunk is a separate query continuing after
+                # the last row of the previous chunk
+                chunk_query = query
+
+                if last_key is not None:
+                    chunk_query = chunk_query.filter(or_(
+                        self.block_column > last_key[0],
+                        and_(self.block_column == last_key[0], self.idx_column > last_key[1])
+                    ))
+
+                rows = chunk_query.limit(self.chunk_size).all()
+
+                for row in rows:
+                    data = self.serialize_row(row)
+
+                    if writer:
+                        writer.writerow({
+                            key: dumps(value).decode('utf-8') if type(value) in (dict, list) else value
+                            for key, value in data.items()
+                        })
+                    else:
+                        chunk.append(dumps(data))
+
+                if rows:
+                    last_key = self.get_row_key(rows[-1])
+                    session.expunge_all()
+                    yield self.flush_chunk(buffer, chunk)
+
+                if len(rows) < self.chunk_size:
+                    break
+
+            # CSV header of an empty export
+            yield self.flush_chunk(buffer, chunk)
+        finally:
+            session.close()
+
+    def get_row_key(self, row):
+        """
+        Returns the values of `block_column` and `idx_column` of given row, the offset of the next chunk
+        """
+        return getattr(row[0], self.block_column.key), getattr(row[0], self.idx_column.key)
+
+    @staticmethod
+    def flush_chunk(buffer, chunk):
+        if chunk:
+            data = b'\n'.join(chunk) + b'\n'
+            chunk.clear()
+        else:
+            data = buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+
+        return data
+
+
+class ExtrinsicExportResource(ExportResource):
+
+    name = 'extrinsics'
+    block_column = Extrinsic.__table__.c.block_id
+    idx_column = Extrinsic.__table__.c.extrinsic_idx
+    csv_fields = (
+        'block_id', 'extrinsic_idx', 'datetime', 'extrinsic_hash', 'module_id', 'call_id', 'address', 'nonce',
+        'success', 'error', 'params'
+    )
+
+    def get_query(self, session, account_id):
+        return session.query(Extrinsic, Block.datetime, AccountPrivate.is_private) \
+            .join(Block, Block.id == Extrinsic.block_id) \
+            .outerjoin(AccountPrivate, AccountPrivate.account == Extrinsic.address) \
+            .options(noload(Extrinsic.account)) \
+            .filter(Extrinsic.address == account_id) \
+            .order_by(Extrinsic.block_id, Extrinsic.extrinsic_idx)
+
+    def serialize_row(self, row):
+        extrinsic, block_datetime, is_private = row
+
+        data = extrinsic.serialize()['attributes']
+        data['datetime'] = serialize_datetime(block_datetime) if block_datetime else None
+
+        if is_private == 1 and data.get('contract_message'):
+            data['is_private'] = True
+            for arg in data['contract_message'].get('args', []):
+                if arg['value'] is not None:
+                    arg['value'] = '-'
+
+        return data
+
+
+class BalanceTransferExportResource(ExportResource):
+
+    name = 'transfers'
+    block_column = Event.__table__.c.block_id
+    idx_column = Event.__table__.c.event_idx
+    csv_fields = ('block_id', 'event_idx', 'datetime', 'event_id', 'sender', 'destination', 'value', 'fee')
+
+    def get_query(self, session, account_id):
+        search_index = session.query(SearchIndex.block_id, SearchIndex.event_idx).filter(
+            SearchIndex.index_type_id.in_([
+                settings.SEARCH_INDEX_BALANCETRANSFER,
+                settings.SEARCH_INDEX_CLAIMS_CLAIMED,
+                settings.SEARCH_INDEX_BALANCES_DEPOSIT,
+                settings.SEARCH_INDEX_STAKING_REWARD
+            ]),
+            SearchIndex.account_id == account_id
+        )
+
+        return session.query(Event, Block.datetime) \
+            .join(Block, Block.id == Event.block_id) \
+            .filter(tuple_(Event.block_id, Event.event_idx).in_(search_index)) \
+            .order_by(Event.block_id, Event.event_idx)
+
+    @staticmethod
+    def format_address(value):
+        return get_account_id_and_ss58_address(value.replace('0x', ''), settings.SUBSTRATE_ADDRESS_TYPE)[1]
+
+    def serialize_row(self, row):
+        event, block_datetime = row
+
+        sender = destination = None
+        fee = 0
+
+        if event.event_id == 'Transfer':
+            sender = self.format_address(event.attributes[0])
+            destination = self.format_address(event.attributes[1])
+            value = event.attributes[2]
+            # Some networks don't have fees
+            if len(event.attributes) == 4:
+                fee = event.attributes[3]
+        elif event.event_id == 'Claimed':
+            sender = event.attributes[1]
+            value = event.attributes[2]
+        elif event.event_id in ['Deposit', 'Reward']:
+            destination = self.format_address(event.attributes[0])
+            value = event.attributes[1]
+        else:
+            value = None
+
+        return {
+            'block_id': event.block_id,
+            'event_idx': event.event_idx,
+            'datetime': serialize_datetime(block_datetime) if block_datetime else None,
+            'event_id': event.event_id,
+            'sender': sender,
+            'destination': destination,
+            'value': value,
+            'fee': fee
+        }
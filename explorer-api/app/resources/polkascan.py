@@ -23,19 +23,18 @@ import binascii
 
 import falcon
 import pytz
-from dogpile.cache.api import NO_VALUE
 from scalecodec.type_registry import load_type_registry_preset
 from sqlalchemy import func, tuple_, or_
 from sqlalchemy import text
-from sqlalchemy.orm import defer, subqueryload, lazyload, lazyload_all
+from sqlalchemy.orm import defer, subqueryload, lazyload, lazyload_all, noload
 
 
 from app import settings
 from app.models.data import Block, Extrinsic, Event, RuntimeCall, RuntimeEvent, Runtime, RuntimeModule, \
-    RuntimeCallParam, RuntimeEventAttribute, RuntimeType, RuntimeStorage, Account, Session, Contract, \
-    BlockTotal, SessionValidator, Log, AccountIndex, RuntimeConstant, SessionNominator, \
-    RuntimeErrorMessage, SearchIndex, AccountInfoSnapshot, ContractInstance, AccountPrivate
+    RuntimeType, RuntimeStorage, Account, Session, Contract, BlockTotal, SessionValidator, Log, AccountIndex, \
+    RuntimeConstant, SessionNominator, SearchIndex, AccountInfoSnapshot, ContractInstance, AccountPrivate
 from app.resources.base import JSONAPIResource, JSONAPIListResource, JSONAPIDetailResource, BaseResource
+from app.utils.runtime_metadata import runtime_metadata_cache
 from app.utils.ss58 import ss58_decode, get_account_id_and_ss58_address
 from scalecodec.base import RuntimeConfiguration
 from substrateinterface import SubstrateInterface
@@ -52,6 +51,9 @@ class BlockDetailsResource(JSONAPIDetailResource):
         else:
             return Block.query(self.session).filter_by(hash=item_id).first()
 
+    def get_item_block_id(self, item):
+        return item.id
+
     def get_relationships(self, include_list, item):
         relationships = {}
 
@@ -76,6 +78,8 @@ class BlockDetailsResource(JSONAPIDetailResource):
 
 class BlockListResource(JSONAPIListResource):
 
+    cursor_columns = (Block.id,)
+
     def get_query(self):
         return Block.query(self.session).order_by(
             Block.id.desc()
@@ -139,12 +143,17 @@ class ExtrinsicListResource(JSONAPIListResource):
 
     exclude_params = True
 
+    cursor_columns = (Extrinsic.block_id, Extrinsic.extrinsic_idx)
+
     def get_query(self):
         return self.session.query(Extrinsic, AccountPrivate.is_private) \
             .outerjoin(AccountPrivate, AccountPrivate.account == Extrinsic.address) \
-            .options(defer('params')).order_by(
+            .options(defer('params'), noload(Extrinsic.account)).order_by(
             Extrinsic.block_id.desc())
 
+    def get_referenced_account_ids(self, items):
+        return [item[0].address for item in items]
+
     def serialize_item(self, item):
         # Exclude large params from list view
         extrinsic = item[0]
@@ -155,9 +164,10 @@ class ExtrinsicListResource(JSONAPIListResource):
             data = extrinsic.serialize()
 
         # Add account as relationship
-        if extrinsic.account:
+        account = self.get_prefetched(Account, extrinsic.address)
+        if account:
             # data['relationships'] = {'account': {"type": "account", "id": item.account.id}}
-            data['attributes']['account'] = extrinsic.account.serialize()
+            data['attributes']['account'] = account.serialize()
         if is_private is not None and extrinsic.contract_message is not None and is_private == 1:
             data['attributes']['is_private'] = True
             for arg in data['attributes']['contract_message']['args']:
@@ -190,14 +200,13 @@ class ExtrinsicListResource(JSONAPIListResource):
             if type(params.get('filter[search_index]')) != list:
                 params['filter[search_index]'] = [params.get('filter[search_index]')]
 
-            search_index = SearchIndex.query(self.session).filter(
+            search_index = self.session.query(SearchIndex.block_id, SearchIndex.extrinsic_idx).filter(
                 SearchIndex.index_type_id.in_(params.get('filter[search_index]')),
                 SearchIndex.account_id == account_id
-            ).order_by(SearchIndex.sorting_value.desc())
+            )
 
-            query = query.filter(tuple_(Extrinsic.block_id, Extrinsic.extrinsic_idx).in_(
-                [[s.block_id, s.extrinsic_idx] for s in search_index]
-            ))
+            # Semi-join, resolved by the database together with ordering and paging
+            query = query.filter(tuple_(Extrinsic.block_id, Extrinsic.extrinsic_idx).in_(search_index))
         else:
 
             self.exclude_params = True
@@ -280,11 +289,8 @@ class ExtrinsicDetailResource(JSONAPIDetailResource):
         is_private = item[1]
         data = extrinsic.serialize()
 
-        runtime_call = RuntimeCall.query(self.session).filter_by(
-            module_id=extrinsic.module_id,
-            call_id=extrinsic.call_id,
-            spec_version=extrinsic.spec_version_id
-        ).first()
+        runtime_metadata = runtime_metadata_cache.get(self.session, extrinsic.spec_version_id)
+        runtime_call = runtime_metadata.get_call(extrinsic.module_id, extrinsic.call_id)
 
         data['attributes']['documentation'] = runtime_call.documentation
 
@@ -309,11 +315,10 @@ class ExtrinsicDetailResource(JSONAPIDetailResource):
             if extrinsic_failed_event:
                 if 'Module' in extrinsic_failed_event.attributes[0]['value']:
 
-                    error = RuntimeErrorMessage.query(self.session).filter_by(
+                    error = runtime_metadata.get_error(
                         module_index=extrinsic_failed_event.attributes[0]['value']['Module']['index'],
-                        index=extrinsic_failed_event.attributes[0]['value']['Module']['error'],
-                        spec_version=extrinsic.spec_version_id
-                    ).first()
+                        index=extrinsic_failed_event.attributes[0]['value']['Module']['error']
+                    )
 
                     if error:
                         data['attributes']['error_message'] = error.documentation
@@ -342,6 +347,8 @@ class ExtrinsicDetailResource(JSONAPIDetailResource):
 
 class EventsListResource(JSONAPIListResource):
 
+    cursor_columns = (Event.block_id, Event.event_idx)
+
     def apply_filters(self, query, params):
 
         if params.get('filter[address]'):
@@ -361,14 +368,13 @@ class EventsListResource(JSONAPIListResource):
             if type(params.get('filter[search_index]')) != list:
                 params['filter[search_index]'] = [params.get('filter[search_index]')]
 
-            search_index = SearchIndex.query(self.session).filter(
+            search_index = self.session.query(SearchIndex.block_id, SearchIndex.event_idx).filter(
                 SearchIndex.index_type_id.in_(params.get('filter[search_index]')),
                 SearchIndex.account_id == account_id
-            ).order_by(SearchIndex.sorting_value.desc())
+            )
 
-            query = query.filter(tuple_(Event.block_id, Event.event_idx).in_(
-                [[s.block_id, s.event_idx] for s in search_index]
-            ))
+            # Semi-join, resolved by the database together with ordering and paging
+            query = query.filter(tuple_(Event.block_id, Event.event_idx).in_(search_index))
         else:
 
             if params.get('filter[module_id]'):
@@ -388,6 +394,7 @@ class EventsListResource(JSONAPIListResource):
         items = self.get_query()
         items = self.apply_filters(items, req.params)
         items = self.apply_paging(items, req.params)
+        self.prefetch_page(items)
         for item in items:
             if item[1] is not None and item[1] == 1:
                 if item[0].contract_event is not None and item[0].contract_event['args'] is not None:
@@ -399,7 +406,8 @@ class EventsListResource(JSONAPIListResource):
             'media': self.get_jsonapi_response(
                 data=[self.serialize_item(item[0]) for item in items],
                 meta=self.get_meta(),
-                included=self.get_included_items(items)
+                included=self.get_included_items(items),
+                links=self.get_paging_links(req, items)
             ),
             'cacheable': True
         }
@@ -428,6 +436,9 @@ class EventDetailResource(JSONAPIDetailResource):
             .outerjoin(AccountPrivate, AccountPrivate.account == Extrinsic.address) \
             .filter(Event.block_id == ids[0]).filter(Event.event_idx == ids[1]).first()
 
+    def get_item_block_id(self, item):
+        return item[0].block_id
+
     def serialize_item(self, item):
         event = item[0]
         is_private = item[1]
@@ -438,11 +449,9 @@ class EventDetailResource(JSONAPIDetailResource):
                         arg['value'] = '-'
         data = event.serialize()
         data['attributes']['is_private'] = is_private is not None and is_private == 1
-        runtime_event = RuntimeEvent.query(self.session).filter_by(
-            module_id=event.module_id,
-            event_id=event.event_id,
-            spec_version=event.spec_version_id
-        ).first()
+        runtime_event = runtime_metadata_cache.get(self.session, event.spec_version_id).get_event(
+            event.module_id, event.event_id
+        )
         data['attributes']['documentation'] = runtime_event.documentation
         if event.contract_instance_address is not None:
             contract_instance = ContractInstance.query(self.session).get(event.contract_instance_address)
@@ -469,7 +478,8 @@ class EventDetailResource(JSONAPIDetailResource):
                     relationships=self.get_relationships(req.params.get('include', []), item),
                     meta=self.get_meta()
                 ),
-                'cacheable': True
+                'cacheable': True,
+                'block_id': self.get_item_block_id(item)
             }
 
         return response
@@ -490,65 +500,60 @@ class LogDetailResource(JSONAPIDetailResource):
             return None
         return Log.query(self.session).get(item_id.split('-'))
 
+    def get_item_block_id(self, item):
+        return item.block_id
+
 
 class NetworkStatisticsResource(JSONAPIResource):
 
     cache_expiration_time = 6
 
-    def on_get(self, req, resp, network_id=None):
-        resp.status = falcon.HTTP_200
-
-        # TODO make caching more generic for custom resources
-
-        cache_key = '{}-{}'.format(req.method, req.url)
-
-        response = self.cache_region.get(cache_key, self.cache_expiration_time)
-
-        if response is NO_VALUE:
-
-            best_block = BlockTotal.query(self.session).filter_by(id=self.session.query(func.max(BlockTotal.id)).one()[0]).first()
-            if best_block:
-                response = self.get_jsonapi_response(
-                    data={
-                        'type': 'networkstats',
-                        'id': network_id,
-                        'attributes': {
-                            'best_block': best_block.id,
-                            'total_signed_extrinsics': int(best_block.total_extrinsics_signed),
-                            'total_events': int(best_block.total_events),
-                            'total_events_module': int(best_block.total_events_module),
-                            'total_blocks': 'N/A',
-                            'total_accounts': int(best_block.total_accounts),
-                            'total_runtimes': Runtime.query(self.session).count()
-                        }
-                    },
-                )
-            else:
-                response = self.get_jsonapi_response(
-                    data={
-                        'type': 'networkstats',
-                        'id': network_id,
-                        'attributes': {
-                            'best_block': 0,
-                            'total_signed_extrinsics': 0,
-                            'total_events': 0,
-                            'total_events_module': 0,
-                            'total_blocks': 'N/A',
-                            'total_accounts': 0,
-                            'total_runtimes': 0
-                        }
-                    },
-                )
-            self.cache_region.set(cache_key, response)
-            resp.set_header('X-Cache', 'MISS')
+    def process_get_response(self, req, resp, network_id=None):
+        best_block = BlockTotal.query(self.session).filter_by(id=self.session.query(func.max(BlockTotal.id)).one()[0]).first()
+        if best_block:
+            response = self.get_jsonapi_response(
+                data={
+                    'type': 'networkstats',
+                    'id': network_id,
+                    'attributes': {
+                        'best_block': best_block.id,
+                        'total_signed_extrinsics': int(best_block.total_extrinsics_signed),
+                        'total_events': int(best_block.total_events),
+                        'total_events_module': int(best_block.total_events_module),
+                        'total_blocks': 'N/A',
+                        'total_accounts': int(best_block.total_accounts),
+                        'total_runtimes': Runtime.query(self.session).count()
+                    }
+                },
+            )
         else:
-            resp.set_header('X-Cache', 'HIT')
+            response = self.get_jsonapi_response(
+                data={
+                    'type': 'networkstats',
+                    'id': network_id,
+                    'attributes': {
+                        'best_block': 0,
+                        'total_signed_extrinsics': 0,
+                        'total_events': 0,
+                        'total_events_module': 0,
+                        'total_blocks': 'N/A',
+                        'total_accounts': 0,
+                        'total_runtimes': 0
+                    }
+                },
+            )
 
-        resp.media = response
+        return {
+            'status': falcon.HTTP_200,
+            'media': response,
+            'cacheable': True
+        }
 
 
 class BalanceTransferListResource(JSONAPIListResource):
 
+    cursor_columns = (Event.block_id, Event.event_idx)
+
     def get_query(self):
         return Event.query(self.session).filter(
             Event.module_id == 'balances', Event.event_id == 'Transfer'
@@ -565,7 +570,7 @@ class BalanceTransferListResource(JSONAPIListResource):
                 except ValueError:
                     return query.filter(False)
 
-            search_index = SearchIndex.query(self.session).filter(
+            search_index = self.session.query(SearchIndex.block_id, SearchIndex.event_idx).filter(
                 SearchIndex.index_type_id.in_([
                     settings.SEARCH_INDEX_BALANCETRANSFER,
                     settings.SEARCH_INDEX_CLAIMS_CLAIMED,
@@ -573,20 +578,29 @@ class BalanceTransferListResource(JSONAPIListResource):
                     settings.SEARCH_INDEX_STAKING_REWARD
                 ]),
                 SearchIndex.account_id == account_id
-            ).order_by(SearchIndex.sorting_value.desc())
+            )
 
-            query = Event.query(self.session).filter(tuple_(Event.block_id, Event.event_idx).in_(
-                [[s.block_id, s.event_idx] for s in search_index]
-            )).order_by(Event.block_id.desc())
+            # Semi-join, resolved by the database together with ordering and paging
+            query = Event.query(self.session).filter(
+                tuple_(Event.block_id, Event.event_idx).in_(search_index)
+            ).order_by(Event.block_id.desc())
 
 
         return query
 
+    def get_referenced_account_ids(self, items):
+        account_ids = []
+        for item in items:
+            if item.event_id == 'Transfer':
+                account_ids.append(item.attributes[0].replace('0x', ''))
+                account_ids.append(item.attributes[1].replace('0x', ''))
+        return account_ids
+
     def serialize_item(self, item):
 
         if item.event_id == 'Transfer':
 
-            sender = Account.query(self.session).get(item.attributes[0].replace('0x', ''))
+            sender = self.get_prefetched(Account, item.attributes[0].replace('0x', ''))
 
             if sender:
                 sender_data = sender.serialize()
@@ -602,7 +616,7 @@ class BalanceTransferListResource(JSONAPIListResource):
                     }
                 }
 
-            destination = Account.query(self.session).get(item.attributes[1].replace('0x', ''))
+            destination = self.get_prefetched(Account, item.attributes[1].replace('0x', ''))
 
             if destination:
                 destination_data = destination.serialize()
@@ -1128,9 +1142,7 @@ class RuntimeDetailResource(JSONAPIDetailResource):
         relationships = {}
 
         if 'modules' in include_list:
-            relationships['modules'] = RuntimeModule.query(self.session).filter_by(
-                spec_version=item.spec_version
-            ).order_by('lookup', 'id')
+            relationships['modules'] = runtime_metadata_cache.get(self.session, item.spec_version).modules
 
         if 'types' in include_list:
             relationships['types'] = RuntimeType.query(self.session).filter_by(
@@ -1176,18 +1188,16 @@ class RuntimeCallDetailResource(JSONAPIDetailResource):
             return None
 
         spec_version, module_id, call_id = item_id.split('-')
-        return RuntimeCall.query(self.session).filter_by(
-            spec_version=spec_version,
-            module_id=module_id,
-            call_id=call_id
-        ).first()
+        runtime_metadata = runtime_metadata_cache.get(self.session, spec_version)
+
+        if runtime_metadata:
+            return runtime_metadata.get_call(module_id, call_id)
 
     def get_relationships(self, include_list, item):
         relationships = {}
 
         if 'params' in include_list:
-            relationships['params'] = RuntimeCallParam.query(self.session).filter_by(
-                runtime_call_id=item.id).order_by('id')
+            relationships['params'] = runtime_metadata_cache.get(self.session, item.spec_version).call_params[item.id]
 
         if 'recent_extrinsics' in include_list:
             relationships['recent_extrinsics'] = Extrinsic.query(self.session).filter_by(
@@ -1232,18 +1242,18 @@ class RuntimeEventDetailResource(JSONAPIDetailResource):
             return None
 
         spec_version, module_id, event_id = item_id.split('-')
-        return RuntimeEvent.query(self.session).filter_by(
-            spec_version=spec_version,
-            module_id=module_id,
-            event_id=event_id
-        ).first()
+        runtime_metadata = runtime_metadata_cache.get(self.session, spec_version)
+
+        if runtime_metadata:
+            return runtime_metadata.get_event(module_id, event_id)
 
     def get_relationships(self, include_list, item):
         relationships = {}
 
         if 'attributes' in include_list:
-            relationships['attributes'] = RuntimeEventAttribute.query(self.session).filter_by(
-                runtime_event_id=item.id).order_by('id')
+            relationships['attributes'] = runtime_metadata_cache.get(
+                self.session, item.spec_version
+            ).event_attributes[item.id]
 
         if 'recent_events' in include_list:
             relationships['recent_events'] = Event.query(self.session).filter_by(
@@ -1302,35 +1312,29 @@ class RuntimeModuleDetailResource(JSONAPIDetailResource):
             return None
 
         spec_version, module_id = item_id.split('-')
-        return RuntimeModule.query(self.session).filter_by(spec_version=spec_version, module_id=module_id).first()
+        runtime_metadata = runtime_metadata_cache.get(self.session, spec_version)
+
+        if runtime_metadata:
+            return runtime_metadata.get_module(module_id)
 
     def get_relationships(self, include_list, item):
         relationships = {}
+        runtime_metadata = runtime_metadata_cache.get(self.session, item.spec_version)
 
         if 'calls' in include_list:
-            relationships['calls'] = RuntimeCall.query(self.session).filter_by(
-                spec_version=item.spec_version, module_id=item.module_id).order_by(
-                'lookup', 'id')
+            relationships['calls'] = runtime_metadata.module_calls[item.module_id]
 
         if 'events' in include_list:
-            relationships['events'] = RuntimeEvent.query(self.session).filter_by(
-                spec_version=item.spec_version, module_id=item.module_id).order_by(
-                'lookup', 'id')
+            relationships['events'] = runtime_metadata.module_events[item.module_id]
 
         if 'storage' in include_list:
-            relationships['storage'] = RuntimeStorage.query(self.session).filter_by(
-                spec_version=item.spec_version, module_id=item.module_id).order_by(
-                'name')
+            relationships['storage'] = runtime_metadata.module_storage[item.module_id]
 
         if 'constants' in include_list:
-            relationships['constants'] = RuntimeConstant.query(self.session).filter_by(
-                spec_version=item.spec_version, module_id=item.module_id).order_by(
-                'name')
+            relationships['constants'] = runtime_metadata.module_constants[item.module_id]
 
         if 'errors' in include_list:
-            relationships['errors'] = RuntimeErrorMessage.query(self.session).filter_by(
-                spec_version=item.spec_version, module_id=item.module_id).order_by(
-                'name').order_by(RuntimeErrorMessage.index)
+            relationships['errors'] = runtime_metadata.module_errors[item.module_id]
 
         return relationships
 
@@ -1343,11 +1347,10 @@ class RuntimeStorageDetailResource(JSONAPIDetailResource):
             return None
 
         spec_version, module_id, name = item_id.split('-')
-        return RuntimeStorage.query(self.session).filter_by(
-            spec_version=spec_version,
-            module_id=module_id,
-            name=name
-        ).first()
+        runtime_metadata = runtime_metadata_cache.get(self.session, spec_version)
+
+        if runtime_metadata:
+            return runtime_metadata.get_storage(module_id, name)
 
 
 class RuntimeConstantListResource(JSONAPIListResource):
@@ -1368,8 +1371,7 @@ class RuntimeConstantDetailResource(JSONAPIDetailResource):
             return None
 
         spec_version, module_id, name = item_id.split('-')
-        return RuntimeConstant.query(self.session).filter_by(
-            spec_version=spec_version,
-            module_id=module_id,
-            name=name
-        ).first()
+        runtime_metadata = runtime_metadata_cache.get(self.session, spec_version)
+
+        if runtime_metadata:
+            return runtime_metadata.get_constant(module_id, name)
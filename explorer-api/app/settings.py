@@ -29,6 +29,15 @@ DB_CONNECTION = os.environ.get("DB_CONNECTION", "mysql+mysqlconnector://{}:{}@{}
     DB_USERNAME, DB_PASSWORD, DB_HOST, DB_PORT, DB_NAME
 ))
 
+# Comma separated connection strings of read replicas, GET requests are routed to healthy replicas
+DB_REPLICA_CONNECTIONS = [
+    connection for connection in os.environ.get("DB_REPLICA_CONNECTIONS", "").split(",") if connection.strip()
+]
+# Maximum number of sequenced blocks a replica may lag behind the primary
+DB_REPLICA_MAX_LAG = int(os.environ.get("DB_REPLICA_MAX_LAG", 10))
+# Seconds between health and lag checks of the replicas
+DB_REPLICA_CHECK_INTERVAL = float(os.environ.get("DB_REPLICA_CHECK_INTERVAL", 5))
+
 SUBSTRATE_RPC_URL = os.environ.get("SUBSTRATE_RPC_URL", "http://substrate-node:9933/")
 SUBSTRATE_ADDRESS_TYPE = int(os.environ.get("SUBSTRATE_ADDRESS_TYPE", 42))
 SUBSTRATE_TOKEN_DECIMALS = int(os.environ.get("SUBSTRATE_TOKEN_DECIMALS", 18))
@@ -42,9 +51,20 @@ DOGPILE_CACHE_SETTINGS = {
     'default_detail_cache_expiration_time': 3600,
     'host': os.environ.get("DOGPILE_CACHE_HOST", "redis"),
     'port': os.environ.get("DOGPILE_CACHE_PORT", 6379),
-    'db': os.environ.get("DOGPILE_CACHE_DB", 10)
+    'db': os.environ.get("DOGPILE_CACHE_DB", 10),
+    # In-process cache in front of Redis, per worker
+    'local_cache_max_bytes': int(os.environ.get("LOCAL_CACHE_MAX_BYTES", 64 * 1024 * 1024)),
+    'local_cache_expiration_time': int(os.environ.get("LOCAL_CACHE_EXPIRATION_TIME", 2)),
+    # Expiration of cache entries versioned on the chain state published by the harvester
+    'versioned_cache_expiration_time': int(os.environ.get("VERSIONED_CACHE_EXPIRATION_TIME", 3600))
 }
 
+# Redis where the harvester publishes its chain state, set to an empty value to disable versioned caching
+CHAIN_STATE_REDIS_URL = os.environ.get("CHAIN_STATE_REDIS_URL", "redis://{}:{}/0".format(
+    DOGPILE_CACHE_SETTINGS['host'], DOGPILE_CACHE_SETTINGS['port']
+))
+CHAIN_STATE_REFRESH_INTERVAL = float(os.environ.get("CHAIN_STATE_REFRESH_INTERVAL", 1))
+
 
 DEBUG = False
 
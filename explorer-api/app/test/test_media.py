@@ -0,0 +1,75 @@
+import decimal
+import unittest
+from datetime import datetime
+from unittest import mock
+
+import falcon
+
+from app.utils import media
+
+VALUES = {
+    'int': 1,
+    'wide_int': 2 ** 70,
+    'decimal': decimal.Decimal('1.5'),
+    'datetime': datetime(2020, 1, 2, 3, 4, 5),
+    'text': 'ü',
+    'list': [1, None, True]
+}
+
+
+class OrjsonMediaTestCase(unittest.TestCase):
+
+    def test_dumps_uses_orjson(self):
+        self.assertEqual(media.dumps({'a': [1, 'ü']}), '{"a":[1,"ü"]}'.encode('utf-8'))
+
+    def test_dumps_non_str_keys(self):
+        self.assertEqual(media.dumps({1: 'a'}), b'{"1":"a"}')
+
+    def test_dumps_decimal(self):
+        self.assertEqual(media.dumps({'value': decimal.Decimal('1.5')}), b'{"value":1.5}')
+
+    def test_dumps_datetime(self):
+        self.assertEqual(
+            media.dumps({'datetime': datetime(2020, 1, 2, 3, 4, 5)}), b'{"datetime":"2020-01-02T03:04:05+00:00"}'
+        )
+
+    def test_dumps_wide_int_falls_back(self):
+        self.assertEqual(media.dumps({'value': 2 ** 70, 1: 'a'}), b'{"value": 1180591620717411303424, "1": "a"}')
+
+    def test_dumps_unsupported_type(self):
+        self.assertRaises(TypeError, media.dumps, {'value': object()})
+
+    def test_loads(self):
+        self.assertEqual(media.loads(b'{"a":[1,"\\u00fc"]}'), {'a': [1, 'ü']})
+        self.assertEqual(media.loads('{"a":2}'), {'a': 2})
+
+    def test_deserialize_invalid(self):
+        self.assertRaises(falcon.HTTPBadRequest, media.JSONHandler().deserialize, b'{"a":')
+
+
+@mock.patch('app.utils.media.orjson', None)
+class StdlibMediaTestCase(unittest.TestCase):
+
+    def test_dumps_values(self):
+        self.assertEqual(media.loads(media.dumps(VALUES)), {
+            'int': 1,
+            'wide_int': 2 ** 70,
+            'decimal': 1.5,
+            'datetime': '2020-01-02T03:04:05+00:00',
+            'text': 'ü',
+            'list': [1, None, True]
+        })
+
+    def test_dumps(self):
+        self.assertEqual(media.dumps({'a': [1, 'ü']}), '{"a": [1, "ü"]}'.encode('utf-8'))
+
+    def test_loads(self):
+        self.assertEqual(media.loads(b'{"a":[1,"\\u00fc"]}'), {'a': [1, 'ü']})
+        self.assertEqual(media.loads('{"a":2}'), {'a': 2})
+
+    def test_deserialize_invalid(self):
+        self.assertRaises(falcon.HTTPBadRequest, media.JSONHandler().deserialize, b'{"a":')
+
+
+if __name__ == '__main__':
+    unittest.main()
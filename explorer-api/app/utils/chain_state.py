@@ -0,0 +1,74 @@
+#  Polkascan PRE Explorer API
+#
+#  Copyright 2018-2020 openAware BV (NL).
+#  This file is part of Polkascan.
+#
+#  Polkascan is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  Polkascan is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with Polkascan. If not, see <http://www.gnu.org/licenses/>.
+#
+#  chain_state.py
+#
+#  Reads the chain state published by the harvester (see harvester/app/utils/chain_state.py).
+import threading
+import time
+
+from redis import StrictRedis
+from redis.exceptions import RedisError
+
+REDIS_KEY_PREFIX = 'chain_state:'
+FIELDS = ('version', 'head', 'sequencer', 'finalized', 'reorg', 'reorg_count')
+
+
+class ChainState:
+    """
+    Snapshot of the harvester progress, refreshed from Redis at most once per `refresh_interval` seconds
+    """
+
+    def __init__(self, redis_url, refresh_interval=1.0):
+        self.redis = StrictRedis.from_url(redis_url, socket_timeout=1)
+        self.refresh_interval = refresh_interval
+        self.state = None
+        self.refreshed_at = None
+        self.lock = threading.Lock()
+
+    def get(self):
+        """
+        Returns
+        -------
+        dict with the integer values of `FIELDS`, or None when the harvester does not publish its state
+        """
+        now = time.monotonic()
+
+        if self.refreshed_at is None or now - self.refreshed_at >= self.refresh_interval:
+            with self.lock:
+                if self.refreshed_at is None or now - self.refreshed_at >= self.refresh_interval:
+                    self.state = self.fetch()
+                    self.refreshed_at = now
+
+        return self.state
+
+    def fetch(self):
+        try:
+            values = self.redis.mget([REDIS_KEY_PREFIX + field for field in FIELDS])
+        except RedisError:
+            return None
+
+        if values[0] is None:
+            return None
+
+        return {field: int(value) if value is not None else None for field, value in zip(FIELDS, values)}
+
+    def is_finalized(self, block_id):
+        state = self.get()
+        return bool(state) and state['finalized'] is not None and block_id is not None and \
+            int(block_id) <= state['finalized']
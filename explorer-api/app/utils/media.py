@@ -0,0 +1,94 @@
+#  Polkascan PRE Explorer API
+#
+#  Copyright 2018-2020 openAware BV (NL).
+#  This file is part of Polkascan.
+#
+#  Polkascan is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  Polkascan is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with Polkascan. If not, see <http://www.gnu.org/licenses/>.
+#
+#  media.py
+#
+#  JSON encoding of responses. Uses orjson when installed, with the standard library json module as fallback for
+#  values orjson does not support (e.g. integers wider than 64 bits, found in decoded event attributes). Decimals and
+#  datetimes are encoded like model attributes by both, as floats and UTC ISO strings.
+import decimal
+import json
+from datetime import datetime
+
+from falcon import errors
+from falcon.media import BaseHandler
+
+from app.models.base import serialize_datetime
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def default(obj):
+    if isinstance(obj, decimal.Decimal):
+        return float(obj)
+
+    if isinstance(obj, datetime):
+        return serialize_datetime(obj)
+
+    raise TypeError('Object of type {} is not JSON serializable'.format(type(obj).__name__))
+
+
+def dumps(obj):
+    """
+    Encodes given object to JSON
+
+    Parameters
+    ----------
+    obj: JSON compatible object
+
+    Returns
+    -------
+    bytes with UTF-8 encoded JSON
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(
+                obj, default=default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+            )
+        except TypeError:
+            pass
+
+    return json.dumps(obj, ensure_ascii=False, default=default).encode('utf-8')
+
+
+def loads(data):
+    if orjson is not None:
+        return orjson.loads(data)
+
+    return json.loads(data.decode('utf-8') if type(data) is bytes else data)
+
+
+class JSONHandler(BaseHandler):
+    """
+    Falcon media handler for application/json using `dumps` and `loads`
+    """
+
+    def deserialize(self, raw):
+        try:
+            return loads(raw)
+        except ValueError as err:
+            raise errors.HTTPBadRequest(
+                'Invalid JSON',
+                'Could not parse JSON body - {0}'.format(err)
+            )
+
+    def serialize(self, media):
+        return dumps(media)
@@ -0,0 +1,196 @@
+#  Polkascan PRE Explorer API
+#
+#  Copyright 2018-2020 openAware BV (NL).
+#  This file is part of Polkascan.
+#
+#  Polkascan is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  Polkascan is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with Polkascan. If not, see <http://www.gnu.org/licenses/>.
+#
+#  runtime_metadata.py
+#
+#  Per-process cache of runtime metadata rows. The harvester writes all runtime rows of a spec version once, in
+#  process_metadata, so once the rows of a spec version are complete its metadata never changes and is cached without
+#  expiration. The Runtime row is written first and its counts are updated per module, so the rows are complete when
+#  they match the counts of the Runtime row; until then every request loads them again.
+import threading
+from collections import defaultdict
+
+from app.models.data import Runtime, RuntimeModule, RuntimeCall, RuntimeCallParam, RuntimeEvent, \
+    RuntimeEventAttribute, RuntimeStorage, RuntimeConstant, RuntimeErrorMessage
+
+
+class RuntimeMetadata:
+    """
+    All runtime rows of one spec version, indexed for the lookups of the explorer resources. The rows are detached
+    from any session and shared between requests, so they must be treated as read-only.
+    """
+
+    def __init__(self, spec_version, modules, calls, call_params, events, event_attributes, storage, constants,
+                 errors):
+        self.spec_version = spec_version
+
+        self.modules = sorted(modules, key=lambda module: (module.lookup or '', module.id))
+        self.module_map = {module.module_id: module for module in self.modules}
+
+        self.calls = sorted(calls, key=lambda call: (call.lookup or '', call.id))
+        self.call_map = {(call.module_id, call.call_id): call for call in self.calls}
+        self.module_calls = self.group_by_module(self.calls)
+
+        self.call_params = defaultdict(list)
+        for param in sorted(call_params, key=lambda param: param.id):
+            self.call_params[param.runtime_call_id].append(param)
+
+        self.events = sorted(events, key=lambda event: (event.lookup or '', event.id))
+        self.event_map = {(event.module_id, event.event_id): event for event in self.events}
+        self.module_events = self.group_by_module(self.events)
+
+        self.event_attributes = defaultdict(list)
+        for attribute in sorted(event_attributes, key=lambda attribute: attribute.id):
+            self.event_attributes[attribute.runtime_event_id].append(attribute)
+
+        self.storage = sorted(storage, key=lambda storage_function: storage_function.name or '')
+        self.storage_map = {(item.module_id, item.name): item for item in self.storage}
+        self.module_storage = self.group_by_module(self.storage)
+
+        self.constants = sorted(constants, key=lambda constant: constant.name or '')
+        self.constant_map = {(constant.module_id, constant.name): constant for constant in self.constants}
+        self.module_constants = self.group_by_module(self.constants)
+
+        self.errors = sorted(errors, key=lambda error: (error.name or '', error.index or 0))
+        self.error_map = {(error.module_index, error.index): error for error in self.errors}
+        self.module_errors = self.group_by_module(self.errors)
+
+    def is_complete(self, runtime):
+        """
+        Returns True when the loaded rows match the counts of given Runtime row, i.e. the harvester finished processing
+        the metadata of this spec version
+        """
+        return len(self.modules) > 0 and \
+            len(self.modules) == runtime.count_modules and \
+            len(self.calls) == runtime.count_call_functions and \
+            len(self.events) == runtime.count_events and \
+            len(self.storage) == runtime.count_storage_functions and \
+            len(self.constants) == runtime.count_constants and \
+            len(self.errors) == runtime.count_errors
+
+    @staticmethod
+    def group_by_module(items):
+        grouped = defaultdict(list)
+        for item in items:
+            grouped[item.module_id].append(item)
+        return grouped
+
+    def get_module(self, module_id):
+        return self.module_map.get(module_id)
+
+    def get_call(self, module_id, call_id):
+        return self.call_map.get((module_id, call_id))
+
+    def get_event(self, module_id, event_id):
+        return self.event_map.get((module_id, event_id))
+
+    def get_storage(self, module_id, name):
+        return self.storage_map.get((module_id, name))
+
+    def get_constant(self, module_id, name):
+        return self.constant_map.get((module_id, name))
+
+    def get_error(self, module_index, index):
+        return self.error_map.get((module_index, index))
+
+
+class RuntimeMetadataCache:
+    """
+    Lazily populated, never expiring cache of complete `RuntimeMetadata` per spec version
+    """
+
+    def __init__(self):
+        self.runtimes = {}
+        self.lock = threading.Lock()
+
+    def get(self, session, spec_version):
+        """
+        Returns the cached metadata of given spec version, loading it on first use
+
+        Parameters
+        ----------
+        session: SQLAlchemy session used to load the metadata when not cached yet
+        spec_version: int or numeric string
+
+        Returns
+        -------
+        RuntimeMetadata or None when the runtime is unknown (not yet processed by the harvester); metadata still being
+        processed by the harvester is returned as loaded, but not cached
+        """
+        try:
+            spec_version = int(spec_version)
+        except (TypeError, ValueError):
+            return None
+
+        runtime_metadata = self.runtimes.get(spec_version)
+
+        if runtime_metadata is None:
+            with self.lock:
+                runtime_metadata = self.runtimes.get(spec_version)
+                if runtime_metadata is None:
+                    runtime_metadata, complete = self.load(session, spec_version)
+                    if complete:
+                        self.runtimes[spec_version] = runtime_metadata
+
+        return runtime_metadata
+
+    @staticmethod
+    def load(session, spec_version):
+        """
+        Returns
+        -------
+        tuple of RuntimeMetadata (None when the runtime is unknown) and whether its rows are complete
+        """
+        runtime = Runtime.query(session).filter_by(spec_version=spec_version).first()
+
+        if runtime is None:
+            return None, False
+
+        calls = RuntimeCall.query(session).filter_by(spec_version=spec_version).all()
+        events = RuntimeEvent.query(session).filter_by(spec_version=spec_version).all()
+
+        rows = {
+            'modules': RuntimeModule.query(session).filter_by(spec_version=spec_version).all(),
+            'calls': calls,
+            'call_params': RuntimeCallParam.query(session).filter(
+                RuntimeCallParam.runtime_call_id.in_([call.id for call in calls])
+            ).all() if calls else [],
+            'events': events,
+            'event_attributes': RuntimeEventAttribute.query(session).filter(
+                RuntimeEventAttribute.runtime_event_id.in_([event.id for event in events])
+            ).all() if events else [],
+            'storage': RuntimeStorage.query(session).filter_by(spec_version=spec_version).all(),
+            'constants': RuntimeConstant.query(session).filter_by(spec_version=spec_version).all(),
+            'errors': RuntimeErrorMessage.query(session).filter_by(spec_version=spec_version).all()
+        }
+
+        # Detach the loaded rows, so they outlive the request session and are never expired or refreshed
+        for value in rows.values():
+            for row in value:
+                session.expunge(row)
+
+        runtime_metadata = RuntimeMetadata(spec_version, **rows)
+
+        return runtime_metadata, runtime_metadata.is_complete(runtime)
+
+    def clear(self):
+        with self.lock:
+            self.runtimes.clear()
+
+
+runtime_metadata_cache = RuntimeMetadataCache()
@@ -0,0 +1,386 @@
+#  Polkascan PRE Harvester
+#
+#  Copyright 2018-2020 openAware BV (NL).
+#  This file is part of Polkascan.
+#
+#  Polkascan is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  Polkascan is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with Polkascan. If not, see <http://www.gnu.org/licenses/>.
+#
+#  mock_node.py
+#
+#  Stand-in Substrate JSON-RPC node that replays recorded responses over HTTP and WS.
+#
+#  Serve fixtures:
+#      python -m app.benchmark.mock_node --fixtures fixtures/ --http-port 9933 --ws-port 9944 --latency 5
+#
+#  Record fixtures from a live node (unknown requests are proxied and stored on exit):
+#      python -m app.benchmark.mock_node --fixtures fixtures/recorded.json --record-from http://substrate-node:9933/
+import argparse
+import asyncio
+import glob
+import itertools
+import json
+import os
+import random
+import threading
+from collections import Counter
+
+import requests
+import tornado.gen
+import tornado.ioloop
+import tornado.web
+import tornado.websocket
+
+SUBSCRIPTION_METHODS = {
+    'chain_subscribeNewHeads': 'chain_newHead',
+    'chain_subscribeNewHead': 'chain_newHead',
+    'chain_subscribeFinalizedHeads': 'chain_finalizedHead',
+    'chain_subscribeFinalisedHeads': 'chain_finalizedHead',
+    'chain_subscribeAllHeads': 'chain_allHead',
+}
+
+UNSUBSCRIBE_METHODS = {
+    'chain_unsubscribeNewHeads',
+    'chain_unsubscribeNewHead',
+    'chain_unsubscribeFinalizedHeads',
+    'chain_unsubscribeFinalisedHeads',
+    'chain_unsubscribeAllHeads',
+}
+
+
+class RPCFixtureStore:
+    """
+    Recorded JSON-RPC responses, looked up by method name and exact parameter list.
+
+    Fixture files contain `{"rpc": [{"method": ..., "params": [...], "result": ...}, ...]}`; an entry can hold an
+    `error` object instead of a `result`.
+    """
+
+    def __init__(self):
+        self.responses = {}
+
+    @staticmethod
+    def request_key(method, params):
+        return '{}:{}'.format(method, json.dumps(params or [], sort_keys=True, separators=(',', ':')))
+
+    def load(self, path):
+        if os.path.isdir(path):
+            files = sorted(glob.glob(os.path.join(path, '*.json')))
+        else:
+            files = [path]
+
+        for filename in files:
+            with open(filename, 'r') as fixture_file:
+                for entry in json.load(fixture_file).get('rpc', []):
+                    self.add(entry['method'], entry.get('params', []), entry)
+
+    def save(self, filename):
+        with open(filename, 'w') as fixture_file:
+            json.dump({'rpc': list(self.responses.values())}, fixture_file, indent=1)
+
+    def save_recording(self, path):
+        """
+        Saves the fixtures to `path`. A path without .json suffix, e.g. `fixtures/`, is a directory, which is created
+        when missing, and the fixtures are saved to recorded.json in it
+
+        Returns
+        -------
+        filename of the saved fixtures
+        """
+        if os.path.isdir(path) or not path.endswith('.json'):
+            os.makedirs(path, exist_ok=True)
+            path = os.path.join(path, 'recorded.json')
+        elif os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        self.save(path)
+
+        return path
+
+    def add(self, method, params, response):
+        entry = {'method': method, 'params': params or []}
+        if 'error' in response:
+            entry['error'] = response['error']
+        else:
+            entry['result'] = response.get('result')
+
+        self.responses[self.request_key(method, params)] = entry
+
+    def get(self, method, params):
+        return self.responses.get(self.request_key(method, params))
+
+    def get_headers(self):
+        """
+        All recorded block headers ordered by block number, used to feed head subscriptions
+        """
+        headers = {}
+        for entry in self.responses.values():
+            if entry['method'] == 'chain_getHeader' and entry.get('result'):
+                header = entry['result']
+                headers[(int(header['number'], 16), header['parentHash'])] = header
+
+        return [headers[key] for key in sorted(headers)]
+
+    def __len__(self):
+        return len(self.responses)
+
+
+class MockSubstrateNode:
+    """
+    Replays an `RPCFixtureStore` as a Substrate node with configurable response latency
+
+    Parameters
+    ----------
+    fixtures: RPCFixtureStore with recorded responses
+    latency: base delay in seconds added to every response
+    jitter: maximum random delay in seconds added on top of `latency`
+    upstream_url: HTTP RPC url of a live node; requests missing in the fixtures are proxied and recorded
+    head_interval: seconds between header notifications on head subscriptions
+    """
+
+    def __init__(self, fixtures, latency=0.0, jitter=0.0, upstream_url=None, head_interval=6.0):
+        self.fixtures = fixtures
+        self.latency = latency
+        self.jitter = jitter
+        self.upstream_url = upstream_url
+        self.head_interval = head_interval
+
+        self.request_count = Counter()
+        self.missing_count = Counter()
+
+        self.subscription_ids = itertools.count(1)
+        self.io_loop = None
+        self.http_server = None
+        self.ws_server = None
+
+    def reset_stats(self):
+        self.request_count.clear()
+        self.missing_count.clear()
+
+    async def handle_payload(self, payload, connection=None):
+        if type(payload) is list:
+            return [await self.handle_request(request, connection) for request in payload]
+
+        return await self.handle_request(payload, connection)
+
+    async def handle_request(self, request, connection=None):
+        method = request.get('method')
+        params = request.get('params', [])
+
+        self.request_count[method] += 1
+
+        delay = self.latency + random.uniform(0, self.jitter)
+        if delay > 0:
+            await tornado.gen.sleep(delay)
+
+        response = {'jsonrpc': '2.0', 'id': request.get('id')}
+
+        if method in SUBSCRIPTION_METHODS and connection is not None:
+            subscription_id = next(self.subscription_ids)
+            connection.subscriptions.add(subscription_id)
+            tornado.ioloop.IOLoop.current().spawn_callback(
+                self.emit_headers, connection, subscription_id, SUBSCRIPTION_METHODS[method]
+            )
+            response['result'] = subscription_id
+            return response
+
+        if method in UNSUBSCRIBE_METHODS and connection is not None:
+            response['result'] = params[0] in connection.subscriptions
+            connection.subscriptions.discard(params[0])
+            return response
+
+        entry = self.fixtures.get(method, params)
+
+        if entry is None and self.upstream_url:
+            entry = self.record_request(method, params)
+
+        if entry is None:
+            self.missing_count[method] += 1
+
+            if method.startswith('state_getStorage'):
+                # Node returns null for storage keys that do not exist
+                response['result'] = None
+            else:
+                response['error'] = {
+                    'code': -32601, 'message': 'No fixture for "{}" with params {}'.format(method, params)
+                }
+        elif 'error' in entry:
+            response['error'] = entry['error']
+        else:
+            response['result'] = entry['result']
+
+        return response
+
+    def record_request(self, method, params):
+        # Blocking call, recording mode is not meant for benchmarking
+        upstream_response = requests.post(self.upstream_url, json={
+            'jsonrpc': '2.0', 'method': method, 'params': params, 'id': 1
+        }).json()
+
+        self.fixtures.add(method, params, upstream_response)
+        return self.fixtures.get(method, params)
+
+    async def emit_headers(self, connection, subscription_id, notification_method):
+        for header in self.fixtures.get_headers():
+            await tornado.gen.sleep(self.head_interval)
+
+            if subscription_id not in connection.subscriptions:
+                return
+
+            connection.write_message(json.dumps({
+                'jsonrpc': '2.0',
+                'method': notification_method,
+                'params': {'subscription': subscription_id, 'result': header}
+            }))
+
+    def make_http_app(self):
+        return tornado.web.Application([
+            (r'/stats', StatsHandler, {'node': self}),
+            (r'/.*', HTTPRPCHandler, {'node': self}),
+        ])
+
+    def make_ws_app(self):
+        return tornado.web.Application([
+            (r'/.*', WebSocketRPCHandler, {'node': self}),
+        ])
+
+    def listen(self, http_port=9933, ws_port=9944, address='127.0.0.1'):
+        self.io_loop = tornado.ioloop.IOLoop.current()
+        self.http_server = self.make_http_app().listen(http_port, address=address)
+        if ws_port:
+            self.ws_server = self.make_ws_app().listen(ws_port, address=address)
+
+    def start(self, http_port=9933, ws_port=9944, address='127.0.0.1'):
+        self.listen(http_port, ws_port, address)
+        self.io_loop.start()
+
+    def start_in_thread(self, http_port=9933, ws_port=9944, address='127.0.0.1'):
+        """
+        Runs the node on its own IOLoop in a daemon thread and returns when the ports are bound
+        """
+        listening = threading.Event()
+
+        def run():
+            asyncio.set_event_loop(asyncio.new_event_loop())
+            self.listen(http_port, ws_port, address)
+            listening.set()
+            self.io_loop.start()
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        listening.wait()
+        return thread
+
+    def stop(self):
+        if self.io_loop:
+            self.io_loop.add_callback(self.io_loop.stop)
+
+
+class HTTPRPCHandler(tornado.web.RequestHandler):
+
+    def initialize(self, node):
+        self.node = node
+
+    async def post(self):
+        try:
+            payload = json.loads(self.request.body)
+        except ValueError:
+            response = {'jsonrpc': '2.0', 'id': None, 'error': {'code': -32700, 'message': 'Parse error'}}
+        else:
+            response = await self.node.handle_payload(payload)
+
+        self.set_header('Content-Type', 'application/json')
+        self.write(json.dumps(response))
+
+
+class StatsHandler(tornado.web.RequestHandler):
+
+    def initialize(self, node):
+        self.node = node
+
+    def get(self):
+        self.write({
+            'requests': dict(self.node.request_count),
+            'missing': dict(self.node.missing_count),
+            'fixtures': len(self.node.fixtures)
+        })
+
+    def delete(self):
+        self.node.reset_stats()
+        self.set_status(204)
+
+
+class WebSocketRPCHandler(tornado.websocket.WebSocketHandler):
+
+    def initialize(self, node):
+        self.node = node
+        self.subscriptions = set()
+
+    def check_origin(self, origin):
+        return True
+
+    async def on_message(self, message):
+        try:
+            payload = json.loads(message)
+        except ValueError:
+            response = {'jsonrpc': '2.0', 'id': None, 'error': {'code': -32700, 'message': 'Parse error'}}
+        else:
+            response = await self.node.handle_payload(payload, connection=self)
+
+        if self.ws_connection is not None:
+            self.write_message(json.dumps(response))
+
+    def on_close(self):
+        self.subscriptions.clear()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Mock Substrate JSON-RPC node serving recorded fixtures')
+    parser.add_argument('--fixtures', required=True, help='Fixture file or directory of *.json fixture files')
+    parser.add_argument('--address', default='127.0.0.1')
+    parser.add_argument('--http-port', type=int, default=9933)
+    parser.add_argument('--ws-port', type=int, default=9944)
+    parser.add_argument('--latency', type=float, default=0, help='Added latency per request in milliseconds')
+    parser.add_argument('--jitter', type=float, default=0, help='Maximum random extra latency in milliseconds')
+    parser.add_argument('--head-interval', type=float, default=6, help='Seconds between head notifications')
+    parser.add_argument('--record-from', default=None, help='Proxy and record missing requests from this node')
+    args = parser.parse_args()
+
+    fixtures = RPCFixtureStore()
+    if os.path.exists(args.fixtures):
+        fixtures.load(args.fixtures)
+
+    node = MockSubstrateNode(
+        fixtures,
+        latency=args.latency / 1000,
+        jitter=args.jitter / 1000,
+        upstream_url=args.record_from,
+        head_interval=args.head_interval
+    )
+
+    print('Serving {} fixtures on http://{}:{} and ws://{}:{}'.format(
+        len(fixtures), args.address, args.http_port, args.address, args.ws_port
+    ))
+
+    try:
+        node.start(args.http_port, args.ws_port, args.address)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if args.record_from:
+            filename = fixtures.save_recording(args.fixtures)
+            print('Saved {} fixtures to {}'.format(len(fixtures), filename))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,29 @@
+"""Add composite account index to data_account_search_index
+
+Revision ID: 5c1a9e0d7b42
+Revises: 10d5bb76895a
+Create Date: 2026-10-19 10:12:31.402117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5c1a9e0d7b42'
+down_revision = '10d5bb76895a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        'ix_data_account_search_index_account_type_block',
+        'data_account_search_index',
+        ['account_id', 'index_type_id', sa.text('block_id DESC'), 'extrinsic_idx', 'event_idx'],
+        unique=False
+    )
+
+
+def downgrade():
+    op.drop_index('ix_data_account_search_index_account_type_block', table_name='data_account_search_index')
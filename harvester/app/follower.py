@@ -0,0 +1,173 @@
+#  Polkascan PRE Harvester
+#
+#  Copyright 2018-2020 openAware BV (NL).
+#  This file is part of Polkascan.
+#
+#  Polkascan is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  Polkascan is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with Polkascan. If not, see <http://www.gnu.org/licenses/>.
+#
+#  follower.py
+#
+#  Long-running chain head follower. Subscribes to new block headers (finalized headers with FINALIZATION_ONLY) and
+#  for every header enqueues the accumulation of exactly the blocks added since the previous header, followed by an
+#  incremental sequencer run. Without a WebSocket endpoint the chain head is polled every FOLLOWER_POLL_INTERVAL
+#  seconds instead. The `start_harvester` beat schedule remains as a gap check with a low frequency
+#  (HARVESTER_BEAT_INTERVAL).
+#
+#      python -m app.follower
+import time
+
+from celery import chain
+from requests import RequestException
+from websocket import WebSocketException
+
+from app import settings
+from app.tasks import start_harvester, accumulate_block_recursive, start_sequencer
+from scalecodec.type_registry import load_type_registry_file
+from substrateinterface import SubstrateInterface
+from substrateinterface.exceptions import SubstrateRequestException
+
+CONNECTION_ERRORS = (WebSocketException, RequestException, SubstrateRequestException, OSError)
+
+# Maximum delay between reconnection attempts
+MAX_RECONNECT_DELAY = 30
+
+
+def is_websocket_url(url):
+    return bool(url) and (url[0:6] == 'wss://' or url[0:5] == 'ws://')
+
+
+class ChainHeadFollower:
+
+    def __init__(self, rpc_url, ws_url=None, finalized_only=False, poll_interval=1.0):
+        """
+        Parameters
+        ----------
+        rpc_url: node URL used to look up block hashes
+        ws_url: WebSocket node URL to subscribe to headers, the chain head is polled on `rpc_url` when omitted
+        finalized_only: follow the finalized head instead of the best block
+        poll_interval: seconds between polls of the chain head without WebSocket subscription
+        """
+        self.rpc_url = rpc_url
+        self.ws_url = ws_url
+        self.finalized_only = finalized_only
+        self.poll_interval = poll_interval
+
+        self.substrate = None
+        self.last_block_number = None
+
+    def create_substrate(self, url):
+        if settings.TYPE_REGISTRY_FILE:
+            custom_type_registry = load_type_registry_file(settings.TYPE_REGISTRY_FILE)
+        else:
+            custom_type_registry = None
+
+        return SubstrateInterface(
+            url=url,
+            type_registry=custom_type_registry,
+            type_registry_preset=settings.TYPE_REGISTRY
+        )
+
+    def get_head_block_number(self):
+        if self.finalized_only:
+            block_hash = self.substrate.get_chain_finalised_head()
+        else:
+            block_hash = self.substrate.get_chain_head()
+
+        return self.substrate.get_block_number(block_hash)
+
+    def enqueue_blocks(self, block_number):
+        """
+        Enqueues the accumulation of the blocks after the last enqueued block up to given block number, followed by
+        an incremental sequencer run
+        """
+        if self.last_block_number is not None and block_number <= self.last_block_number:
+            # Known block number, e.g. a competing fork; reorgs are resolved by the integrity checks of the sequencer
+            return
+
+        block_hash = self.substrate.get_block_hash(block_number)
+
+        if self.last_block_number is None:
+            # Continue until an already added block is reached
+            end_block_hash = None
+        else:
+            end_block_hash = self.substrate.get_block_hash(self.last_block_number + 1)
+
+        chain(accumulate_block_recursive.si(block_hash, end_block_hash), start_sequencer.si()).delay()
+
+        print('+ Enqueued blocks {}-{}'.format(
+            block_number if self.last_block_number is None else self.last_block_number + 1, block_number
+        ))
+
+        self.last_block_number = block_number
+
+    def subscription_handler(self, obj, update_nr, subscription_id):
+        self.enqueue_blocks(obj['header']['number'])
+
+    def follow(self):
+        if self.ws_url:
+            subscription_substrate = self.create_substrate(self.ws_url)
+            try:
+                subscription_substrate.subscribe_block_headers(
+                    self.subscription_handler, ignore_decoding_errors=True, finalized_only=self.finalized_only
+                )
+            finally:
+                subscription_substrate.close()
+        else:
+            while True:
+                self.enqueue_blocks(self.get_head_block_number())
+                time.sleep(self.poll_interval)
+
+    def run(self):
+        reconnect_delay = 1
+
+        while True:
+            try:
+                self.substrate = self.create_substrate(self.rpc_url)
+
+                if self.last_block_number is None:
+                    # Fill gaps and catch up with the head once, the follower continues from the current head
+                    start_harvester.delay()
+                    self.last_block_number = self.get_head_block_number()
+
+                reconnect_delay = 1
+                self.follow()
+
+            except CONNECTION_ERRORS as e:
+                print('! Chain head follower disconnected: {}'.format(e))
+                time.sleep(reconnect_delay)
+                reconnect_delay = min(reconnect_delay * 2, MAX_RECONNECT_DELAY)
+
+            finally:
+                if self.substrate:
+                    self.substrate.close()
+                    self.substrate = None
+
+
+def main():
+    ws_url = settings.SUBSTRATE_WS_URL
+
+    if not ws_url and is_websocket_url(settings.SUBSTRATE_RPC_URL):
+        ws_url = settings.SUBSTRATE_RPC_URL
+
+    follower = ChainHeadFollower(
+        rpc_url=settings.SUBSTRATE_RPC_URL,
+        ws_url=ws_url,
+        finalized_only=settings.FINALIZATION_ONLY == 1,
+        poll_interval=settings.FOLLOWER_POLL_INTERVAL
+    )
+    follower.run()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,196 @@
+#  Polkascan PRE Harvester
+#
+#  Copyright 2018-2020 openAware BV (NL).
+#  This file is part of Polkascan.
+#
+#  Polkascan is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  Polkascan is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with Polkascan. If not, see <http://www.gnu.org/licenses/>.
+#
+#  head_tracker.py
+#
+#  Long-running head tracker. Polls the chain head and finalized head of the node (raw RPC requests, nothing is
+#  decoded) together with the harvester, sequencer and integrity heads every HEAD_TRACKER_INTERVAL seconds, and the
+#  block process queue every HEAD_TRACKER_QUEUE_INTERVAL seconds, and stores the responses of the /status and /queue
+#  routes as chain state snapshots, so these routes don't touch the node or database while the tracker runs.
+#
+#      python -m app.head_tracker
+import time
+
+import pytz
+from scalecodec.base import RuntimeConfiguration
+from sqlalchemy import create_engine, func
+from sqlalchemy.orm import sessionmaker
+
+from app import settings
+from app.models.data import Block, BlockTotal
+from app.models.harvester import Status
+from app.utils import chain_state
+from substrateinterface import SubstrateInterface
+from substrateinterface.exceptions import SubstrateRequestException
+
+
+def get_header_number(substrate, block_hash=None):
+    response = substrate.rpc_request("chain_getHeader", [block_hash] if block_hash else [])
+
+    if 'error' in response:
+        raise SubstrateRequestException(response['error']['message'])
+
+    return int(response['result']['number'], 16)
+
+
+def get_chain_heads(substrate):
+    """
+    Retrieves the block numbers of the chain head and finalized head
+
+    Returns
+    -------
+    tuple of chain head block number and finalized block number
+    """
+    response = substrate.rpc_request("chain_getFinalizedHead", [])
+
+    if 'error' in response:
+        raise SubstrateRequestException(response['error']['message'])
+
+    return get_header_number(substrate), get_header_number(substrate, response['result'])
+
+
+def get_harvester_status(session, chain_head_block_id, chain_finalized_block_id):
+    """
+    Returns the response of the /status route
+    """
+    sequencer_task = Status.get_status(session, 'SEQUENCER_TASK_ID')
+    integrity_head = Status.get_status(session, 'INTEGRITY_HEAD')
+    sequencer_head = session.query(func.max(BlockTotal.id)).one()[0]
+    best_block = Block.query(session).filter_by(id=session.query(func.max(Block.id)).one()[0]).first()
+
+    if best_block:
+        best_block_datetime = best_block.datetime.replace(tzinfo=pytz.UTC).timestamp() * 1000
+        best_block_nr = best_block.id
+    else:
+        best_block_datetime = None
+        best_block_nr = None
+
+    return {
+        'best_block_datetime': best_block_datetime,
+        'best_block_nr': best_block_nr,
+        'sequencer_task': sequencer_task.value,
+        'sequencer_head': sequencer_head,
+        'integrity_head': int(integrity_head.value),
+        'chain_head_block_id': chain_head_block_id,
+        'chain_finalized_block_id': chain_finalized_block_id
+    }
+
+
+def get_harvester_queue(session):
+    """
+    Returns the response of the /queue route
+    """
+    last_known_block = Block.query(session).order_by(Block.id.desc()).first()
+
+    if not last_known_block:
+        return {
+            'status': 'success',
+            'data': {
+                'message': 'Harvester waiting for first run'
+            }
+        }
+
+    return {
+        'status': 'success',
+        'data': {
+            'harvester_head': last_known_block.id,
+            'block_process_queue': [
+                {'from': int(block_set['block_from']), 'to': int(block_set['block_to'])}
+                for block_set in Block.get_missing_block_ids(session)
+            ]
+        }
+    }
+
+
+class ChainHeadTracker:
+
+    def __init__(self, rpc_url, session_factory, interval=2.0, queue_interval=60.0, snapshot_ttl=30):
+        """
+        Parameters
+        ----------
+        rpc_url: node URL
+        session_factory: sessionmaker of the harvester database
+        interval: seconds between updates of the /status snapshot
+        queue_interval: seconds between updates of the /queue snapshot
+        snapshot_ttl: seconds after which a snapshot expires when not updated
+        """
+        self.rpc_url = rpc_url
+        self.session_factory = session_factory
+        self.interval = interval
+        self.queue_interval = queue_interval
+        self.snapshot_ttl = snapshot_ttl
+
+        self.substrate = None
+        self.queue_updated_at = None
+
+    def update(self):
+        if self.substrate is None:
+            self.substrate = SubstrateInterface(url=self.rpc_url, runtime_config=RuntimeConfiguration())
+
+        chain_head_block_id, chain_finalized_block_id = get_chain_heads(self.substrate)
+
+        session = self.session_factory()
+        try:
+            chain_state.store_snapshot(
+                'status',
+                get_harvester_status(session, chain_head_block_id, chain_finalized_block_id),
+                ttl=self.snapshot_ttl
+            )
+
+            if self.queue_updated_at is None or time.monotonic() - self.queue_updated_at >= self.queue_interval:
+                # Gap detection scans the whole block table, so the queue is refreshed less frequently
+                chain_state.store_snapshot(
+                    'queue', get_harvester_queue(session), ttl=self.snapshot_ttl + self.queue_interval
+                )
+                self.queue_updated_at = time.monotonic()
+        finally:
+            session.close()
+
+    def run(self):
+        while True:
+            started_at = time.monotonic()
+
+            try:
+                self.update()
+            except Exception as e:
+                # Snapshots expire when the tracker fails repeatedly, the API then computes them on request
+                print('! Head tracker could not update snapshots: {}'.format(e))
+                if self.substrate:
+                    self.substrate.close()
+                    self.substrate = None
+
+            time.sleep(max(self.interval - (time.monotonic() - started_at), 0))
+
+
+def main():
+    engine = create_engine(
+        settings.DB_CONNECTION, echo=settings.DEBUG, isolation_level="READ_UNCOMMITTED", pool_pre_ping=True
+    )
+
+    tracker = ChainHeadTracker(
+        rpc_url=settings.SUBSTRATE_RPC_URL,
+        session_factory=sessionmaker(bind=engine, autoflush=False, autocommit=False),
+        interval=settings.HEAD_TRACKER_INTERVAL,
+        queue_interval=settings.HEAD_TRACKER_QUEUE_INTERVAL,
+        snapshot_ttl=settings.HEAD_TRACKER_SNAPSHOT_TTL
+    )
+    tracker.run()
+
+
+if __name__ == '__main__':
+    main()
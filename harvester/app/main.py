@@ -35,16 +35,22 @@ from app.resources.harvester import PolkascanStartHarvesterResource, PolkascanSt
         DecodeContractEventAndExtrinsicResource
 from app.resources.tools import ExtractMetadataResource, ExtractExtrinsicsResource, \
     HealthCheckResource, ExtractEventsResource, CreateSnapshotResource
+from app.resources.metrics import MetricsResource
+from app.utils import metrics
 
 # Database connection
 engine = create_engine(DB_CONNECTION, echo=DEBUG, isolation_level="READ_UNCOMMITTED", pool_pre_ping=True)
 session_factory = sessionmaker(bind=engine, autoflush=False, autocommit=False)
 
+metrics.instrument_engine(engine)
+metrics.instrument_session_factory(session_factory)
+
 # Define application
 app = falcon.API(middleware=[ContextMiddleware(), SQLAlchemySessionManager(session_factory)])
 
 # Application routes
 app.add_route('/healthcheck', HealthCheckResource())
+app.add_route('/metrics', MetricsResource())
 
 app.add_route('/start', PolkascanStartHarvesterResource())
 app.add_route('/stop', PolkascanStopHarvesterResource())
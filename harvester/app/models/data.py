@@ -795,6 +795,12 @@ class SearchIndexType(BaseModel):
 
 class SearchIndex(BaseModel):
     __tablename__ = 'data_account_search_index'
+    __table_args__ = (
+        sa.Index(
+            'ix_data_account_search_index_account_type_block',
+            'account_id', 'index_type_id', sa.text('block_id DESC'), 'extrinsic_idx', 'event_idx'
+        ),
+    )
 
     id = sa.Column(sa.Integer(), primary_key=True, autoincrement=True)
     block_id = sa.Column(sa.Integer(), nullable=False, index=True)
@@ -106,6 +106,19 @@ class Processor(object):
         """
         pass
 
+    @classmethod
+    def accumulation_revert_bulk(cls, db_session, block_ids):
+        """
+        Set-based variant of `accumulation_revert` used when removing blocks, e.g. during a reorg; called once per
+        processor class for all removed blocks, so only statements filtering on block id are possible here
+        :param db_session:
+        :type db_session: sqlalchemy.orm.Session
+        :param block_ids: ids of the blocks being removed
+        :type block_ids: list
+        :return:
+        """
+        pass
+
     def sequencing_hook(self, db_session, parent_block, parent_sequenced_block):
         """
         Hook during sequencing phase, which means processing block for block from genesis to chaintip where this order
@@ -22,7 +22,6 @@ import binascii
 import dateutil
 from sqlalchemy import distinct
 
-from sqlalchemy.orm.exc import NoResultFound
 from substrateinterface.utils.hasher import blake2_256
 
 from app import settings, utils
@@ -40,25 +39,42 @@ from scalecodec.types import LogDigest
 
 class LogBlockProcessor(BlockProcessor):
 
-    def accumulation_hook(self, db_session):
+    def get_decoded_logs(self):
+        # Logs decoded by the decode stage of add_block
+        decoded_logs = getattr(self.block, '_decoded_logs', None)
+        if decoded_logs is not None:
+            return decoded_logs
+
         log_digest_cls = self.substrate.runtime_config.get_decoder_class('sp_runtime::generic::digest::DigestItem')
 
         if log_digest_cls is None:
             raise NotImplementedError("No decoding class found for 'DigestItem'")
 
-        self.block.count_log = len(self.block.logs)
-
-        for idx, log_data in enumerate(self.block.logs):
-            log_digest = log_digest_cls(data=ScaleBytes(log_data))
+        decoded_logs = []
+        for log_data in self.block.logs:
+            log_digest = log_digest_cls(data=ScaleBytes(log_data), runtime_config=self.substrate.runtime_config)
             log_digest.decode()
 
-            log_type = log_digest.value_object[0]  # ('PreRuntime', GenericPreRuntime)
-            # print(log_digest.value[log_type])
+            decoded_logs.append({
+                'index': log_digest.index,
+                'type': log_digest.value_object[0],  # ('PreRuntime', GenericPreRuntime)
+                'value': log_digest.value
+            })
+
+        return decoded_logs
+
+    def accumulation_hook(self, db_session):
+        self.block.count_log = len(self.block.logs)
+
+        for idx, decoded_log in enumerate(self.get_decoded_logs()):
+            log_type = decoded_log['type']
+            log_value = decoded_log['value']
+            # print(log_value[log_type])
             log_inner_data = {}
             if ('PreRuntime' == log_type or 'Seal' == log_type) and self.substrate.implements_scaleinfo():
-                engine_id = bytes.fromhex(log_digest.value[log_type][0][2:]).decode('utf-8')
+                engine_id = bytes.fromhex(log_value[log_type][0][2:]).decode('utf-8')
                 if engine_id == 'aura' and 'PreRuntime' == log_type:
-                    predigest_data = log_digest.value['PreRuntime'][1]
+                    predigest_data = log_value['PreRuntime'][1]
                     try:
                         if predigest_data[:2] != '0x':
                             predigest_data = ScaleBytes(f"0x{predigest_data.encode().hex()}")
@@ -68,17 +84,17 @@ class LogBlockProcessor(BlockProcessor):
                         predigest_data = ScaleBytes(f"0x{predigest_data.encode().hex()}")
                     aura_predigest = self.substrate.runtime_config.create_scale_object(
                         type_string='RawAuraPreDigest',
-                        # data=ScaleBytes(log_digest.value['PreRuntime'][1])
+                        # data=ScaleBytes(log_value['PreRuntime'][1])
                         data=predigest_data
                     )
                     aura_predigest.decode()
                     slot_number = aura_predigest.value['slot_number']
                     log_inner_data = {"data": {"slot_number": slot_number}, "engine": "aura"}
                 elif engine_id == 'aura' and 'Seal' == log_type:
-                    log_inner_data = {"data": log_digest.value['Seal'][1], "engine": "aura"}
+                    log_inner_data = {"data": log_value['Seal'][1], "engine": "aura"}
 
                 elif engine_id == 'BABE' and 'PreRuntime' == log_type:
-                    predigest_data = log_digest.value['PreRuntime'][1]
+                    predigest_data = log_value['PreRuntime'][1]
                     try:
                         if predigest_data[:2] != '0x':
                             predigest_data = ScaleBytes(f"0x{predigest_data.encode().hex()}")
@@ -88,7 +104,7 @@ class LogBlockProcessor(BlockProcessor):
                         predigest_data = ScaleBytes(f"0x{predigest_data.encode().hex()}")
                     babe_predigest = self.substrate.runtime_config.create_scale_object(
                         type_string='RawBabePreDigest',
-                        # data=ScaleBytes(log_digest.value['PreRuntime'][1])
+                        # data=ScaleBytes(log_value['PreRuntime'][1])
                         data=predigest_data
                     )
                     babe_predigest.decode()
@@ -97,17 +113,17 @@ class LogBlockProcessor(BlockProcessor):
                     log_inner_data = {"data": {"slot_number": slot_number, "authority_index": rank_validator},
                                       "engine": "BABE"}
                 elif engine_id == 'BABE' and 'Seal' == log_type:
-                    log_inner_data = {"data": log_digest.value['Seal'][1], "engine": "BABE"}
+                    log_inner_data = {"data": log_value['Seal'][1], "engine": "BABE"}
             else:
-                if type(log_digest.value) == str:
-                    log_inner_data = log_digest.value
+                if type(log_value) == str:
+                    log_inner_data = log_value
                 else:
-                    log_inner_data = log_digest.value[log_type]
+                    log_inner_data = log_value[log_type]
 
             log = Log(
                 block_id=self.block.id,
                 log_idx=idx,
-                type_id=log_digest.index,
+                type_id=decoded_log['index'],
                 type=log_type,
                 data=log_inner_data,
             )
@@ -124,12 +140,15 @@ class LogBlockProcessor(BlockProcessor):
             log.save(db_session)
 
     def accumulation_revert(self, db_session):
-        for item in Log.query(db_session).filter_by(block_id=self.block.id):
-            db_session.delete(item)
+        self.accumulation_revert_bulk(db_session, [self.block.id])
 
         self.block.authority_index = None
         self.block.slot_number = None
 
+    @classmethod
+    def accumulation_revert_bulk(cls, db_session, block_ids):
+        Log.query(db_session).filter(Log.block_id.in_(block_ids)).delete(synchronize_session=False)
+
 
 class BlockTotalProcessor(BlockProcessor):
 
@@ -209,10 +228,17 @@ class AccountBlockProcessor(BlockProcessor):
 
     def sequencing_hook(self, db_session, parent_block_data, parent_sequenced_block_data):
 
-        for account_audit in AccountAudit.query(db_session).filter_by(block_id=self.block.id).order_by('event_idx'):
-            try:
-                account = Account.query(db_session).filter_by(id=account_audit.account_id).one()
+        account_audits = AccountAudit.query(db_session).filter_by(block_id=self.block.id).order_by('event_idx').all()
 
+        # Load all affected accounts of this block with one query
+        accounts = self.get_accounts(db_session, [account_audit.account_id for account_audit in account_audits])
+
+        new_accounts = []
+
+        for account_audit in account_audits:
+            account = accounts.get(account_audit.account_id)
+
+            if account:
                 if account_audit.type_id == settings.ACCOUNT_AUDIT_TYPE_REAPED:
                     account.count_reaped += 1
                     account.is_reaped = True
@@ -233,7 +259,7 @@ class AccountBlockProcessor(BlockProcessor):
 
                 account.updated_at_block = self.block.id
 
-            except NoResultFound:
+            else:
                 account = Account(
                     id=account_audit.account_id,
                     address=ss58_encode(account_audit.account_id, settings.SUBSTRATE_ADDRESS_TYPE),
@@ -247,41 +273,84 @@ class AccountBlockProcessor(BlockProcessor):
                     updated_at_block=self.block.id
                 )
 
-                # Retrieve index in corresponding account
-                account_index = AccountIndex.query(db_session).filter_by(account_id=account.id).first()
+                accounts[account.id] = account
+                new_accounts.append(account)
 
-                if account_index:
-                    account.index_address = account_index.short_address
-
-                # Retrieve and set initial balance
-                self.update_account_info(account)
-                
                 # # If reaped but does not exist, create new account for now
                 # if account_audit.type_id != ACCOUNT_AUDIT_TYPE_NEW:
                 #     account.is_reaped = True
                 #     account.count_reaped = 1
 
-            account.save(db_session)
+        # Retrieve index in corresponding account
+        if new_accounts:
+            for account_index in AccountIndex.query(db_session).filter(
+                    AccountIndex.account_id.in_([account.id for account in new_accounts])
+            ):
+                accounts[account_index.account_id].index_address = account_index.short_address
 
         # Until SUDO and batch calls are processed separately we need to do a safety check to be sure we include all
         # accounts that have activity (lookup in account_index) in current block
         # TODO implement calls
 
+        search_index_account_ids = set()
         for search_index in db_session.query(SearchIndex.account_id).filter(
-                SearchIndex.block_id == self.block.id,
-                SearchIndex.account_id.notin_(db_session.query(Account.id))
+                SearchIndex.block_id == self.block.id
         ).distinct():
             hex_account_id, ss58_address = get_account_id_and_ss58_address(search_index.account_id, settings.SUBSTRATE_ADDRESS_TYPE)
-            account = Account(
-                id=hex_account_id,
-                address=ss58_encode(hex_account_id, settings.SUBSTRATE_ADDRESS_TYPE),
-                hash_blake2b=blake2_256(binascii.unhexlify(hex_account_id)),
-                created_at_block=self.block.id,
-                updated_at_block=self.block.id
+            if hex_account_id not in accounts:
+                search_index_account_ids.add(hex_account_id)
+
+        accounts.update(self.get_accounts(db_session, search_index_account_ids))
+
+        for hex_account_id in search_index_account_ids:
+            if hex_account_id not in accounts:
+                account = Account(
+                    id=hex_account_id,
+                    address=ss58_encode(hex_account_id, settings.SUBSTRATE_ADDRESS_TYPE),
+                    hash_blake2b=blake2_256(binascii.unhexlify(hex_account_id)),
+                    created_at_block=self.block.id,
+                    updated_at_block=self.block.id
+                )
+                accounts[account.id] = account
+                new_accounts.append(account)
+
+        # Retrieve and set initial balances with one multi-key storage read
+        self.update_accounts_info(new_accounts)
+
+        db_session.add_all(new_accounts)
+        db_session.flush()
+
+    @staticmethod
+    def get_accounts(db_session, account_ids):
+        account_ids = set(account_ids)
+        if not account_ids:
+            return {}
+
+        return {account.id: account for account in Account.query(db_session).filter(Account.id.in_(account_ids))}
+
+    def update_accounts_info(self, accounts: list):
+        if not accounts:
+            return
+
+        try:
+            account_infos = utils.query_storage_multi(
+                pallet_name='System',
+                storage_name='Account',
+                substrate=self.substrate,
+                block_hash=self.block.hash,
+                params_list=[['0x{}'.format(account.id)] for account in accounts]
             )
-            self.update_account_info(account)
-            account.save(db_session)
-    
+        except ValueError as e:
+            print("ValueError: {}".format(e))
+            return
+        except NotImplementedError as e:
+            print("NotImplementedError: {}. Block: ${}".format(e, self.block.hash))
+            raise
+
+        for account, account_info_data_storage in zip(accounts, account_infos):
+            if account_info_data_storage:
+                self.set_account_info(account, account_info_data_storage.value)
+
     def update_account_info(self, account: Account):
         try:
             account_info_data_storage = utils.query_storage(pallet_name='System', storage_name='Account',
@@ -289,11 +358,7 @@ class AccountBlockProcessor(BlockProcessor):
                                                             params=['0x{}'.format(account.id)],
                                                             block_hash=self.block.hash)
             if account_info_data_storage:
-                account_info_data = account_info_data_storage.value
-                account.balance_free = account_info_data["data"]["free"]
-                account.balance_reserved = account_info_data["data"]["reserved"]
-                account.balance_total = account_info_data["data"]["free"] + account_info_data["data"]["reserved"]
-                account.nonce = account_info_data["nonce"]
+                self.set_account_info(account, account_info_data_storage.value)
         except ValueError as e:
             print("ValueError: {}".format(e))
             pass
@@ -301,6 +366,13 @@ class AccountBlockProcessor(BlockProcessor):
             print("NotImplementedError: {}. Block: ${}".format(e, self.block.hash))
             raise
 
+    @staticmethod
+    def set_account_info(account: Account, account_info_data):
+        account.balance_free = account_info_data["data"]["free"]
+        account.balance_reserved = account_info_data["data"]["reserved"]
+        account.balance_total = account_info_data["data"]["free"] + account_info_data["data"]["reserved"]
+        account.nonce = account_info_data["nonce"]
+
 
 class AccountIndexBlockProcessor(BlockProcessor):
 
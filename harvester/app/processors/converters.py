@@ -24,7 +24,7 @@ import math
 
 from app import settings, utils
 
-from sqlalchemy import func, distinct
+from sqlalchemy import func, distinct, literal, select
 from sqlalchemy.exc import SQLAlchemyError
 from app.models.harvester import Status
 from app.processors import NewSessionEventProcessor, Log, SlashEventProcessor, BalancesTransferProcessor, \
@@ -36,9 +36,11 @@ from scalecodec.types import Extrinsic
 from app.processors.base import BaseService, ProcessorRegistry
 from scalecodec.type_registry import load_type_registry_file
 from substrateinterface import SubstrateInterface, logger
-from substrateinterface.exceptions import SubstrateRequestException
 from substrateinterface.utils.hasher import xxh128
 from app.utils.ss58 import ss58_decode, get_account_id_and_ss58_address
+from app.utils import metrics, chain_state
+from app.utils.block_decoder import BlockDecoder
+from app.utils.rpc_cache import get_rpc_cache
 
 from app.models.data import Extrinsic, Block, Event, Runtime, RuntimeModule, RuntimeCall, RuntimeCallParam, \
     RuntimeEvent, RuntimeEventAttribute, RuntimeType, RuntimeStorage, BlockTotal, RuntimeConstant, AccountAudit, \
@@ -78,10 +80,24 @@ class PolkascanHarvesterService(BaseService):
         self.substrate = SubstrateInterface(
             url=settings.SUBSTRATE_RPC_URL,
             type_registry=custom_type_registry,
-            type_registry_preset=type_registry
+            type_registry_preset=type_registry,
+            rpc_cache=get_rpc_cache(),
+            load_balancing=settings.RPC_LOAD_BALANCING,
+            endpoint_options={'max_block_lag': settings.RPC_MAX_BLOCK_LAG}
         )
+        metrics.instrument_substrate(self.substrate)
         self.metadata_store = {}
 
+        self.block_decoder = BlockDecoder(
+            self.substrate,
+            processes=settings.DECODE_PROCESSES,
+            prefetch_blocks=settings.DECODE_PREFETCH_BLOCKS,
+            type_registry_preset=type_registry,
+            custom_type_registry=custom_type_registry,
+            load_balancing=settings.RPC_LOAD_BALANCING,
+            endpoint_options={'max_block_lag': settings.RPC_MAX_BLOCK_LAG}
+        )
+
     def process_genesis(self, block):
         self.substrate.init_runtime(block_hash=block.hash)
         # Set block time of parent block
@@ -461,7 +477,21 @@ class PolkascanHarvesterService(BaseService):
                 print(e)
                 self.db_session.rollback()
 
-    def add_block(self, block_hash):
+    @metrics.time_operation('add_block')
+    def add_block(self, block_hash, decoded_block=None):
+        """
+        Adds the block with given hash and all its extrinsics and events, and runs the processors
+
+        Parameters
+        ----------
+        block_hash
+        decoded_block: tuple of the raw payload and the decoded block as yielded by `BlockDecoder.iter_blocks`, the
+        block is retrieved and decoded here when omitted
+
+        Returns
+        -------
+        Block
+        """
 
         # Check if block is already process
         if Block.query(self.db_session).filter_by(hash=block_hash).count() > 0:
@@ -470,30 +500,32 @@ class PolkascanHarvesterService(BaseService):
         if settings.SUBSTRATE_MOCK_EXTRINSICS:
             self.substrate.mock_extrinsics = settings.SUBSTRATE_MOCK_EXTRINSICS
 
-        json_block = self.substrate.get_block(block_hash, include_author=False)
-        header = json_block['header']
-        parent_hash = header['parentHash']
-        block_id = header['number']
-        extrinsics_root = header['extrinsicsRoot']
-        state_root = header['stateRoot']
-        digest_logs = []
-        for idx, log_data in enumerate(header.get('digest', {}).get('logs', [])):
-            digest_logs.append(log_data.data.to_hex())
+        with metrics.time_stage('add_block', 'get_block', decode=True):
+            if decoded_block is None:
+                decoded_block = self.block_decoder.decode_block(block_hash)
 
-        # ==== Get block runtime from Substrate ==================
+            payload, decoded = decoded_block
 
-        self.process_metadata(self.substrate.runtime_version, block_hash)
+            # Processors use the runtime of the block
+            self.substrate.init_runtime(block_hash=block_hash)
 
-        # ==== Get parent block runtime ===================
+        parent_hash = payload['parent_hash']
+        block_id = payload['number']
+        extrinsics_root = payload['extrinsics_root']
+        state_root = payload['state_root']
+        digest_logs = payload['logs']
 
-        if block_id > 0:
-            json_parent_runtime_version = self.substrate.get_block_runtime_version(parent_hash)
+        # ==== Get block runtime from Substrate ==================
 
-            parent_spec_version = json_parent_runtime_version.get('specVersion', 0)
+        with metrics.time_stage('add_block', 'process_metadata'):
+            self.process_metadata(self.substrate.runtime_version, block_hash)
 
-            self.process_metadata(parent_spec_version, parent_hash)
-        else:
-            parent_spec_version = self.substrate.runtime_version
+            # ==== Get parent block runtime ===================
+
+            parent_spec_version = payload['parent_spec_version']
+
+            if block_id > 0:
+                self.process_metadata(parent_spec_version, parent_hash)
 
         # ==== Set initial block properties =====================
 
@@ -533,81 +565,68 @@ class PolkascanHarvesterService(BaseService):
         # Set temp helper variables
         block._accounts_new = []
         block._accounts_reaped = []
+        block._decoded_logs = decoded['logs']
 
         # ==== Get block events from Substrate ==================
         extrinsic_success_idx = {}
         events = []
-        try:
-            # TODO implemented solution in substrate interface for runtime transition blocks
-            # Events are decoded against runtime of parent block
-            RuntimeConfiguration().set_active_spec_version_id(parent_spec_version)
-            # events_decoder = self.substrate.get_block_events(block_hash, self.metadata_store[parent_spec_version])
-            events_decoder = self.substrate.get_events(block_hash)
-
-            # Revert back to current runtime
-            RuntimeConfiguration().set_active_spec_version_id(block.spec_version_id)
-
-            event_idx = 0
-
-            for event in events_decoder:
-                event.value['module_id'] = event.value['module_id'].lower()
-
-                model = Event(
-                    block_id=block_id,
-                    event_idx=event_idx,
-                    phase=event.value_object['phase'].index,
-                    extrinsic_idx=event.value['extrinsic_idx'],
-                    type=event.value.get('event_index') or event.value.get('type'),
-                    spec_version_id=parent_spec_version,
-                    module_id=event.value['module_id'],
-                    event_id=event.value['event_id'],
-                    system=int(event.value['module_id'] == 'system'),
-                    module=int(event.value['module_id'] != 'system'),
-                    # attributes=event.value['params'],
-                    attributes=event.params,
-                    codec_error=False
-                )
 
-                # Process event
-                # if model.module_id == 'balances' and model.event_id == 'Transfer':
-                #     block.count_events_transfer += 1
+        # Events are decoded against runtime of parent block
+        events_data = decoded['events']
 
-                if event.value_object['phase'].index == 0:
-                    block.count_events_extrinsic += 1
-                elif event.value_object['phase'].index == 1:
-                    block.count_events_finalization += 1
+        for event_idx, event in enumerate(events_data):
+            event_value = event['value']
+            event_value['module_id'] = event_value['module_id'].lower()
 
-                if event.value['module_id'] == 'system':
+            model = Event(
+                block_id=block_id,
+                event_idx=event_idx,
+                phase=event['phase'],
+                extrinsic_idx=event_value['extrinsic_idx'],
+                type=event_value.get('event_index') or event_value.get('type'),
+                spec_version_id=parent_spec_version,
+                module_id=event_value['module_id'],
+                event_id=event_value['event_id'],
+                system=int(event_value['module_id'] == 'system'),
+                module=int(event_value['module_id'] != 'system'),
+                attributes=event['params'],
+                codec_error=False
+            )
 
-                    block.count_events_system += 1
+            # Process event
+            # if model.module_id == 'balances' and model.event_id == 'Transfer':
+            #     block.count_events_transfer += 1
 
-                    # Store result of extrinsic
-                    if event.value['event_id'] == 'ExtrinsicSuccess':
-                        extrinsic_success_idx[event.value['extrinsic_idx']] = True
-                        block.count_extrinsics_success += 1
+            if event['phase'] == 0:
+                block.count_events_extrinsic += 1
+            elif event['phase'] == 1:
+                block.count_events_finalization += 1
 
-                    if event.value['event_id'] == 'ExtrinsicFailed':
-                        extrinsic_success_idx[event.value['extrinsic_idx']] = False
-                        block.count_extrinsics_error += 1
-                else:
+            if event_value['module_id'] == 'system':
 
-                    block.count_events_module += 1
+                block.count_events_system += 1
 
-                model.save(self.db_session)
+                # Store result of extrinsic
+                if event_value['event_id'] == 'ExtrinsicSuccess':
+                    extrinsic_success_idx[event_value['extrinsic_idx']] = True
+                    block.count_extrinsics_success += 1
 
-                events.append(model)
+                if event_value['event_id'] == 'ExtrinsicFailed':
+                    extrinsic_success_idx[event_value['extrinsic_idx']] = False
+                    block.count_extrinsics_error += 1
+            else:
+
+                block.count_events_module += 1
 
-                event_idx += 1
+            model.save(self.db_session)
 
-            block.count_events = len(events_decoder)
+            events.append(model)
 
-        except SubstrateRequestException as e:
-            print(e)
-            block.count_events = 0
+        block.count_events = len(events_data)
 
         # === Extract extrinsics from block ====
 
-        extrinsics_data = json_block['extrinsics']
+        extrinsics_data = decoded['extrinsics']
 
         block.count_extrinsics = len(extrinsics_data)
 
@@ -619,7 +638,7 @@ class PolkascanHarvesterService(BaseService):
 
             extrinsic_success = extrinsic_success_idx.get(extrinsic_idx, False)
 
-            value = extrinsic.value
+            value = extrinsic['value']
             # print(value)
             # print("=====extrinsic.value=====")
             # print(extrinsic.value_object)
@@ -647,10 +666,10 @@ class PolkascanHarvesterService(BaseService):
                 extrinsic_hash=extrinsic_hash,
                 extrinsic_length=value.get('extrinsic_length'),
                 extrinsic_version=version_info,
-                signed=extrinsic.signed,
-                unsigned=not extrinsic.signed,
-                signedby_address=bool(extrinsic.signed and 'address' in value),
-                signedby_index=bool(extrinsic.signed and 'account_index' in value),
+                signed=extrinsic['signed'],
+                unsigned=not extrinsic['signed'],
+                signedby_address=bool(extrinsic['signed'] and 'address' in value),
+                signedby_index=bool(extrinsic['signed'] and 'account_index' in value),
                 address_length=value.get('account_length', None),
                 address=address,
                 account_index=value.get('account_index', None),
@@ -674,7 +693,7 @@ class PolkascanHarvesterService(BaseService):
             extrinsic_idx += 1
 
             # Process extrinsic
-            if extrinsic.signed:
+            if extrinsic['signed']:
                 block.count_extrinsics_signed += 1
 
                 if model.signedby_address:
@@ -698,8 +717,9 @@ class PolkascanHarvesterService(BaseService):
             # Process extrinsic processors
             for processor_class in ProcessorRegistry().get_extrinsic_processors(model.module_id, model.call_id):
                 extrinsic_processor = processor_class(block, model, substrate=self.substrate)
-                extrinsic_processor.accumulation_hook(self.db_session)
-                extrinsic_processor.process_search_index(self.db_session)
+                with metrics.time_processor(extrinsic_processor, 'accumulation_hook'):
+                    extrinsic_processor.accumulation_hook(self.db_session)
+                    extrinsic_processor.process_search_index(self.db_session)
 
         # Process event processors
         for event in events:
@@ -714,21 +734,24 @@ class PolkascanHarvesterService(BaseService):
                 event_processor = processor_class(block, event, extrinsic,
                                                   metadata=self.metadata_store.get(block.spec_version_id),
                                                   substrate=self.substrate)
-                event_processor.accumulation_hook(self.db_session)
-                event_processor.process_search_index(self.db_session)
+                with metrics.time_processor(event_processor, 'accumulation_hook'):
+                    event_processor.accumulation_hook(self.db_session)
+                    event_processor.process_search_index(self.db_session)
 
         # Process block processors
         for processor_class in ProcessorRegistry().get_block_processors():
             block_processor = processor_class(block, substrate=self.substrate, harvester=self)
-            block_processor.accumulation_hook(self.db_session)
+            with metrics.time_processor(block_processor, 'accumulation_hook'):
+                block_processor.accumulation_hook(self.db_session)
 
         # Debug info
         if settings.DEBUG:
-            block.debug_info = json_block
+            block.debug_info = payload
 
         # ==== Save data block ==================================
 
-        block.save(self.db_session)
+        with metrics.time_stage('add_block', 'save'):
+            block.save(self.db_session)
 
         return block
 
@@ -736,33 +759,47 @@ class PolkascanHarvesterService(BaseService):
         # Retrieve block
         block = Block.query(self.db_session).filter_by(hash=block_hash).first()
 
-        # Revert event processors
-        for event in Event.query(self.db_session).filter_by(block_id=block.id):
-            for processor_class in ProcessorRegistry().get_event_processors(event.module_id, event.event_id):
-                event_processor = processor_class(block, event, None)
-                event_processor.accumulation_revert(self.db_session)
+        self.remove_blocks([block])
+
+    def remove_blocks(self, blocks):
+        """
+        Reverts processors and deletes all data of the given blocks with one statement per table
+        """
+        block_ids = [block.id for block in blocks]
+
+        # Revert event processors, once per processor class for all blocks
+        processor_classes = set()
+
+        event_types = self.db_session.query(Event.module_id, Event.event_id).filter(
+            Event.block_id.in_(block_ids)
+        ).distinct()
+
+        for module_id, event_id in event_types:
+            processor_classes.update(ProcessorRegistry().get_event_processors(module_id, event_id))
 
         # Revert extrinsic processors
-        for extrinsic in Extrinsic.query(self.db_session).filter_by(block_id=block.id):
-            for processor_class in ProcessorRegistry().get_extrinsic_processors(extrinsic.module_id, extrinsic.call_id):
-                extrinsic_processor = processor_class(block, extrinsic)
-                extrinsic_processor.accumulation_revert(self.db_session)
+        extrinsic_types = self.db_session.query(Extrinsic.module_id, Extrinsic.call_id).filter(
+            Extrinsic.block_id.in_(block_ids)
+        ).distinct()
+
+        for module_id, call_id in extrinsic_types:
+            processor_classes.update(ProcessorRegistry().get_extrinsic_processors(module_id, call_id))
 
         # Revert block processors
-        for processor_class in ProcessorRegistry().get_block_processors():
-            block_processor = processor_class(block)
-            block_processor.accumulation_revert(self.db_session)
+        processor_classes.update(ProcessorRegistry().get_block_processors())
+
+        for processor_class in processor_classes:
+            processor_class.accumulation_revert_bulk(self.db_session, block_ids)
 
-        # Delete events
-        for item in Event.query(self.db_session).filter_by(block_id=block.id):
-            self.db_session.delete(item)
-        # Delete extrinsics
-        for item in Extrinsic.query(self.db_session).filter_by(block_id=block.id):
-            self.db_session.delete(item)
+        # Delete search index entries, events and extrinsics
+        for model in [SearchIndex, Event, Extrinsic]:
+            model.query(self.db_session).filter(model.block_id.in_(block_ids)).delete(synchronize_session=False)
 
-        # Delete block
-        self.db_session.delete(block)
+        # Delete blocks
+        for block in blocks:
+            self.db_session.delete(block)
 
+    @metrics.time_operation('sequence_block')
     def sequence_block(self, block, parent_block_data=None, parent_sequenced_block_data=None):
 
         sequenced_block = BlockTotal(
@@ -772,11 +809,12 @@ class PolkascanHarvesterService(BaseService):
         # Process block processors
         for processor_class in ProcessorRegistry().get_block_processors():
             block_processor = processor_class(block, sequenced_block, substrate=self.substrate)
-            block_processor.sequencing_hook(
-                self.db_session,
-                parent_block_data,
-                parent_sequenced_block_data
-            )
+            with metrics.time_processor(block_processor, 'sequencing_hook'):
+                block_processor.sequencing_hook(
+                    self.db_session,
+                    parent_block_data,
+                    parent_sequenced_block_data
+                )
 
         extrinsics = Extrinsic.query(self.db_session).filter_by(block_id=block.id).order_by('extrinsic_idx')
 
@@ -784,11 +822,12 @@ class PolkascanHarvesterService(BaseService):
             # Process extrinsic processors
             for processor_class in ProcessorRegistry().get_extrinsic_processors(extrinsic.module_id, extrinsic.call_id):
                 extrinsic_processor = processor_class(block, extrinsic, substrate=self.substrate)
-                extrinsic_processor.sequencing_hook(
-                    self.db_session,
-                    parent_block_data,
-                    parent_sequenced_block_data
-                )
+                with metrics.time_processor(extrinsic_processor, 'sequencing_hook'):
+                    extrinsic_processor.sequencing_hook(
+                        self.db_session,
+                        parent_block_data,
+                        parent_sequenced_block_data
+                    )
 
         events = Event.query(self.db_session).filter_by(block_id=block.id).order_by('event_idx')
 
@@ -803,20 +842,25 @@ class PolkascanHarvesterService(BaseService):
 
             for processor_class in ProcessorRegistry().get_event_processors(event.module_id, event.event_id):
                 event_processor = processor_class(block, event, extrinsic, substrate=self.substrate)
-                event_processor.sequencing_hook(
-                    self.db_session,
-                    parent_block_data,
-                    parent_sequenced_block_data
-                )
+                with metrics.time_processor(event_processor, 'sequencing_hook'):
+                    event_processor.sequencing_hook(
+                        self.db_session,
+                        parent_block_data,
+                        parent_sequenced_block_data
+                    )
 
         sequenced_block.save(self.db_session)
 
         return sequenced_block
 
+    @metrics.time_operation('integrity_checks')
     def integrity_checks(self):
 
         # 1. Check finalized head
-        substrate = SubstrateInterface(url=settings.SUBSTRATE_RPC_URL, runtime_config=RuntimeConfiguration())
+        substrate = SubstrateInterface(
+            url=settings.SUBSTRATE_RPC_URL, runtime_config=RuntimeConfiguration(), rpc_cache=get_rpc_cache()
+        )
+        metrics.instrument_substrate(substrate)
 
         if settings.FINALIZATION_BY_BLOCK_CONFIRMATIONS > 0:
             finalized_block_hash = substrate.get_chain_head()
@@ -867,14 +911,15 @@ class PolkascanHarvesterService(BaseService):
                             self.process_reorg_block(parent_block)
                             self.process_reorg_block(block)
 
-                            self.remove_block(block.hash)
-                            self.remove_block(parent_block.hash)
+                            self.remove_blocks([block, parent_block])
                             self.db_session.commit()
 
                             self.add_block(substrate.get_block_hash(block.id))
                             self.add_block(substrate.get_block_hash(parent_block.id))
                             self.db_session.commit()
 
+                            chain_state.publish_reorg(parent_block.id)
+
                             integrity_head.value = parent_block.id - 1
 
                             # Save integrity head if block hash of parent matches with hash in node
@@ -909,6 +954,8 @@ class PolkascanHarvesterService(BaseService):
         if not integrity_head.value:
             integrity_head.value = 0
 
+        chain_state.publish_finalized_head(integrity_head.value)
+
         # 3. Check sequence head
         sequencer_head = self.db_session.query(func.max(BlockTotal.id)).one()[0]
 
@@ -961,6 +1008,8 @@ class PolkascanHarvesterService(BaseService):
             sequenced_block = self.sequence_block(block, parent_block_data, sequencer_parent_block_data)
             self.db_session.commit()
 
+            chain_state.publish_sequencer_head(sequenced_block.id)
+
             parent_block = block
             sequencer_parent_block = sequenced_block
 
@@ -974,20 +1023,28 @@ class PolkascanHarvesterService(BaseService):
         # Check if reorg already exists
         if ReorgBlock.query(self.db_session).filter_by(hash=block.hash).count() == 0:
 
-            model = ReorgBlock(**block.asdict())
-            model.save(self.db_session)
+            self.copy_to_reorg_table(Block, ReorgBlock, Block.id == block.id)
+            self.copy_to_reorg_table(Extrinsic, ReorgExtrinsic, Extrinsic.block_id == block.id, block.hash)
+            self.copy_to_reorg_table(Event, ReorgEvent, Event.block_id == block.id, block.hash)
+            self.copy_to_reorg_table(Log, ReorgLog, Log.block_id == block.id, block.hash)
 
-            for extrinsic in Extrinsic.query(self.db_session).filter_by(block_id=block.id):
-                model = ReorgExtrinsic(block_hash=block.hash, **extrinsic.asdict())
-                model.save(self.db_session)
+    def copy_to_reorg_table(self, model, reorg_model, condition, block_hash=None):
+        """
+        Copies rows to their reorg table with a single INSERT ... SELECT
+        """
+        source_table = model.__table__
+        column_names = [column.name for column in reorg_model.__table__.columns
+                        if column.name in source_table.columns and not (block_hash and column.name == 'block_hash')]
 
-            for event in Event.query(self.db_session).filter_by(block_id=block.id):
-                model = ReorgEvent(block_hash=block.hash, **event.asdict())
-                model.save(self.db_session)
+        columns = [source_table.columns[name] for name in column_names]
 
-            for log in Log.query(self.db_session).filter_by(block_id=block.id):
-                model = ReorgLog(block_hash=block.hash, **log.asdict())
-                model.save(self.db_session)
+        if block_hash:
+            column_names.insert(0, 'block_hash')
+            columns.insert(0, literal(block_hash).label('block_hash'))
+
+        self.db_session.execute(
+            reorg_model.__table__.insert().from_select(column_names, select(columns).where(condition))
+        )
 
     def rebuild_search_index(self):
 
@@ -1051,25 +1108,30 @@ class PolkascanHarvesterService(BaseService):
             print('create_full_balance_snaphot', storage_method.type['Map'])
             if "Blake2_128Concat" in storage_method.type['Map']['hashers']:
 
-                # get balances storage prefix
-                storage_key_prefix = self.substrate.generate_storage_hash(
-                    storage_module='System',
-                    storage_function='Account'
-                )
-
-                rpc_result = self.substrate.rpc_request(
-                    'state_getKeys',
-                    [storage_key_prefix, block_hash]
-                ).get('result')
-                # Extract accounts from storage key
-                accounts = [storage_key[-64:] for storage_key in rpc_result if len(storage_key) == 162]
+                # Stream all accounts with their account info, instead of a storage query per account
+                for account_key, account_info in self.substrate.query_map_iter(
+                    module='System',
+                    storage_function='Account',
+                    block_hash=block_hash,
+                    page_size=1000
+                ):
+                    if account_key is None:
+                        continue
+
+                    account_id = (getattr(account_key, 'public_key', None) or account_key.value).replace('0x', '')
+
+                    self.save_balance_snapshot(
+                        block_id=block_id,
+                        account_id=account_id,
+                        account_info_data=account_info.value if account_info is not None else None
+                    )
             else:
                 # Retrieve accounts from database for legacy blocks
                 accounts = [account[0] for account in self.db_session.query(distinct(Account.id))]
 
-            for account_id in accounts:
+                for account_id in accounts:
 
-                self.create_balance_snapshot(block_id=block_id, account_id=account_id, block_hash=block_hash)
+                    self.create_balance_snapshot(block_id=block_id, account_id=account_id, block_hash=block_hash)
 
     def create_balance_snapshot(self, block_id, account_id, block_hash=None):
 
@@ -1084,34 +1146,38 @@ class PolkascanHarvesterService(BaseService):
                 params=['0x{}'.format(account_id)],
                 block_hash=block_hash
             ).get('result')
+        except ValueError:
+            return
 
-            # Make sure no rows inserted before processing this record
-            AccountInfoSnapshot.query(self.db_session).filter_by(block_id=block_id, account_id=account_id).delete()
+        self.save_balance_snapshot(block_id=block_id, account_id=account_id, account_info_data=account_info_data)
 
-            if account_info_data:
-                account_info_obj = AccountInfoSnapshot(
-                    block_id=block_id,
-                    account_id=account_id,
-                    account_info=account_info_data,
-                    balance_free=account_info_data["data"]["free"],
-                    balance_reserved=account_info_data["data"]["reserved"],
-                    balance_total=account_info_data["data"]["free"] + account_info_data["data"]["reserved"],
-                    nonce=account_info_data["nonce"]
-                )
-            else:
-                account_info_obj = AccountInfoSnapshot(
-                    block_id=block_id,
-                    account_id=account_id,
-                    account_info=None,
-                    balance_free=None,
-                    balance_reserved=None,
-                    balance_total=None,
-                    nonce=None
-                )
+    def save_balance_snapshot(self, block_id, account_id, account_info_data):
 
-            account_info_obj.save(self.db_session)
-        except ValueError:
-            pass
+        # Make sure no rows inserted before processing this record
+        AccountInfoSnapshot.query(self.db_session).filter_by(block_id=block_id, account_id=account_id).delete()
+
+        if account_info_data:
+            account_info_obj = AccountInfoSnapshot(
+                block_id=block_id,
+                account_id=account_id,
+                account_info=account_info_data,
+                balance_free=account_info_data["data"]["free"],
+                balance_reserved=account_info_data["data"]["reserved"],
+                balance_total=account_info_data["data"]["free"] + account_info_data["data"]["reserved"],
+                nonce=account_info_data["nonce"]
+            )
+        else:
+            account_info_obj = AccountInfoSnapshot(
+                block_id=block_id,
+                account_id=account_id,
+                account_info=None,
+                balance_free=None,
+                balance_reserved=None,
+                balance_total=None,
+                nonce=None
+            )
+
+        account_info_obj.save(self.db_session)
 
     def update_account_balances(self):
         # set balances according to most recent snapshot
@@ -22,7 +22,7 @@ from packaging import version
 from scalecodec import ScaleBytes
 from scalecodec.base import RuntimeConfiguration
 import traceback
-from app import settings
+from app import settings, utils
 from app.models.data import Contract, Session, AccountAudit, \
     AccountIndexAudit, SessionTotal, SessionValidator, RuntimeStorage, \
     SessionNominator, IdentityAudit, IdentityJudgementAudit, Account, \
@@ -39,6 +39,7 @@ from substrateinterface import SubstrateInterface, ContractEvent, ContractMetada
     ContractInstance as SubstrateContractInterface, Keypair 
 from substrateinterface.exceptions import StorageFunctionNotFound
 from app.utils.ss58 import ss58_encode, get_account_id_and_ss58_address, ss58_decode
+from app.utils.rpc_cache import get_rpc_cache
 
 
 class NewSessionEventProcessor(EventProcessor):
@@ -46,6 +47,31 @@ class NewSessionEventProcessor(EventProcessor):
     module_id = 'session'
     event_id = 'NewSession'
 
+    def query_era_map(self, storage_function, era):
+        """
+        Retrieves all entries of a Staking storage double map for given era, keyed by stash account id without 0x
+        """
+        if era is None:
+            return {}
+
+        try:
+            # Stream the pages, retrieval of the next page overlaps with decoding of the current one
+            result = {
+                # Keyed by value, in the same encoding (SS58 or hex) as the accounts of Session.Validators
+                item_key.value.replace('0x', ''): item_value.value
+                for item_key, item_value in self.substrate.query_map_iter(
+                    module="Staking",
+                    storage_function=storage_function,
+                    params=[era],
+                    block_hash=self.block.hash,
+                    page_size=1000
+                ) if item_key is not None and item_value is not None
+            }
+        except StorageFunctionNotFound:
+            return {}
+
+        return result
+
     def add_session(self, db_session, session_id):
 
         nominators = []
@@ -72,91 +98,92 @@ class NewSessionEventProcessor(EventProcessor):
         except StorageFunctionNotFound:
             validators = []
 
+        # Retrieve exposures and preferences of all validators in the era with prefix scans
+        exposures = self.query_era_map("ErasStakers", current_era)
+        validators_prefs = self.query_era_map("ErasValidatorPrefs", current_era)
+
+        # Retrieve controller accounts and their ledgers with multi-key reads
+        try:
+            bonded = utils.query_storage_multi(
+                pallet_name="Staking",
+                storage_name="Bonded",
+                substrate=self.substrate,
+                block_hash=self.block.hash,
+                params_list=[[validator_account] for validator_account in validators]
+            )
+            validator_controllers = [item.value if item else None for item in bonded]
+        except (StorageFunctionNotFound, ValueError):
+            validator_controllers = [None] * len(validators)
+
+        try:
+            ledgers = utils.query_storage_multi(
+                pallet_name="Staking",
+                storage_name="Ledger",
+                substrate=self.substrate,
+                block_hash=self.block.hash,
+                params_list=[[controller] for controller in validator_controllers if controller]
+            )
+            validator_ledgers = {
+                controller: ledger.value for controller, ledger in
+                zip([controller for controller in validator_controllers if controller], ledgers) if ledger
+            }
+        except (StorageFunctionNotFound, ValueError):
+            validator_ledgers = {}
+
+        session_validators = []
+        session_nominators = []
+
         for rank_nr, validator_account in enumerate(validators):
-            validator_ledger = {}
             validator_session = None
 
             validator_stash = validator_account.replace('0x', '')
 
-            # Retrieve controller account
-            try:
-                validator_controller = self.substrate.get_runtime_state(
-                    module="Staking",
-                    storage_function="Bonded",
-                    params=[validator_account],
-                    block_hash=self.block.hash
-                ).get('result')
-
-                if validator_controller:
-                    validator_controller = validator_controller.replace('0x', '')
-            except StorageFunctionNotFound:
-                validator_controller = None
-
-            # Retrieve validator preferences for stash account
-            try:
-                validator_prefs = self.substrate.get_runtime_state(
-                    module="Staking",
-                    storage_function="ErasValidatorPrefs",
-                    params=[current_era, validator_account],
-                    block_hash=self.block.hash
-                ).get('result')
-            except StorageFunctionNotFound:
-                validator_prefs = None
+            validator_controller = validator_controllers[rank_nr]
+            validator_ledger = validator_ledgers.get(validator_controller) or {}
 
-            if not validator_prefs:
-                validator_prefs = {'commission': None}
+            if validator_controller:
+                validator_controller = validator_controller.replace('0x', '')
 
-            # Retrieve bonded
-            try:
-                exposure = self.substrate.get_runtime_state(
-                    module="Staking",
-                    storage_function="ErasStakers",
-                    params=[current_era, validator_account],
-                    block_hash=self.block.hash
-                ).get('result')
-            except StorageFunctionNotFound:
-                exposure = None
+            validator_prefs = validators_prefs.get(validator_stash) or {'commission': None}
 
-            if not exposure:
-                exposure = {}
+            exposure = exposures.get(validator_stash) or {}
 
             if exposure.get('total'):
                 bonded_nominators = exposure.get('total') - exposure.get('own')
             else:
                 bonded_nominators = None
 
-            session_validator = SessionValidator(
-                session_id=session_id,
-                validator_controller=validator_controller,
-                validator_stash=validator_stash,
-                bonded_total=exposure.get('total'),
-                bonded_active=validator_ledger.get('active'),
-                bonded_own=exposure.get('own'),
-                bonded_nominators=bonded_nominators,
-                validator_session=validator_session,
-                rank_validator=rank_nr,
-                unlocking=validator_ledger.get('unlocking'),
-                count_nominators=len(exposure.get('others', [])),
-                unstake_threshold=None,
-                commission=validator_prefs.get('commission')
-            )
-
-            session_validator.save(db_session)
+            session_validators.append({
+                'session_id': session_id,
+                'validator_controller': validator_controller,
+                'validator_stash': validator_stash,
+                'bonded_total': exposure.get('total'),
+                'bonded_active': validator_ledger.get('active'),
+                'bonded_own': exposure.get('own'),
+                'bonded_nominators': bonded_nominators,
+                'validator_session': validator_session,
+                'rank_validator': rank_nr,
+                'unlocking': validator_ledger.get('unlocking'),
+                'count_nominators': len(exposure.get('others', [])),
+                'unstake_threshold': None,
+                'commission': validator_prefs.get('commission')
+            })
 
             # Store nominators
             for rank_nominator, nominator_info in enumerate(exposure.get('others', [])):
                 nominator_stash = nominator_info.get('who').replace('0x', '')
                 nominators.append(nominator_stash)
 
-                session_nominator = SessionNominator(
-                    session_id=session_id,
-                    rank_validator=rank_nr,
-                    rank_nominator=rank_nominator,
-                    nominator_stash=nominator_stash,
-                    bonded=nominator_info.get('value'),
-                )
+                session_nominators.append({
+                    'session_id': session_id,
+                    'rank_validator': rank_nr,
+                    'rank_nominator': rank_nominator,
+                    'nominator_stash': nominator_stash,
+                    'bonded': nominator_info.get('value'),
+                })
 
-                session_nominator.save(db_session)
+        db_session.bulk_insert_mappings(SessionValidator, session_validators)
+        db_session.bulk_insert_mappings(SessionNominator, session_nominators)
 
         # Store session
         session = Session(
@@ -607,8 +634,11 @@ class NewAccountEventProcessor(EventProcessor):
             account_audit.save(db_session)
 
     def accumulation_revert(self, db_session):
-        for item in AccountAudit.query(db_session).filter_by(block_id=self.block.id):
-            db_session.delete(item)
+        self.accumulation_revert_bulk(db_session, [self.block.id])
+
+    @classmethod
+    def accumulation_revert_bulk(cls, db_session, block_ids):
+        AccountAudit.query(db_session).filter(AccountAudit.block_id.in_(block_ids)).delete(synchronize_session=False)
 
     def process_search_index(self, db_session):
         print('NewAccountEventProcessor.process_search_index', self.event.attributes[0])
@@ -645,8 +675,11 @@ class SystemNewAccountEventProcessor(EventProcessor):
             account_audit.save(db_session)
 
     def accumulation_revert(self, db_session):
-        for item in AccountAudit.query(db_session).filter_by(block_id=self.block.id):
-            db_session.delete(item)
+        self.accumulation_revert_bulk(db_session, [self.block.id])
+
+    @classmethod
+    def accumulation_revert_bulk(cls, db_session, block_ids):
+        AccountAudit.query(db_session).filter(AccountAudit.block_id.in_(block_ids)).delete(synchronize_session=False)
 
     def process_search_index(self, db_session):
         print('SystemNewAccountEventProcessor.process_search_index', self.event.attributes)
@@ -708,12 +741,14 @@ class ReapedAccount(EventProcessor):
         new_account_index_audit.save(db_session)
 
     def accumulation_revert(self, db_session):
+        self.accumulation_revert_bulk(db_session, [self.block.id])
 
-        for item in AccountIndexAudit.query(db_session).filter_by(block_id=self.block.id):
-            db_session.delete(item)
-
-        for item in AccountAudit.query(db_session).filter_by(block_id=self.block.id):
-            db_session.delete(item)
+    @classmethod
+    def accumulation_revert_bulk(cls, db_session, block_ids):
+        AccountIndexAudit.query(db_session).filter(AccountIndexAudit.block_id.in_(block_ids)).delete(
+            synchronize_session=False
+        )
+        AccountAudit.query(db_session).filter(AccountAudit.block_id.in_(block_ids)).delete(synchronize_session=False)
 
     def process_search_index(self, db_session):
         print('ReapedAccount.process_search_index', self.event.attributes[0])
@@ -752,9 +787,11 @@ class KilledAccount(EventProcessor):
         account_audit.save(db_session)
 
     def accumulation_revert(self, db_session):
+        self.accumulation_revert_bulk(db_session, [self.block.id])
 
-        for item in AccountAudit.query(db_session).filter_by(block_id=self.block.id):
-            db_session.delete(item)
+    @classmethod
+    def accumulation_revert_bulk(cls, db_session, block_ids):
+        AccountAudit.query(db_session).filter(AccountAudit.block_id.in_(block_ids)).delete(synchronize_session=False)
 
     def process_search_index(self, db_session):
         print('KilledAccount.process_search_index', self.event.attributes)
@@ -792,8 +829,13 @@ class NewAccountIndexEventProcessor(EventProcessor):
         account_index_audit.save(db_session)
 
     def accumulation_revert(self, db_session):
-        for item in AccountIndexAudit.query(db_session).filter_by(block_id=self.block.id):
-            db_session.delete(item)
+        self.accumulation_revert_bulk(db_session, [self.block.id])
+
+    @classmethod
+    def accumulation_revert_bulk(cls, db_session, block_ids):
+        AccountIndexAudit.query(db_session).filter(AccountIndexAudit.block_id.in_(block_ids)).delete(
+            synchronize_session=False
+        )
 
 
 class IndexAssignedEventProcessor(EventProcessor):
@@ -819,8 +861,13 @@ class IndexAssignedEventProcessor(EventProcessor):
         account_index_audit.save(db_session)
 
     def accumulation_revert(self, db_session):
-        for item in AccountIndexAudit.query(db_session).filter_by(block_id=self.block.id):
-            db_session.delete(item)
+        self.accumulation_revert_bulk(db_session, [self.block.id])
+
+    @classmethod
+    def accumulation_revert_bulk(cls, db_session, block_ids):
+        AccountIndexAudit.query(db_session).filter(AccountIndexAudit.block_id.in_(block_ids)).delete(
+            synchronize_session=False
+        )
 
 
 class IndexFreedEventProcessor(EventProcessor):
@@ -844,8 +891,13 @@ class IndexFreedEventProcessor(EventProcessor):
         new_account_index_audit.save(db_session)
 
     def accumulation_revert(self, db_session):
-        for item in AccountIndexAudit.query(db_session).filter_by(block_id=self.block.id):
-            db_session.delete(item)
+        self.accumulation_revert_bulk(db_session, [self.block.id])
+
+    @classmethod
+    def accumulation_revert_bulk(cls, db_session, block_ids):
+        AccountIndexAudit.query(db_session).filter(AccountIndexAudit.block_id.in_(block_ids)).delete(
+            synchronize_session=False
+        )
 
 
 class ProposedEventProcessor(EventProcessor):
@@ -935,8 +987,11 @@ class CodeStoredEventProcessor(EventProcessor):
             contract.save(db_session)
 
     def accumulation_revert(self, db_session):
-        for item in Contract.query(db_session).filter_by(created_at_block=self.block.id):
-            db_session.delete(item)
+        self.accumulation_revert_bulk(db_session, [self.block.id])
+
+    @classmethod
+    def accumulation_revert_bulk(cls, db_session, block_ids):
+        Contract.query(db_session).filter(Contract.created_at_block.in_(block_ids)).delete(synchronize_session=False)
 
 
 class InstantiatedEventProcessor(EventProcessor):
@@ -968,7 +1023,8 @@ class InstantiatedEventProcessor(EventProcessor):
 
                 if contract_abi is not None and len(contract_abi) > 0:
                     # init substrate interface
-                    self.substrate=SubstrateInterface(url=settings.SUBSTRATE_RPC_URL, runtime_config=RuntimeConfiguration())
+                    self.substrate=SubstrateInterface(url=settings.SUBSTRATE_RPC_URL, runtime_config=RuntimeConfiguration(),
+                                                      rpc_cache=get_rpc_cache())
                     self.contract = SubstrateContractInterface(
                         contract_address=contract_instance.address,
                         metadata=ContractMetadata(contract_abi, self.substrate),
@@ -1022,7 +1078,8 @@ class ContractExecutionEventProcessor(EventProcessor):
                             is_private = arg['value']
                     if account != '':
                         self.substrate = SubstrateInterface(url=settings.SUBSTRATE_RPC_URL,
-                                                            runtime_config=RuntimeConfiguration())
+                                                            runtime_config=RuntimeConfiguration(),
+                                                            rpc_cache=get_rpc_cache())
                         self.contract = SubstrateContractInterface(
                             contract_address=contract_address,
                             metadata=ContractMetadata(contract_abi, self.substrate),
@@ -1183,8 +1240,11 @@ class IdentitySetEventProcessor(EventProcessor):
             identity_audit.save(db_session)
 
     def accumulation_revert(self, db_session):
-        for item in IdentityAudit.query(db_session).filter_by(block_id=self.block.id):
-            db_session.delete(item)
+        self.accumulation_revert_bulk(db_session, [self.block.id])
+
+    @classmethod
+    def accumulation_revert_bulk(cls, db_session, block_ids):
+        IdentityAudit.query(db_session).filter(IdentityAudit.block_id.in_(block_ids)).delete(synchronize_session=False)
 
     def process_search_index(self, db_session):
         print('IdentitySetEventProcessor.process_search_index', self.event.attributes, self.event.attributes[0])
@@ -1219,8 +1279,11 @@ class IdentityClearedEventProcessor(EventProcessor):
             identity_audit.save(db_session)
 
     def accumulation_revert(self, db_session):
-        for item in IdentityAudit.query(db_session).filter_by(block_id=self.block.id):
-            db_session.delete(item)
+        self.accumulation_revert_bulk(db_session, [self.block.id])
+
+    @classmethod
+    def accumulation_revert_bulk(cls, db_session, block_ids):
+        IdentityAudit.query(db_session).filter(IdentityAudit.block_id.in_(block_ids)).delete(synchronize_session=False)
 
     def process_search_index(self, db_session):
         print('IdentityClearedEventProcessor.process_search_index', self.event.attributes, self.event.attributes[0])
@@ -1255,8 +1318,11 @@ class IdentityKilledEventProcessor(EventProcessor):
             identity_audit.save(db_session)
 
     def accumulation_revert(self, db_session):
-        for item in IdentityAudit.query(db_session).filter_by(block_id=self.block.id):
-            db_session.delete(item)
+        self.accumulation_revert_bulk(db_session, [self.block.id])
+
+    @classmethod
+    def accumulation_revert_bulk(cls, db_session, block_ids):
+        IdentityAudit.query(db_session).filter(IdentityAudit.block_id.in_(block_ids)).delete(synchronize_session=False)
 
     def process_search_index(self, db_session):
         print('IdentityKilledEventProcessor.process_search_index', self.event.attributes, self.event.attributes[0])
@@ -1296,8 +1362,13 @@ class IdentityJudgementGivenEventProcessor(EventProcessor):
             identity_audit.save(db_session)
 
     def accumulation_revert(self, db_session):
-        for item in IdentityJudgementAudit.query(db_session).filter_by(block_id=self.block.id):
-            db_session.delete(item)
+        self.accumulation_revert_bulk(db_session, [self.block.id])
+
+    @classmethod
+    def accumulation_revert_bulk(cls, db_session, block_ids):
+        IdentityJudgementAudit.query(db_session).filter(IdentityJudgementAudit.block_id.in_(block_ids)).delete(
+            synchronize_session=False
+        )
 
     def process_search_index(self, db_session):
         print('IdentityJudgementGivenEventProcessor.process_search_index', self.event.attributes, self.event.attributes[0])
@@ -22,11 +22,10 @@ import datetime
 import uuid
 
 import falcon
-import pytz
 from celery.result import AsyncResult
 from falcon.media.validators.jsonschema import validate
 from scalecodec.base import RuntimeConfiguration
-from sqlalchemy import text, func
+from sqlalchemy import text
 
 from app import settings
 from app.models.data import Block, BlockTotal
@@ -34,6 +33,8 @@ from app.models.harvester import Setting, Status
 from app.resources.base import BaseResource
 from app.schemas import load_schema
 from app.processors.converters import PolkascanHarvesterService, BlockAlreadyAdded, BlockIntegrityError
+from app.head_tracker import get_harvester_status, get_harvester_queue, get_chain_heads
+from app.utils import chain_state
 from substrateinterface import SubstrateInterface
 from app.tasks import accumulate_block_recursive, start_harvester, rebuild_search_index, rebuild_account_info_snapshot, decode_contract_events, \
     decode_contract_extrinsics
@@ -85,63 +86,29 @@ class PolkascanHarvesterQueueResource(BaseResource):
 
     def on_get(self, req, resp):
 
-        last_known_block = Block.query(self.session).order_by(Block.id.desc()).first()
+        queue = chain_state.get_snapshot('queue')
 
-        if not last_known_block:
-            resp.media = {
-                'status': 'success',
-                'data': {
-                    'message': 'Harvester waiting for first run'
-                }
-            }
-        else:
-
-            remaining_sets_result = Block.get_missing_block_ids(self.session)
+        if queue is None:
+            # Head tracker not running
+            queue = get_harvester_queue(self.session)
 
-            resp.status = falcon.HTTP_200
-
-            resp.media = {
-                'status': 'success',
-                'data': {
-                    'harvester_head': last_known_block.id,
-                    'block_process_queue': [
-                        {'from': block_set['block_from'], 'to': block_set['block_to']}
-                        for block_set in remaining_sets_result
-                    ]
-                }
-            }
+        resp.status = falcon.HTTP_200
+        resp.media = queue
 
 
 class PolkascanHarvesterStatusResource(BaseResource):
 
     def on_get(self, req, resp):
 
-        sequencer_task = Status.get_status(self.session, 'SEQUENCER_TASK_ID')
-        integrity_head = Status.get_status(self.session, 'INTEGRITY_HEAD')
-        sequencer_head = self.session.query(func.max(BlockTotal.id)).one()[0]
-        best_block = Block.query(self.session).filter_by(
-            id=self.session.query(func.max(Block.id)).one()[0]).first()
-
-        if best_block:
-            best_block_datetime = best_block.datetime.replace(tzinfo=pytz.UTC).timestamp() * 1000
-            best_block_nr = best_block.id
-        else:
-            best_block_datetime = None
-            best_block_nr = None
+        status = chain_state.get_snapshot('status')
 
-        substrate = SubstrateInterface(url=SUBSTRATE_RPC_URL, runtime_config=RuntimeConfiguration())
-        chain_head_block_id = substrate.get_block_number(substrate.get_chain_head())
-        chain_finalized_block_id = substrate.get_block_number(substrate.get_chain_finalised_head())
+        if status is None:
+            # Head tracker not running
+            substrate = SubstrateInterface(url=SUBSTRATE_RPC_URL, runtime_config=RuntimeConfiguration())
+            chain_head_block_id, chain_finalized_block_id = get_chain_heads(substrate)
+            status = get_harvester_status(self.session, chain_head_block_id, chain_finalized_block_id)
 
-        resp.media = {
-            'best_block_datetime': best_block_datetime,
-            'best_block_nr': best_block_nr,
-            'sequencer_task': sequencer_task.value,
-            'sequencer_head': sequencer_head,
-            'integrity_head': int(integrity_head.value),
-            'chain_head_block_id': chain_head_block_id,
-            'chain_finalized_block_id': chain_finalized_block_id
-        }
+        resp.media = status
 
 
 class PolkascanProcessBlockResource(BaseResource):
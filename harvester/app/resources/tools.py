@@ -29,6 +29,7 @@ from scalecodec.types import Extrinsic
 from substrateinterface import SubstrateInterface
 from app.settings import SUBSTRATE_RPC_URL, SUBSTRATE_METADATA_VERSION
 from app.tasks import balance_snapshot
+from app.utils.rpc_cache import get_rpc_cache
 
 
 class ExtractMetadataResource(BaseResource):
@@ -36,7 +37,9 @@ class ExtractMetadataResource(BaseResource):
     def on_get(self, req, resp):
 
         if 'block_hash' in req.params:
-            substrate = SubstrateInterface(SUBSTRATE_RPC_URL, runtime_config=RuntimeConfiguration())
+            substrate = SubstrateInterface(
+                SUBSTRATE_RPC_URL, runtime_config=RuntimeConfiguration(), rpc_cache=get_rpc_cache()
+            )
             metadata = substrate.get_block_metadata(req.params.get('block_hash'))
 
             resp.status = falcon.HTTP_200
@@ -57,7 +60,9 @@ class ExtractExtrinsicsResource(BaseResource):
 
     def on_get(self, req, resp):
 
-        substrate = SubstrateInterface(url=SUBSTRATE_RPC_URL, runtime_config=RuntimeConfiguration())
+        substrate = SubstrateInterface(
+            url=SUBSTRATE_RPC_URL, runtime_config=RuntimeConfiguration(), rpc_cache=get_rpc_cache()
+        )
 
         # Get extrinsics
         json_block = substrate.get_chain_block(req.params.get('block_hash'))
@@ -86,7 +91,9 @@ class ExtractEventsResource(BaseResource):
 
     def on_get(self, req, resp):
 
-        substrate = SubstrateInterface(url=SUBSTRATE_RPC_URL, runtime_config=RuntimeConfiguration())
+        substrate = SubstrateInterface(
+            url=SUBSTRATE_RPC_URL, runtime_config=RuntimeConfiguration(), rpc_cache=get_rpc_cache()
+        )
 
         # Get Parent hash
         json_block = substrate.get_block_header(req.params.get('block_hash'))
@@ -110,7 +117,9 @@ class StorageValidatorResource(BaseResource):
 
     def on_get(self, req, resp):
 
-        substrate = SubstrateInterface(url=SUBSTRATE_RPC_URL, runtime_config=RuntimeConfiguration())
+        substrate = SubstrateInterface(
+            url=SUBSTRATE_RPC_URL, runtime_config=RuntimeConfiguration(), rpc_cache=get_rpc_cache()
+        )
 
         resp.status = falcon.HTTP_200
 
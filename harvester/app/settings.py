@@ -31,6 +31,15 @@ DB_CONNECTION = os.environ.get("DB_CONNECTION", "mysql+mysqlconnector://{}:{}@{}
 ))
 
 SUBSTRATE_RPC_URL = os.environ.get("SUBSTRATE_RPC_URL", "http://substrate-node:9933/")
+# A comma separated list of HTTP(S) URLs of archive nodes of the same chain distributes the requests over these nodes
+if ',' in SUBSTRATE_RPC_URL:
+    SUBSTRATE_RPC_URL = [url.strip() for url in SUBSTRATE_RPC_URL.split(',') if url.strip()]
+# Load balancing over multiple SUBSTRATE_RPC_URL nodes: round_robin or least_outstanding
+RPC_LOAD_BALANCING = os.environ.get("RPC_LOAD_BALANCING", "round_robin")
+# Nodes of which the best block lags more than this number of blocks behind the best node receive no requests
+RPC_MAX_BLOCK_LAG = int(os.environ.get("RPC_MAX_BLOCK_LAG", 5))
+# WebSocket endpoint the chain head follower subscribes to, defaults to SUBSTRATE_RPC_URL when that is a ws(s):// URL
+SUBSTRATE_WS_URL = os.environ.get("SUBSTRATE_WS_URL")
 SUBSTRATE_ADDRESS_TYPE = int(os.environ.get("SUBSTRATE_ADDRESS_TYPE", 42))
 
 SUBSTRATE_TREASURY_ACCOUNTS = [
@@ -40,7 +49,10 @@ SUBSTRATE_TREASURY_ACCOUNTS = [
 # Simulate Scale encoded extrinsics per block for e.g. performance tests
 # Example:
 # SUBSTRATE_MOCK_EXTRINSICS = ["0xa50383ff76729e17ad31469debcb60f3ce3622f79143e442e77b58d6e2195d9ea998680d283c1715298aada424241284e4c3d2bec57a8b89e1bfa5502c0f84866cb94f64b666c04ceb88b7274612fea6bcdf7683701b96c13264d5326ecdcd5661df5502d500080008000f69590e7c83f3b71826537aff19ce9d173efeb887cca69c02b991f6ca75a8f43e05e5ef718a29d168e8df39367398cc60b9b45c7815fb2bfa362693a281676e1c7e66ad780b39e767f22efe0065929db7c69cef006d69a0ea8739c22fa1a06cf257d1cc14c340bdf2944ba8615b2a32cdc5774c9f93af6ef7eb3eab07caf94f00"] * 5000
+# The environment variable takes a comma separated list of extrinsics
 SUBSTRATE_MOCK_EXTRINSICS = os.environ.get("SUBSTRATE_MOCK_EXTRINSICS", None)
+if SUBSTRATE_MOCK_EXTRINSICS:
+    SUBSTRATE_MOCK_EXTRINSICS = [extrinsic.strip() for extrinsic in SUBSTRATE_MOCK_EXTRINSICS.split(',')]
 
 TYPE_REGISTRY = os.environ.get("TYPE_REGISTRY", "default")
 TYPE_REGISTRY_FILE = os.environ.get("TYPE_REGISTRY_FILE")
@@ -50,6 +62,38 @@ FINALIZATION_ONLY = int(os.environ.get("FINALIZATION_ONLY", 0))
 
 DEBUG = bool(os.environ.get("DEBUG", False))
 
+# Interval of the `start_harvester` beat schedule; with the chain head follower running it only serves as gap check
+HARVESTER_BEAT_INTERVAL = float(os.environ.get("HARVESTER_BEAT_INTERVAL", 10))
+# Chain head poll interval of the follower when no WebSocket endpoint is available
+FOLLOWER_POLL_INTERVAL = float(os.environ.get("FOLLOWER_POLL_INTERVAL", 1))
+
+# Intervals in seconds at which the head tracker refreshes the /status and /queue snapshots, which expire after
+# HEAD_TRACKER_SNAPSHOT_TTL seconds so the API computes them on request again when the tracker stops
+HEAD_TRACKER_INTERVAL = float(os.environ.get("HEAD_TRACKER_INTERVAL", 2))
+HEAD_TRACKER_QUEUE_INTERVAL = float(os.environ.get("HEAD_TRACKER_QUEUE_INTERVAL", 60))
+HEAD_TRACKER_SNAPSHOT_TTL = int(os.environ.get("HEAD_TRACKER_SNAPSHOT_TTL", 30))
+
+# Cache of immutable RPC responses (requests pinned to a block hash, block hashes of finalized blocks), shared by all
+# SubstrateInterface instances of a process. Comma separated list of backends looked up in order: memory, disk and/or
+# redis, e.g. "memory,redis" to share the cache between all harvester processes. Disabled when empty.
+RPC_CACHE_BACKENDS = os.environ.get("RPC_CACHE_BACKENDS", "")
+RPC_CACHE_MEMORY_BYTES = int(os.environ.get("RPC_CACHE_MEMORY_BYTES", 64 * 1024 * 1024))
+RPC_CACHE_DIR = os.environ.get("RPC_CACHE_DIR", "/tmp/substrate-rpc-cache")
+RPC_CACHE_REDIS_URL = os.environ.get("RPC_CACHE_REDIS_URL", os.environ.get("CELERY_BACKEND"))
+# Prefix of the cache keys, block numbers are only unique within a chain
+RPC_CACHE_NAMESPACE = os.environ.get("RPC_CACHE_NAMESPACE", "{}:".format(TYPE_REGISTRY))
+
+# Redis used to collect metrics of Celery workers for the /metrics route
+METRICS_REDIS_URL = os.environ.get("METRICS_REDIS_URL", os.environ.get("CELERY_BACKEND"))
+
+# Redis where the harvested chain heights are published, used by the explorer API to version its cache
+CHAIN_STATE_REDIS_URL = os.environ.get("CHAIN_STATE_REDIS_URL", os.environ.get("CELERY_BACKEND"))
+
+# Number of processes decoding blocks during catch-up, 0 decodes in the harvester process itself
+DECODE_PROCESSES = int(os.environ.get("DECODE_PROCESSES", 0))
+# Number of blocks fetched and decoded ahead of the block being added
+DECODE_PREFETCH_BLOCKS = int(os.environ.get("DECODE_PREFETCH_BLOCKS", 4))
+
 BALANCE_FULL_SNAPSHOT_INTERVAL = 10000
 CELERY_RUNNING = True
 
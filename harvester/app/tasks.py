@@ -23,14 +23,18 @@ from time import sleep
 
 import celery
 from celery.result import AsyncResult
+from celery.signals import task_postrun, worker_process_init, worker_process_shutdown
 import traceback
 
+from requests import RequestException
+from websocket import WebSocketException
+
 
 from app import settings
-from scalecodec.base import ScaleDecoder, ScaleBytes, RuntimeConfiguration
+from scalecodec.base import ScaleDecoder, ScaleBytes
 
 from sqlalchemy import create_engine, text, distinct
-from sqlalchemy.exc import SQLAlchemyError, IntegrityError
+from sqlalchemy.exc import SQLAlchemyError, IntegrityError, DBAPIError, DisconnectionError
 from sqlalchemy.orm import sessionmaker, scoped_session
 from sqlalchemy.sql import func
 
@@ -39,10 +43,10 @@ from app.models.harvester import Status
 from app.processors.converters import PolkascanHarvesterService, HarvesterCouldNotAddBlock, BlockAlreadyAdded, \
     BlockIntegrityError
 
-from substrateinterface import SubstrateInterface
-
-from app.settings import DB_CONNECTION, DEBUG, SUBSTRATE_RPC_URL, TYPE_REGISTRY, FINALIZATION_ONLY, TYPE_REGISTRY_FILE
+from app.settings import DB_CONNECTION, DEBUG, TYPE_REGISTRY, FINALIZATION_ONLY, TYPE_REGISTRY_FILE
 from app.utils.dingtalk import send_dingtalk
+from app.utils import metrics, chain_state
+from app.utils.block_decoder import shutdown_executor
 
 
 CELERY_BROKER = os.environ.get('CELERY_BROKER')
@@ -50,10 +54,12 @@ CELERY_BACKEND = os.environ.get('CELERY_BACKEND')
 
 app = celery.Celery('tasks', broker=CELERY_BROKER, backend=CELERY_BACKEND)
 
+# New blocks are enqueued by the chain head follower (app.follower) as they arrive, with the follower running this
+# schedule only needs to check for gaps
 app.conf.beat_schedule = {
-    'check-head-10-seconds': {
+    'start-harvester': {
         'task': 'app.tasks.start_harvester',
-        'schedule': 10.0,
+        'schedule': settings.HARVESTER_BEAT_INTERVAL,
         'args': ()
     },
 }
@@ -61,36 +67,124 @@ app.conf.beat_schedule = {
 app.conf.timezone = 'UTC'
 
 
-class BaseTask(celery.Task):
+# Resources living as long as the worker process, shared by all tasks. The engine (with its connection pool) is
+# created by init_worker_resources() right after the worker process is forked, the harvester service (with its
+# SubstrateInterface connection, type registries and metadata caches) on first use. Assumes the prefork or solo pool,
+# these are not shared safely between threads.
+worker_pid = None
+worker_engine = None
+worker_session = None
+worker_harvester = None
+
+# Errors after which the node connection of the worker harvester is not reused
+SUBSTRATE_CONNECTION_ERRORS = (WebSocketException, RequestException, OSError)
+
+
+def init_worker_resources():
+    global worker_pid, worker_engine, worker_session, worker_harvester
+
+    worker_engine = create_engine(DB_CONNECTION, echo=DEBUG, isolation_level="READ_UNCOMMITTED", pool_pre_ping=True)
+    metrics.instrument_engine(worker_engine)
+    session_factory = sessionmaker(bind=worker_engine, autoflush=False, autocommit=False)
+    metrics.instrument_session_factory(session_factory)
+    worker_session = scoped_session(session_factory)
+
+    # Connections inherited from a parent process can't be used, so neither can its harvester
+    worker_harvester = None
+    worker_pid = os.getpid()
+
+
+def get_worker_harvester():
+    global worker_harvester
+
+    if worker_harvester is None:
+        worker_harvester = PolkascanHarvesterService(
+            db_session=worker_session,
+            type_registry=TYPE_REGISTRY,
+            type_registry_file=TYPE_REGISTRY_FILE
+        )
+        # Retrieved metadata is kept for the lifetime of the worker
+        worker_harvester.substrate.metadata_cache = worker_harvester.metadata_store
+
+    return worker_harvester
+
+
+def reset_worker_harvester():
+    global worker_harvester
+
+    if worker_harvester is not None:
+        try:
+            worker_harvester.substrate.close()
+        except Exception as e:
+            print('Could not close substrate connection: {}'.format(e))
+        worker_harvester = None
 
-    def __init__(self):
-        self.metadata_store = {}
+
+def reset_worker_resources(exception):
+    """
+    Discards the worker resources affected by given exception (or any exception it was raised from), so the next task
+    starts with a new node connection or fresh database connections
+    """
+    while exception is not None:
+        if isinstance(exception, DisconnectionError) or \
+                (isinstance(exception, DBAPIError) and exception.connection_invalidated):
+            worker_engine.dispose()
+        elif isinstance(exception, SUBSTRATE_CONNECTION_ERRORS):
+            reset_worker_harvester()
+
+        exception = exception.__cause__ or exception.__context__
+
+
+@worker_process_init.connect
+def on_worker_process_init(**kwargs):
+    init_worker_resources()
+
+
+@worker_process_shutdown.connect
+def on_worker_process_shutdown(**kwargs):
+    reset_worker_harvester()
+    shutdown_executor()
+    if worker_engine is not None:
+        worker_engine.dispose()
+
+
+class BaseTask(celery.Task):
 
     def __call__(self, *args, **kwargs):
-        self.engine = create_engine(DB_CONNECTION, echo=DEBUG, isolation_level="READ_UNCOMMITTED", pool_pre_ping=True)
-        session_factory = sessionmaker(bind=self.engine, autoflush=False, autocommit=False)
-        self.session = scoped_session(session_factory)
+        if worker_pid != os.getpid():
+            # Not started in a prefork pool worker, e.g. the solo pool or eager execution
+            init_worker_resources()
+
+        self.engine = worker_engine
+        self.session = worker_session
 
         return super().__call__(*args, **kwargs)
 
+    @property
+    def harvester(self):
+        return get_worker_harvester()
+
     def after_return(self, status, retval, task_id, args, kwargs, einfo):
+        # Roll back anything left uncommitted and return the connection to the pool
         if hasattr(self, 'session'):
             self.session.remove()
-        if hasattr(self, 'engine'):
-            self.engine.engine.dispose()
+        if einfo is not None:
+            reset_worker_resources(einfo.exception)
+
+
+@task_postrun.connect
+def push_metrics(**kwargs):
+    # Make worker metrics available to the /metrics route of the API
+    try:
+        metrics.push_snapshot()
+    except Exception as e:
+        print('Could not push metrics: {}'.format(e))
 
 
 @app.task(base=BaseTask, bind=True)
 def accumulate_block_recursive(self, block_hash, end_block_hash=None):
 
-    harvester = PolkascanHarvesterService(
-        db_session=self.session,
-        type_registry=TYPE_REGISTRY,
-        type_registry_file=TYPE_REGISTRY_FILE
-    )
-
-    harvester.metadata_store = self.metadata_store
-    harvester.substrate.metadata_cache = self.metadata_store
+    harvester = self.harvester
 
     # If metadata store isn't initialized yet, perform some tests
     if not harvester.metadata_store:
@@ -100,7 +194,7 @@ def accumulate_block_recursive(self, block_hash, end_block_hash=None):
 
         if not max_block_id:
             # Speed up accumulating by creating several entry points
-            substrate = SubstrateInterface(url=SUBSTRATE_RPC_URL, runtime_config=RuntimeConfiguration())
+            substrate = harvester.substrate
             block_nr = substrate.get_block_number(block_hash)
             if block_nr > 100:
                 for entry_point in range(0, block_nr, block_nr // 4)[1:-1]:
@@ -114,26 +208,25 @@ def accumulate_block_recursive(self, block_hash, end_block_hash=None):
 
     try:
 
-        for nr in range(0, 10):
-            if not block or block.id > 0:
-                # Process block
-                block = harvester.add_block(block_hash)
+        # Blocks are fetched and decoded ahead, while the previous block is processed
+        for decoded_block in harvester.block_decoder.iter_blocks(block_hash, 10, end_block_hash=end_block_hash):
+            # Process block
+            block = harvester.add_block(block_hash, decoded_block=decoded_block)
 
-                print('+ Added {} '.format(block_hash))
+            print('+ Added {} '.format(block_hash))
 
-                add_count += 1
+            add_count += 1
 
-                self.session.commit()
+            self.session.commit()
 
-                # Break loop if targeted end block hash is reached
-                if block_hash == end_block_hash or block.id == 0:
-                    break
+            chain_state.publish_head(block.id)
 
-                # Continue with parent block hash
-                block_hash = block.parent_hash
+            # Break loop if targeted end block hash is reached
+            if block_hash == end_block_hash or block.id == 0:
+                break
 
-        # Update persistent metadata store in Celery task
-        self.metadata_store = harvester.metadata_store
+            # Continue with parent block hash
+            block_hash = block.parent_hash
 
         if block_hash != end_block_hash and block and block.id > 0:
             accumulate_block_recursive.delay(block.parent_hash, end_block_hash)
@@ -168,11 +261,7 @@ def start_sequencer(self):
         sequencer_task.value = self.request.id
         sequencer_task.save(self.session)
 
-        harvester = PolkascanHarvesterService(
-            db_session=self.session,
-            type_registry=TYPE_REGISTRY,
-            type_registry_file=TYPE_REGISTRY_FILE
-        )
+        harvester = self.harvester
         try:
             result = harvester.start_sequencer()
         except BlockIntegrityError as e:
@@ -198,11 +287,7 @@ def rebuilding_search_index(self, search_index_id=None, truncate=False):
         self.session.execute('delete from analytics_search_index where index_type_id={}'.format(search_index_id))
         self.session.commit()
 
-    harvester = PolkascanHarvesterService(
-        db_session=self.session,
-        type_registry=TYPE_REGISTRY,
-        type_registry_file=TYPE_REGISTRY_FILE
-    )
+    harvester = self.harvester
     harvester.rebuild_search_index()
 
     return {'result': 'index rebuilt'}
@@ -211,7 +296,7 @@ def rebuilding_search_index(self, search_index_id=None, truncate=False):
 @app.task(base=BaseTask, bind=True)
 def start_harvester(self, check_gaps=True):
 
-    substrate = SubstrateInterface(url=SUBSTRATE_RPC_URL, runtime_config=RuntimeConfiguration())
+    substrate = self.harvester.substrate
 
     block_sets = []
 
@@ -266,11 +351,7 @@ def start_generate_analytics(self):
 
 @app.task(base=BaseTask, bind=True)
 def rebuild_search_index(self):
-    harvester = PolkascanHarvesterService(
-        db_session=self.session,
-        type_registry=TYPE_REGISTRY,
-        type_registry_file=TYPE_REGISTRY_FILE
-    )
+    harvester = self.harvester
     harvester.rebuild_search_index()
 
     return {'result': 'search index rebuilt'}
@@ -278,11 +359,7 @@ def rebuild_search_index(self):
 
 @app.task(base=BaseTask, bind=True)
 def rebuild_account_info_snapshot(self):
-    harvester = PolkascanHarvesterService(
-        db_session=self.session,
-        type_registry=TYPE_REGISTRY,
-        type_registry_file=TYPE_REGISTRY_FILE
-    )
+    harvester = self.harvester
 
     last_full_snapshot_block_nr = 0
 
@@ -342,11 +419,7 @@ def balance_snapshot(self, account_id=None, block_start=1, block_end=None, block
     else:
         accounts = [account.id for account in Account.query(self.session)]
 
-    harvester = PolkascanHarvesterService(
-        db_session=self.session,
-        type_registry=TYPE_REGISTRY,
-        type_registry_file=TYPE_REGISTRY_FILE
-    )
+    harvester = self.harvester
 
     if block_ids:
         block_range = block_ids
@@ -354,7 +427,7 @@ def balance_snapshot(self, account_id=None, block_start=1, block_end=None, block
 
         if block_end is None:
             # Set block end to chaintip
-            substrate = SubstrateInterface(url=SUBSTRATE_RPC_URL, runtime_config=RuntimeConfiguration())
+            substrate = harvester.substrate
             block_end = substrate.get_block_number(substrate.get_chain_finalised_head())
 
         block_range = range(block_start, block_end + 1)
@@ -375,11 +448,7 @@ def balance_snapshot(self, account_id=None, block_start=1, block_end=None, block
 
 @app.task(base=BaseTask, bind=True)
 def update_balances_in_block(self, block_id):
-    harvester = PolkascanHarvesterService(
-        db_session=self.session,
-        type_registry=TYPE_REGISTRY,
-        type_registry_file=TYPE_REGISTRY_FILE
-    )
+    harvester = self.harvester
 
     harvester.create_full_balance_snaphot(block_id)
     self.session.commit()
@@ -392,22 +461,14 @@ def update_balances_in_block(self, block_id):
 
 @app.task(base=BaseTask, bind=True)
 def decode_contract_events(self):
-    harvester = PolkascanHarvesterService(
-        db_session=self.session,
-        type_registry=TYPE_REGISTRY,
-        type_registry_file=TYPE_REGISTRY_FILE
-    )
+    harvester = self.harvester
     harvester.decode_contract_events()
 
     return {'result': 'contract events decoded'}
 
 @app.task(base=BaseTask, bind=True)
 def decode_contract_extrinsics(self):
-    harvester = PolkascanHarvesterService(
-        db_session=self.session,
-        type_registry=TYPE_REGISTRY,
-        type_registry_file=TYPE_REGISTRY_FILE
-    )
+    harvester = self.harvester
     harvester.decode_contract_extrinsics()
 
     return {'result': 'contract extrinsics decoded'}
\ No newline at end of file
@@ -0,0 +1,70 @@
+import multiprocessing
+import unittest
+from unittest import mock
+
+from app.utils import block_decoder
+from app.utils.block_decoder import BlockDecoder
+
+BLOCK_HASH = '0x' + '01' * 32
+PARENT_HASH = '0x' + '00' * 32
+DECODED_BLOCK = {'extrinsics': [], 'events': [], 'logs': []}
+
+
+def create_substrate():
+    substrate = mock.MagicMock(endpoint_pool=None, mock_extrinsics=None, url='http://substrate-node:9933/')
+    substrate.rpc_request.return_value = {'result': {'block': {
+        'header': {
+            'number': '0x1', 'parentHash': PARENT_HASH, 'stateRoot': '0x', 'extrinsicsRoot': '0x',
+            'digest': {'logs': []}
+        },
+        'extrinsics': []
+    }}}
+    substrate.get_block_runtime_version.return_value = {'specVersion': 1}
+    substrate.get_storage_by_key.return_value = None
+    return substrate
+
+
+def decode_in_daemonic_process(results):
+    try:
+        with mock.patch('app.utils.block_decoder.decode_block_payload', return_value=DECODED_BLOCK):
+            decoder = BlockDecoder(create_substrate(), processes=2)
+            payload, decoded_block = decoder.decode_block(BLOCK_HASH)
+            results.put((decoded_block, block_decoder.executor))
+    except Exception as e:
+        results.put(e)
+
+
+class BlockDecoderTestCase(unittest.TestCase):
+
+    def tearDown(self):
+        block_decoder.executor = None
+
+    def test_decode_in_daemonic_process(self):
+        # Workers of the Celery prefork pool are daemonic and can't start a process pool
+        context = multiprocessing.get_context('fork')
+        results = context.Queue()
+        process = context.Process(target=decode_in_daemonic_process, args=(results,), daemon=True)
+        process.start()
+        result = results.get(timeout=30)
+        process.join()
+
+        self.assertNotIsInstance(result, Exception)
+        self.assertEqual(result, (DECODED_BLOCK, None))
+
+    def test_workers_use_endpoint_pool(self):
+        substrate = create_substrate()
+        substrate.endpoint_pool = mock.MagicMock(urls=['http://node-1:9933/', 'http://node-2:9933/'])
+
+        with mock.patch('app.utils.block_decoder.ProcessPoolExecutor') as process_pool:
+            BlockDecoder(
+                substrate, processes=2, type_registry_preset='kusama', load_balancing='least_outstanding',
+                endpoint_options={'max_block_lag': 3}
+            )
+
+        self.assertEqual(process_pool.call_args.kwargs['initargs'], (
+            ['http://node-1:9933/', 'http://node-2:9933/'], 'kusama', None, 'least_outstanding', {'max_block_lag': 3}
+        ))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import unittest
+from unittest import mock
+
+from app.models.data import SessionValidator, SessionNominator
+from app.processors.event import NewSessionEventProcessor
+
+VALIDATOR_ADDRESS = '5GrwvaEF5zXb26Fz9rcQpDWS57CtERHpNehXCPcNoHGKutQY'
+VALIDATOR_PUBLIC_KEY = '0xd43593c715fdd31c61141abd04a99fd6822c8558854ccde39a5684e7a56da27d'
+NOMINATOR_ADDRESS = '5FHneW46xGXgs5mUiveU4sbTyGBzmstUspZC92UhjJM694ty'
+
+
+class AccountIdKey:
+
+    def __init__(self, value, public_key):
+        self.value = value
+        self.public_key = public_key
+
+
+class StorageValue:
+
+    def __init__(self, value):
+        self.value = value
+
+
+class NewSessionEventProcessorTestCase(unittest.TestCase):
+
+    def setUp(self):
+        # Runtime with an ss58 format: AccountId values are SS58 encoded
+        self.substrate = mock.MagicMock()
+        self.substrate.get_runtime_state.side_effect = lambda module, storage_function, params, block_hash: {
+            'CurrentEra': {'result': 10},
+            'Validators': {'result': [VALIDATOR_ADDRESS]}
+        }[storage_function]
+
+        era_maps = {
+            'ErasStakers': {'total': 300, 'own': 100, 'others': [{'who': NOMINATOR_ADDRESS, 'value': 200}]},
+            'ErasValidatorPrefs': {'commission': 50000000}
+        }
+        self.substrate.query_map_iter.side_effect = lambda module, storage_function, **kwargs: [
+            (AccountIdKey(VALIDATOR_ADDRESS, VALIDATOR_PUBLIC_KEY), StorageValue(era_maps[storage_function]))
+        ]
+
+        self.processor = NewSessionEventProcessor(
+            block=mock.MagicMock(id=100, hash='0x01'), event=mock.MagicMock(), substrate=self.substrate
+        )
+
+    @mock.patch('app.processors.event.utils.query_storage_multi', side_effect=ValueError)
+    def test_add_session_ss58_accounts(self, query_storage_multi):
+        db_session = mock.MagicMock()
+
+        self.processor.add_session(db_session, 5)
+
+        inserted = dict(call.args for call in db_session.bulk_insert_mappings.call_args_list)
+
+        validator = inserted[SessionValidator][0]
+        self.assertEqual(VALIDATOR_ADDRESS, validator['validator_stash'])
+        self.assertEqual(300, validator['bonded_total'])
+        self.assertEqual(100, validator['bonded_own'])
+        self.assertEqual(50000000, validator['commission'])
+        self.assertEqual(1, validator['count_nominators'])
+
+        self.assertEqual(
+            [NOMINATOR_ADDRESS], [nominator['nominator_stash'] for nominator in inserted[SessionNominator]]
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,307 @@
+#  Polkascan PRE Harvester
+#
+#  Copyright 2018-2020 openAware BV (NL).
+#  This file is part of Polkascan.
+#
+#  Polkascan is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  Polkascan is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with Polkascan. If not, see <http://www.gnu.org/licenses/>.
+#
+#  block_decoder.py
+#
+#  Decode stage of add_block. The raw block payload (extrinsics, System.Events storage data and digest logs, together
+#  with the spec version of the parent block) is retrieved without decoding and decoded against the runtime context
+#  of that spec version into plain dicts. With DECODE_PROCESSES set, decoding runs in a process pool, where every
+#  worker keeps its own warm runtime contexts, and the blocks that add_block will process next are fetched and
+#  decoded ahead, so a harvester uses all cores while catching up. Daemonic processes, such as the workers of the
+#  Celery prefork pool, can't start a process pool and decode in process instead.
+import multiprocessing
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from substrateinterface import SubstrateInterface
+from substrateinterface.exceptions import SubstrateRequestException, BlockNotFound
+
+from app.utils.rpc_cache import get_rpc_cache
+
+# SubstrateInterface of a decode worker process, created by init_worker()
+worker_substrate = None
+
+# Process pool shared by all BlockDecoder instances of this process, so the workers stay warm between tasks
+executor = None
+
+
+def init_worker(url, type_registry_preset, custom_type_registry, load_balancing, endpoint_options):
+    global worker_substrate
+    worker_substrate = SubstrateInterface(
+        url=url,
+        type_registry=custom_type_registry,
+        type_registry_preset=type_registry_preset,
+        rpc_cache=get_rpc_cache(),
+        load_balancing=load_balancing,
+        endpoint_options=endpoint_options
+    )
+
+
+def get_executor(processes, url, type_registry_preset, custom_type_registry, load_balancing='round_robin',
+                 endpoint_options=None):
+    """
+    Returns the process pool of this process, or None when this process is daemonic and can't have child processes
+    """
+    global executor
+
+    if multiprocessing.current_process().daemon:
+        return None
+
+    if executor is None:
+        executor = ProcessPoolExecutor(
+            max_workers=processes,
+            initializer=init_worker,
+            initargs=(url, type_registry_preset, custom_type_registry, load_balancing, endpoint_options)
+        )
+
+    return executor
+
+
+def shutdown_executor():
+    global executor
+
+    if executor is not None:
+        executor.shutdown(wait=False)
+        executor = None
+
+
+def decode_payload(payload):
+    """
+    Entry point of the decode workers; retrieves the runtime context of the parent spec version once per worker
+    """
+    runtime_context = worker_substrate.get_runtime_context(
+        block_hash=payload['hash'], spec_version=payload['parent_spec_version']
+    )
+    return decode_block_payload(runtime_context, payload)
+
+
+def decode_block_payload(runtime_context, payload):
+    """
+    Decodes a raw block payload into plain, picklable dicts
+
+    Parameters
+    ----------
+    runtime_context: RuntimeContext of the runtime of the parent block
+    payload: dict as returned by `BlockDecoder.fetch_payload`
+
+    Returns
+    -------
+    dict with lists of decoded extrinsics, events and logs
+    """
+    extrinsics = []
+    for extrinsic_data in payload['extrinsics']:
+        extrinsic = runtime_context.decode_extrinsic(extrinsic_data)
+        extrinsics.append({'value': extrinsic.value, 'signed': extrinsic.signed})
+
+    events = []
+    for event in runtime_context.decode_events(payload['events']).elements:
+        events.append({'value': event.value, 'phase': event.value_object['phase'].index, 'params': event.params})
+
+    logs = []
+    for log_data in payload['logs']:
+        log_digest = runtime_context.decode_log(log_data)
+        logs.append({'index': log_digest.index, 'type': log_digest.value_object[0], 'value': log_digest.value})
+
+    return {'extrinsics': extrinsics, 'events': events, 'logs': logs}
+
+
+class BlockDecoder:
+
+    def __init__(self, substrate, processes=0, prefetch_blocks=0, type_registry_preset=None,
+                 custom_type_registry=None, load_balancing='round_robin', endpoint_options=None):
+        """
+        Parameters
+        ----------
+        substrate: SubstrateInterface used to retrieve the raw blocks, and to decode them when `processes` is 0
+        processes: size of the decode process pool, 0 decodes in this process
+        prefetch_blocks: maximum number of blocks fetched and decoded ahead by `iter_blocks`
+        type_registry_preset: type registry preset of the SubstrateInterface instances of the workers
+        custom_type_registry: custom type registry of the SubstrateInterface instances of the workers
+        load_balancing: load balancing strategy of the SubstrateInterface instances of the workers
+        endpoint_options: endpoint pool options of the SubstrateInterface instances of the workers
+        """
+        self.substrate = substrate
+        self.processes = processes
+        self.prefetch_blocks = max(prefetch_blocks, 1)
+        self.type_registry_preset = type_registry_preset
+        self.custom_type_registry = custom_type_registry
+        self.load_balancing = load_balancing
+        self.endpoint_options = endpoint_options
+        self.events_storage_key = substrate.generate_storage_hash("System", "Events")
+
+        if processes > 0:
+            if multiprocessing.current_process().daemon:
+                print('! DECODE_PROCESSES ignored: daemonic processes, e.g. workers of the Celery prefork pool, '
+                      'can\'t start a decode process pool; decoding in process')
+                self.processes = 0
+            else:
+                # Start the workers right away, so they are warm when the first block is decoded
+                self.get_executor()
+
+    def get_executor(self):
+        """
+        Returns the shared process pool, starting a new one when the previous pool broke
+        """
+        url = self.substrate.endpoint_pool.urls if self.substrate.endpoint_pool else self.substrate.url
+        return get_executor(
+            self.processes, url, self.type_registry_preset, self.custom_type_registry,
+            load_balancing=self.load_balancing, endpoint_options=self.endpoint_options
+        )
+
+    def fetch_payload(self, block_hash):
+        """
+        Retrieves the raw data of given block, without decoding it
+
+        Parameters
+        ----------
+        block_hash
+
+        Returns
+        -------
+        dict
+        """
+        response = self.substrate.rpc_request("chain_getBlock", [block_hash])
+
+        if 'error' in response:
+            raise SubstrateRequestException(response['error']['message'])
+
+        if response.get('result') is None:
+            raise BlockNotFound(f'Block not found for "{block_hash}"')
+
+        header = response['result']['block']['header']
+        extrinsics = response['result']['block']['extrinsics']
+
+        if self.substrate.mock_extrinsics:
+            # Extend extrinsics with mock_extrinsics for e.g. performance tests
+            extrinsics = extrinsics + list(self.substrate.mock_extrinsics)
+
+        block_number = int(header['number'], 16)
+
+        # Events and extrinsics are decoded against runtime of parent block
+        runtime_block_hash = header['parentHash'] if block_number > 0 else block_hash
+        runtime_info = self.substrate.get_block_runtime_version(runtime_block_hash) or {}
+        parent_spec_version = runtime_info.get('specVersion', 0)
+
+        try:
+            events = self.substrate.get_storage_by_key(block_hash, self.events_storage_key)
+        except SubstrateRequestException as e:
+            print(e)
+            events = None
+
+        return {
+            'hash': block_hash,
+            'number': block_number,
+            'parent_hash': header['parentHash'],
+            'state_root': header['stateRoot'],
+            'extrinsics_root': header['extrinsicsRoot'],
+            'logs': header.get('digest', {}).get('logs', []),
+            'extrinsics': extrinsics,
+            'events': events,
+            'parent_spec_version': parent_spec_version
+        }
+
+    def submit(self, payload):
+        """
+        Schedules decoding of given payload
+
+        Returns
+        -------
+        Future of the result of `decode_block_payload`
+        """
+        if self.processes > 0:
+            try:
+                pool = self.get_executor()
+                if pool is not None:
+                    return pool.submit(decode_payload, payload)
+            except BrokenProcessPool:
+                # A worker died, e.g. killed by the OOM killer; decode here and start a new pool next time
+                shutdown_executor()
+
+        future = Future()
+        try:
+            future.set_result(self.decode_in_process(payload))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def decode_in_process(self, payload):
+        runtime_context = self.substrate.get_runtime_context(
+            block_hash=payload['hash'], spec_version=payload['parent_spec_version']
+        )
+        return decode_block_payload(runtime_context, payload)
+
+    def get_result(self, payload, future):
+        """
+        Returns the decoded block of given future, decoding in this process when the pool broke meanwhile
+        """
+        try:
+            return future.result()
+        except BrokenProcessPool:
+            shutdown_executor()
+            return self.decode_in_process(payload)
+
+    def decode_block(self, block_hash):
+        """
+        Retrieves and decodes given block
+
+        Returns
+        -------
+        tuple of the payload and the decoded block
+        """
+        payload = self.fetch_payload(block_hash)
+        return payload, self.get_result(payload, self.submit(payload))
+
+    def iter_blocks(self, block_hash, max_blocks, end_block_hash=None):
+        """
+        Retrieves and decodes given block and its ancestors, keeping up to `prefetch_blocks` blocks in flight
+
+        Parameters
+        ----------
+        block_hash: block to start from
+        max_blocks: maximum number of blocks
+        end_block_hash: last block to retrieve, if reached before `max_blocks`
+
+        Returns
+        -------
+        generator of tuples of the payload and the decoded block, in descending order of block number
+        """
+        pending = deque()
+        next_block_hash = block_hash
+        fetched_blocks = 0
+
+        try:
+            while True:
+                while next_block_hash and fetched_blocks < max_blocks and len(pending) < self.prefetch_blocks:
+                    payload = self.fetch_payload(next_block_hash)
+                    pending.append((payload, self.submit(payload)))
+                    fetched_blocks += 1
+
+                    if next_block_hash == end_block_hash or payload['number'] == 0:
+                        next_block_hash = None
+                    else:
+                        next_block_hash = payload['parent_hash']
+
+                if not pending:
+                    return
+
+                payload, future = pending.popleft()
+                yield payload, self.get_result(payload, future)
+        finally:
+            for payload, future in pending:
+                future.cancel()
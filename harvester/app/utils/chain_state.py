@@ -0,0 +1,145 @@
+#  Polkascan PRE Harvester
+#
+#  Copyright 2018-2020 openAware BV (NL).
+#  This file is part of Polkascan.
+#
+#  Polkascan is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  Polkascan is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with Polkascan. If not, see <http://www.gnu.org/licenses/>.
+#
+#  chain_state.py
+#
+#  Publishes the progress of the harvester to Redis, so the explorer API can version its cache on harvested data.
+#
+#  chain_state:head          highest block number added
+#  chain_state:sequencer     block number of the sequencer head
+#  chain_state:finalized     block number up to which integrity checks passed against the finalized chain
+#  chain_state:reorg         block number of the last reorg
+#  chain_state:reorg_count   incremented on every reorg
+#  chain_state:version       incremented whenever harvested data changes
+#
+#  Every update is also announced as a JSON message on the `chain_state` pub/sub channel.
+#
+#  The head tracker (app.head_tracker) additionally stores JSON snapshots, expiring when the tracker stops:
+#
+#  chain_state:status        response of the harvester /status route
+#  chain_state:queue         response of the harvester /queue route
+import json
+
+from app import settings
+
+REDIS_KEY_PREFIX = 'chain_state:'
+CHANNEL = 'chain_state'
+
+# KEYS: height key, version key, optional counter key; ARGV: height, 'max' or 'set', '1' to bump the version
+UPDATE_SCRIPT = """
+local height = tonumber(ARGV[1])
+if ARGV[2] == 'set' or height > tonumber(redis.call('GET', KEYS[1]) or '-1') then
+    redis.call('SET', KEYS[1], height)
+end
+if KEYS[3] then
+    redis.call('INCR', KEYS[3])
+end
+if ARGV[3] == '1' then
+    return redis.call('INCR', KEYS[2])
+end
+return tonumber(redis.call('GET', KEYS[2]) or '0')
+"""
+
+redis_connection = None
+update_script = None
+
+
+def get_redis_connection():
+    global redis_connection, update_script
+
+    if redis_connection is None:
+        from redis import StrictRedis
+        redis_connection = StrictRedis.from_url(settings.CHAIN_STATE_REDIS_URL)
+        update_script = redis_connection.register_script(UPDATE_SCRIPT)
+
+    return redis_connection
+
+
+def publish(event, height, mode='max', bump_version=True, counter=None):
+    """
+    Updates the height of given event and announces it; failures are reported but never interrupt harvesting
+
+    Parameters
+    ----------
+    event: 'head', 'sequencer', 'finalized' or 'reorg'
+    height: block number
+    mode: 'max' only raises the stored height, 'set' overwrites it
+    bump_version: increment the data version, invalidating versioned caches
+    counter: name of an additional counter key to increment
+    """
+    if not settings.CHAIN_STATE_REDIS_URL or height is None:
+        return
+
+    try:
+        redis_conn = get_redis_connection()
+
+        keys = [REDIS_KEY_PREFIX + event, REDIS_KEY_PREFIX + 'version']
+        if counter:
+            keys.append(REDIS_KEY_PREFIX + counter)
+
+        version = update_script(keys=keys, args=[int(height), mode, '1' if bump_version else '0'])
+
+        redis_conn.publish(CHANNEL, json.dumps({'event': event, 'height': int(height), 'version': version}))
+    except Exception as e:
+        print('Could not publish chain state: {}'.format(e))
+
+
+def publish_head(block_id):
+    publish('head', block_id)
+
+
+def publish_sequencer_head(block_id):
+    publish('sequencer', block_id, mode='set')
+
+
+def publish_finalized_head(block_id):
+    publish('finalized', block_id, bump_version=False)
+
+
+def publish_reorg(block_id):
+    publish('reorg', block_id, mode='set', counter='reorg_count')
+
+
+def store_snapshot(name, data, ttl):
+    """
+    Stores given JSON serializable data as snapshot, expiring after `ttl` seconds
+    """
+    if not settings.CHAIN_STATE_REDIS_URL:
+        return
+
+    try:
+        get_redis_connection().set(REDIS_KEY_PREFIX + name, json.dumps(data), ex=int(ttl))
+    except Exception as e:
+        print('Could not store chain state snapshot: {}'.format(e))
+
+
+def get_snapshot(name):
+    """
+    Returns the snapshot stored with given name, or None when not available
+    """
+    if not settings.CHAIN_STATE_REDIS_URL:
+        return
+
+    try:
+        data = get_redis_connection().get(REDIS_KEY_PREFIX + name)
+    except Exception as e:
+        print('Could not retrieve chain state snapshot: {}'.format(e))
+        return
+
+    if data is not None:
+        return json.loads(data)
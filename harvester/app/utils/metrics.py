@@ -0,0 +1,371 @@
+#  Polkascan PRE Harvester
+#
+#  Copyright 2018-2020 openAware BV (NL).
+#  This file is part of Polkascan.
+#
+#  Polkascan is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  Polkascan is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with Polkascan. If not, see <http://www.gnu.org/licenses/>.
+#
+#  metrics.py
+#
+#  In-process counters and histograms for the harvester hot path, rendered in the Prometheus text format.
+#  Celery workers push a snapshot of their registry to Redis after every task; the /metrics route merges those
+#  snapshots with the metrics of the API process itself.
+import json
+import os
+import socket
+import threading
+import time
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+from app import settings
+
+DEFAULT_BUCKETS = (.001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10, 30, 60, 120)
+
+REDIS_KEY_PREFIX = 'harvester_metrics:'
+REDIS_SNAPSHOT_TTL = 3600
+
+
+class Metric:
+
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.samples = {}
+        self.lock = threading.Lock()
+
+    def label_values(self, labels):
+        return tuple(str(labels.get(label, '')) for label in self.labelnames)
+
+    def snapshot(self):
+        with self.lock:
+            return [[list(key), value] for key, value in self.samples.items()]
+
+    def merge(self, target, samples):
+        raise NotImplementedError()
+
+    def render(self, samples):
+        raise NotImplementedError()
+
+    def format_labels(self, label_values, extra=None):
+        pairs = list(zip(self.labelnames, label_values))
+        if extra:
+            pairs.append(extra)
+        if not pairs:
+            return ''
+        return '{' + ','.join('{}="{}"'.format(key, value) for key, value in pairs) + '}'
+
+
+class Counter(Metric):
+
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self.label_values(labels)
+        with self.lock:
+            self.samples[key] = self.samples.get(key, 0) + amount
+
+    def merge(self, target, samples):
+        for key, value in samples:
+            key = tuple(key)
+            target[key] = target.get(key, 0) + value
+
+    def render(self, samples):
+        for key, value in sorted(samples.items()):
+            yield '{}{} {}'.format(self.name + '_total', self.format_labels(key), value)
+
+
+class Histogram(Metric):
+
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self.label_values(labels)
+        with self.lock:
+            sample = self.samples.get(key)
+            if sample is None:
+                # Non-cumulative bucket counts followed by sum and count
+                sample = self.samples[key] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+
+            for idx, bound in enumerate(self.buckets):
+                if value <= bound:
+                    sample[idx] += 1
+                    break
+            else:
+                sample[len(self.buckets)] += 1
+
+            sample[-2] += value
+            sample[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start_time, **labels)
+
+    def merge(self, target, samples):
+        for key, value in samples:
+            key = tuple(key)
+            if key in target:
+                target[key] = [a + b for a, b in zip(target[key], value)]
+            else:
+                target[key] = list(value)
+
+    def render(self, samples):
+        for key, value in sorted(samples.items()):
+            cumulative = 0
+            for idx, bound in enumerate(self.buckets + (float('inf'),)):
+                cumulative += value[idx]
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                yield '{}_bucket{} {}'.format(self.name, self.format_labels(key, ('le', le)), cumulative)
+            yield '{}_sum{} {}'.format(self.name, self.format_labels(key), value[-2])
+            yield '{}_count{} {}'.format(self.name, self.format_labels(key), value[-1])
+
+
+class MetricsRegistry:
+
+    def __init__(self):
+        self.metrics = {}
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def snapshot(self):
+        return {name: metric.snapshot() for name, metric in self.metrics.items()}
+
+    def render(self, snapshots=None):
+        """
+        Renders the local metrics, summed with the samples of the given snapshots, in the Prometheus text format
+
+        Parameters
+        ----------
+        snapshots: list of results of `snapshot()`, e.g. retrieved from other processes
+
+        Returns
+        -------
+        str
+        """
+        if snapshots is None:
+            snapshots = []
+
+        lines = []
+        for name, metric in self.metrics.items():
+            samples = {}
+            metric.merge(samples, metric.snapshot())
+            for snapshot in snapshots:
+                metric.merge(samples, snapshot.get(name, []))
+
+            lines.append('# HELP {} {}'.format(name, metric.documentation))
+            lines.append('# TYPE {} {}'.format(name, metric.type))
+            lines.extend(metric.render(samples))
+
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+rpc_request_seconds = registry.histogram(
+    'harvester_rpc_request_seconds', 'Duration of Substrate RPC requests', ['method']
+)
+rpc_request_errors = registry.counter(
+    'harvester_rpc_request_errors', 'Failed Substrate RPC requests', ['method']
+)
+stage_seconds = registry.histogram(
+    'harvester_stage_seconds', 'Duration of a stage within a harvester operation', ['operation', 'stage']
+)
+decode_seconds = registry.histogram(
+    'harvester_decode_seconds', 'SCALE decoding time of a stage, excluding time spent in RPC requests', ['stage']
+)
+processor_seconds = registry.histogram(
+    'harvester_processor_seconds', 'Duration of processor hooks', ['processor', 'hook']
+)
+db_flush_seconds = registry.histogram(
+    'harvester_db_flush_seconds', 'Duration of SQLAlchemy session flushes'
+)
+db_statements = registry.counter(
+    'harvester_db_statements', 'SQL statements executed', ['statement']
+)
+operation_seconds = registry.histogram(
+    'harvester_operation_seconds', 'Duration of add_block, sequence_block and integrity_checks', ['operation']
+)
+operation_errors = registry.counter(
+    'harvester_operation_errors', 'Failed add_block, sequence_block and integrity_checks calls', ['operation']
+)
+rpc_cache_hits = registry.counter(
+    'harvester_rpc_cache_hits', 'Substrate RPC requests served from the RPC response cache', ['method']
+)
+rpc_cache_misses = registry.counter(
+    'harvester_rpc_cache_misses', 'Cacheable Substrate RPC requests not found in the RPC response cache', ['method']
+)
+
+# Accumulated RPC time of the current thread, used to separate decode time from network time
+rpc_time = threading.local()
+
+
+def get_rpc_time():
+    return getattr(rpc_time, 'total', 0.0)
+
+
+def instrument_substrate(substrate):
+    """
+    Times every RPC request of the given SubstrateInterface instance per method
+
+    Parameters
+    ----------
+    substrate: SubstrateInterface
+
+    Returns
+    -------
+    The same SubstrateInterface instance
+    """
+    if getattr(substrate, '_metrics_instrumented', False):
+        return substrate
+
+    rpc_request = substrate.rpc_request
+
+    def timed_rpc_request(method, params, result_handler=None):
+        start_time = time.perf_counter()
+        try:
+            return rpc_request(method, params, result_handler=result_handler)
+        except Exception:
+            rpc_request_errors.inc(method=method)
+            raise
+        finally:
+            duration = time.perf_counter() - start_time
+            rpc_time.total = get_rpc_time() + duration
+            rpc_request_seconds.observe(duration, method=method)
+
+    substrate.rpc_request = timed_rpc_request
+    substrate._metrics_instrumented = True
+    return substrate
+
+
+def instrument_engine(engine):
+    """
+    Counts executed SQL statements per statement type
+    """
+    @event.listens_for(engine, 'before_cursor_execute')
+    def count_statement(conn, cursor, statement, parameters, context, executemany):
+        db_statements.inc(statement=statement.lstrip().split(' ', 1)[0].upper())
+
+    return engine
+
+
+def instrument_session_factory(session_factory):
+    """
+    Times session flushes of all sessions created by the given sessionmaker
+    """
+    @event.listens_for(session_factory, 'before_flush')
+    def before_flush(session, flush_context, instances):
+        session.info['flush_start_time'] = time.perf_counter()
+
+    @event.listens_for(session_factory, 'after_flush_postexec')
+    def after_flush(session, flush_context):
+        start_time = session.info.pop('flush_start_time', None)
+        if start_time is not None:
+            db_flush_seconds.observe(time.perf_counter() - start_time)
+
+    return session_factory
+
+
+@contextmanager
+def time_stage(operation, stage, decode=False):
+    """
+    Times a stage of an operation; with `decode` set, the stage duration minus the RPC time spent within the stage
+    is recorded as decode time as well
+    """
+    start_time = time.perf_counter()
+    start_rpc_time = get_rpc_time()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - start_time
+        stage_seconds.observe(duration, operation=operation, stage=stage)
+        if decode:
+            decode_seconds.observe(max(duration - (get_rpc_time() - start_rpc_time), 0), stage=stage)
+
+
+@contextmanager
+def time_operation(operation):
+    start_time = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        operation_errors.inc(operation=operation)
+        raise
+    finally:
+        operation_seconds.observe(time.perf_counter() - start_time, operation=operation)
+
+
+def time_processor(processor, hook):
+    return processor_seconds.time(processor=processor.__class__.__name__, hook=hook)
+
+
+def get_redis_connection():
+    from redis import StrictRedis
+    return StrictRedis.from_url(settings.METRICS_REDIS_URL)
+
+
+def push_snapshot():
+    """
+    Publishes the metrics of this process to Redis, so they can be collected by the /metrics route
+    """
+    if not settings.METRICS_REDIS_URL:
+        return
+
+    key = '{}{}:{}'.format(REDIS_KEY_PREFIX, socket.gethostname(), os.getpid())
+    redis_conn = get_redis_connection()
+    try:
+        redis_conn.set(key, json.dumps(registry.snapshot()), ex=REDIS_SNAPSHOT_TTL)
+    finally:
+        redis_conn.close()
+
+
+def collect_snapshots():
+    """
+    Retrieves the metric snapshots published by other processes (Celery workers)
+    """
+    if not settings.METRICS_REDIS_URL:
+        return []
+
+    own_key = '{}{}:{}'.format(REDIS_KEY_PREFIX, socket.gethostname(), os.getpid())
+    redis_conn = get_redis_connection()
+    try:
+        keys = [key for key in redis_conn.scan_iter(match=REDIS_KEY_PREFIX + '*') if key.decode() != own_key]
+        if not keys:
+            return []
+        return [json.loads(value) for value in redis_conn.mget(keys) if value]
+    finally:
+        redis_conn.close()
+
+
+def render_metrics():
+    return registry.render(collect_snapshots())
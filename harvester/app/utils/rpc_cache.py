@@ -0,0 +1,67 @@
+#  Polkascan PRE Harvester
+#
+#  Copyright 2018-2020 openAware BV (NL).
+#  This file is part of Polkascan.
+#
+#  Polkascan is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  Polkascan is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with Polkascan. If not, see <http://www.gnu.org/licenses/>.
+#
+#  rpc_cache.py
+#
+#  Process-wide cache of immutable RPC responses, configured by the RPC_CACHE_* settings and passed to every
+#  SubstrateInterface of the harvester. Hits and misses are counted in the harvester metrics.
+from app import settings
+from app.utils import metrics
+from substrateinterface.utils.caching import RPCResponseCache, MemoryCacheBackend, DiskCacheBackend, \
+    RedisCacheBackend
+
+rpc_cache = None
+
+
+class HarvesterRPCResponseCache(RPCResponseCache):
+
+    def get(self, method, params):
+        response = super().get(method, params)
+
+        if response is None:
+            metrics.rpc_cache_misses.inc(method=method)
+        else:
+            metrics.rpc_cache_hits.inc(method=method)
+
+        return response
+
+
+def create_backend(name):
+    if name == 'memory':
+        return MemoryCacheBackend(max_bytes=settings.RPC_CACHE_MEMORY_BYTES)
+    elif name == 'disk':
+        return DiskCacheBackend(settings.RPC_CACHE_DIR)
+    elif name == 'redis':
+        return RedisCacheBackend(url=settings.RPC_CACHE_REDIS_URL)
+    else:
+        raise ValueError('Unknown RPC cache backend "{}"'.format(name))
+
+
+def get_rpc_cache():
+    """
+    Returns the RPC response cache of this process, or None when RPC_CACHE_BACKENDS is not set
+    """
+    global rpc_cache
+
+    if rpc_cache is None and settings.RPC_CACHE_BACKENDS:
+        rpc_cache = HarvesterRPCResponseCache(
+            [create_backend(name.strip()) for name in settings.RPC_CACHE_BACKENDS.split(',') if name.strip()],
+            namespace=settings.RPC_CACHE_NAMESPACE
+        )
+
+    return rpc_cache
@@ -1,6 +1,7 @@
 from scalecodec.types import GenericMetadataVersioned, GenericPalletMetadata, GenericStorageEntryMetadata
 from scalecodec.base import ScaleBytes, RuntimeConfiguration
 from substrateinterface import SubstrateInterface
+from substrateinterface.exceptions import StorageFunctionNotFound
 from app.models.data import RuntimeStorage
 
 
@@ -60,3 +61,59 @@ def query_storage_by_db(storage_obj: RuntimeStorage, substrate: SubstrateInterfa
                  param_types=param_types,
                  param_hashers=storage_obj.get_hashers(), params=params, value_type=storage_obj.type_value,
                  block_hash=block_hash)
+
+
+def query_storage_multi(pallet_name: str, storage_name: str, substrate: SubstrateInterface, block_hash,
+                        params_list: list, chunk_size: int = 1000):
+    """
+    Retrieves a storage function for many parameter sets at once, using one `state_queryStorageAt` request per
+    `chunk_size` keys instead of one request per key. Returns the decoded values in the order of `params_list`, None
+    for keys without a value.
+    """
+    substrate.init_runtime(block_hash=block_hash)
+
+    module: GenericPalletMetadata = substrate.metadata_decoder.get_metadata_pallet(pallet_name)
+    storage_func: GenericStorageEntryMetadata = module.get_storage_function(storage_name) if module else None
+    if storage_func is None:
+        raise StorageFunctionNotFound('Storage function "{}.{}" not found'.format(pallet_name, storage_name))
+
+    param_types = storage_func.get_params_type_string()
+    param_hashers = storage_func.get_param_hashers()
+    value_type = storage_func.get_value_type_string()
+
+    storage_keys = []
+    for params in params_list:
+        encoded_params = []
+        for idx, param in enumerate(params):
+            if type(param) is bytes:
+                param = f'0x{param.hex()}'
+            param_obj = substrate.runtime_config.create_scale_object(type_string=param_types[idx])
+            encoded_params.append(param_obj.encode(param))
+
+        storage_keys.append(substrate.generate_storage_hash(
+            storage_module=module.value['storage']['prefix'],
+            storage_function=storage_name,
+            params=encoded_params,
+            hashers=param_hashers
+        ))
+
+    storage_values = {}
+    for offset in range(0, len(storage_keys), chunk_size):
+        response = substrate.rpc_request(
+            "state_queryStorageAt", [storage_keys[offset:offset + chunk_size], block_hash]
+        )
+        for result_group in response.get('result') or []:
+            for storage_key, storage_value in result_group['changes']:
+                storage_values[storage_key] = storage_value
+
+    results = []
+    for storage_key in storage_keys:
+        storage_value = storage_values.get(storage_key)
+        if storage_value is None:
+            results.append(None)
+        else:
+            scale_class = substrate.runtime_config.create_scale_object(value_type, data=ScaleBytes(storage_value))
+            scale_class.decode()
+            results.append(scale_class)
+
+    return results
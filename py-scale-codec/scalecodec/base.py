@@ -15,8 +15,10 @@
 # limitations under the License.
 
 import re
+import threading
 import warnings
 from abc import ABC, abstractmethod
+from collections import OrderedDict
 from typing import Optional, TYPE_CHECKING, Union
 from scalecodec.exceptions import RemainingScaleBytesNotEmptyException, InvalidScaleTypeValueException
 
@@ -46,11 +48,15 @@ class RuntimeConfigurationObject:
         return set(class_.__subclasses__()).union(
             [s for c in class_.__subclasses__() for s in cls.all_subclasses(c)])
 
-    def __init__(self, config_id=None, ss58_format=None, only_primitives_on_init=False, implements_scale_info=False):
+    def __init__(self, config_id=None, ss58_format=None, only_primitives_on_init=False, implements_scale_info=False,
+                 init_type_registry=True):
         self.config_id = config_id
         self.type_registry = {'types': {}}
         self.__initial_state = False
-        self.clear_type_registry()
+
+        # Skipping the initial (expensive) clear_type_registry is only useful when a snapshot is restored right after
+        if init_type_registry:
+            self.clear_type_registry()
         self.active_spec_version_id = None
         self.chain_id = None
 
@@ -165,6 +171,10 @@ class RuntimeConfigurationObject:
             # print('create_scale_object, type_string: {}, decoder_class: {}'.format(type_string, decoder_class))
 
         if decoder_class:
+            # Pass runtime configuration explicitly: the class variable set by get_decoder_class() is shared by all
+            # configurations that registered the same class and could be overwritten by another thread
+            if kwargs.get('runtime_config') is None:
+                kwargs['runtime_config'] = self
             return decoder_class(data=data, **kwargs)
 
         raise NotImplementedError('Decoder class for "{}" not found'.format(type_string))
@@ -266,12 +276,59 @@ class RuntimeConfigurationObject:
         self.chain_id = type_registry.get('chain_id')
 
         self.type_registry['versioning'] = type_registry.get('versioning')
-        self.type_registry['runtime_upgrades'] = type_registry.get('runtime_upgrades')
+
+        # Copied because set_runtime_upgrades_head() updates the list, which could be part of a shared preset
+        if type_registry.get('runtime_upgrades') is not None:
+            self.type_registry['runtime_upgrades'] = [list(item) for item in type_registry['runtime_upgrades']]
+        else:
+            self.type_registry['runtime_upgrades'] = None
 
         # Update types
         if 'types' in type_registry:
             self.update_type_registry_types(type_registry.get('types'))
 
+    def get_type_registry_snapshot(self) -> dict:
+        """
+        Returns a copy of the current state of the type registry, which can be applied to this or any other
+        RuntimeConfigurationObject with `restore_type_registry_snapshot`. The decoder classes themselves are shared.
+
+        Returns
+        -------
+        dict
+        """
+        return {
+            'type_registry': self.copy_type_registry(self.type_registry),
+            'active_spec_version_id': self.active_spec_version_id,
+            'chain_id': self.chain_id,
+            'implements_scale_info': self.implements_scale_info
+        }
+
+    def restore_type_registry_snapshot(self, snapshot: dict):
+        """
+        Replaces the type registry with a copy of given snapshot, which is a lot cheaper than clearing and rebuilding
+        it from type registry presets. The snapshot itself is left unmodified and can be restored again.
+
+        Parameters
+        ----------
+        snapshot: result of `get_type_registry_snapshot`
+        """
+        self.__initial_state = False
+        self.type_registry = self.copy_type_registry(snapshot['type_registry'])
+        self.active_spec_version_id = snapshot['active_spec_version_id']
+        self.chain_id = snapshot['chain_id']
+        self.implements_scale_info = snapshot['implements_scale_info']
+
+    @staticmethod
+    def copy_type_registry(type_registry: dict) -> dict:
+        # Only the parts that are modified in place are copied, versioning is read-only
+        type_registry = dict(type_registry)
+        type_registry['types'] = dict(type_registry.get('types', {}))
+
+        if type_registry.get('runtime_upgrades') is not None:
+            type_registry['runtime_upgrades'] = [list(item) for item in type_registry['runtime_upgrades']]
+
+        return type_registry
+
     def set_active_spec_version_id(self, spec_version_id):
 
         if spec_version_id != self.active_spec_version_id:
@@ -775,6 +832,253 @@ class RuntimeConfiguration(RuntimeConfigurationObject, metaclass=Singleton):
     pass
 
 
+class RuntimeContext:
+
+    def __init__(self, spec_version: int, runtime_config: RuntimeConfigurationObject,
+                 metadata: 'GenericMetadataVersioned', transaction_version: int = None):
+        """
+        Bundles the metadata and the fully initialized type registry of one runtime (spec version), so SCALE data of
+        that runtime can be decoded without touching any shared state. The context owns its RuntimeConfigurationObject
+        and must be treated as immutable after creation, which allows using one context from multiple threads and
+        decoding data of different runtimes in parallel.
+
+        Parameters
+        ----------
+        spec_version: spec version of the runtime
+        runtime_config: RuntimeConfigurationObject with the type registry of the runtime, exclusively used by this
+        context
+        metadata: decoded metadata of the runtime
+        transaction_version: transaction version of the runtime
+        """
+        self.spec_version = spec_version
+        self.transaction_version = transaction_version
+        self.runtime_config = runtime_config
+        self.metadata = metadata
+
+        self.__decoder_classes = {}
+        self.__events_type_string = None
+
+    @property
+    def implements_scale_info(self) -> bool:
+        return self.metadata.portable_registry is not None
+
+    @property
+    def ss58_format(self) -> Optional[int]:
+        return self.runtime_config.ss58_format
+
+    def get_decoder_class(self, type_string: str):
+        """
+        Returns the decoder class for given type string, resolved once per context
+
+        Parameters
+        ----------
+        type_string
+
+        Returns
+        -------
+        ScaleDecoder subclass or None if not found
+        """
+        try:
+            return self.__decoder_classes[type_string]
+        except KeyError:
+            decoder_class = self.runtime_config.get_decoder_class(type_string)
+            if decoder_class is not None:
+                self.__decoder_classes[type_string] = decoder_class
+            return decoder_class
+
+    def create_scale_object(self, type_string: str, data: Optional['ScaleBytes'] = None, **kwargs) -> 'ScaleType':
+        """
+        Creates a new `ScaleType` object bound to the runtime configuration and metadata of this context
+
+        Parameters
+        ----------
+        type_string: string representation of a `ScaleType`
+        data: ScaleBytes data to decode
+        kwargs
+
+        Returns
+        -------
+        ScaleType
+        """
+        decoder_class = self.get_decoder_class(type_string)
+
+        if decoder_class is None:
+            raise NotImplementedError('Decoder class for "{}" not found'.format(type_string))
+
+        kwargs.setdefault('metadata', self.metadata)
+        kwargs['runtime_config'] = self.runtime_config
+
+        return decoder_class(data=data, **kwargs)
+
+    def decode_scale(self, type_string: str, scale_bytes: Union['ScaleBytes', str, bytes],
+                     return_scale_obj: bool = False):
+        """
+        Decodes SCALE-bytes according to given type string
+
+        Parameters
+        ----------
+        type_string
+        scale_bytes: ScaleBytes, hex string or bytes
+        return_scale_obj: if True the SCALE object itself is returned, otherwise the serialized value of the object
+
+        Returns
+        -------
+        ScaleType or its serialized value
+        """
+        if type(scale_bytes) is not ScaleBytes:
+            scale_bytes = ScaleBytes(scale_bytes)
+
+        obj = self.create_scale_object(type_string, data=scale_bytes)
+        obj.decode()
+
+        if return_scale_obj:
+            return obj
+        return obj.value
+
+    def decode_extrinsic(self, extrinsic_data: Union['ScaleBytes', str, bytes]) -> 'ScaleType':
+        """
+        Decodes an extrinsic as included in a block
+
+        Parameters
+        ----------
+        extrinsic_data: ScaleBytes, hex string or bytes
+
+        Returns
+        -------
+        Extrinsic
+        """
+        return self.decode_scale('Extrinsic', extrinsic_data, return_scale_obj=True)
+
+    def decode_events(self, events_data: Union['ScaleBytes', str, bytes, None]) -> 'ScaleType':
+        """
+        Decodes the value of storage function System.Events
+
+        Parameters
+        ----------
+        events_data: ScaleBytes, hex string or bytes of the storage value, None when the storage is empty
+
+        Returns
+        -------
+        Vec of EventRecord
+        """
+        events_type_string = self.get_events_type_string()
+
+        if events_data is None:
+            # Empty storage, decode as empty Vec
+            events_data = '0x00'
+
+        return self.decode_scale(events_type_string, events_data, return_scale_obj=True)
+
+    def get_events_type_string(self) -> str:
+        if self.__events_type_string is None:
+            pallet = self.metadata.get_metadata_pallet('System')
+            storage_function = pallet.get_storage_function('Events') if pallet else None
+
+            if storage_function is None:
+                raise ValueError('Storage function System.Events not found in metadata')
+
+            self.__events_type_string = storage_function.get_value_type_string()
+
+        return self.__events_type_string
+
+    def decode_log(self, log_data: Union['ScaleBytes', str, bytes]) -> 'ScaleType':
+        """
+        Decodes a digest log of a block header
+
+        Parameters
+        ----------
+        log_data: ScaleBytes, hex string or bytes
+
+        Returns
+        -------
+        DigestItem
+        """
+        return self.decode_scale('sp_runtime::generic::digest::DigestItem', log_data, return_scale_obj=True)
+
+    def get_constant(self, module_name: str, constant_name: str) -> Optional['ScaleType']:
+        """
+        Returns the decoded constant for given module and constant name
+
+        Parameters
+        ----------
+        module_name
+        constant_name
+
+        Returns
+        -------
+        ScaleType or None if the constant is not defined in this runtime
+        """
+        for pallet in self.metadata.pallets:
+            if pallet.name == module_name and pallet.constants:
+                for constant in pallet.constants:
+                    if constant.value['name'] == constant_name:
+                        return self.decode_scale(
+                            constant.type, ScaleBytes(constant.constant_value), return_scale_obj=True
+                        )
+
+    def __repr__(self):
+        return f'<RuntimeContext(spec_version={self.spec_version})>'
+
+
+class RuntimeContextPool:
+
+    def __init__(self, max_size: int = 8):
+        """
+        Bounded, thread-safe pool of `RuntimeContext` objects per spec version. When full, the least recently used
+        context is evicted.
+
+        Parameters
+        ----------
+        max_size: maximum number of runtime contexts kept in the pool
+        """
+        self.max_size = max_size
+        self.contexts = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, spec_version: int) -> Optional[RuntimeContext]:
+        with self.lock:
+            context = self.contexts.get(spec_version)
+            if context is not None:
+                self.contexts.move_to_end(spec_version)
+            return context
+
+    def add(self, context: RuntimeContext) -> RuntimeContext:
+        """
+        Adds given context to the pool. When another thread already added a context for the same spec version, that
+        context is kept and returned instead, so all users share one context per spec version.
+
+        Parameters
+        ----------
+        context: RuntimeContext
+
+        Returns
+        -------
+        RuntimeContext
+        """
+        with self.lock:
+            pooled_context = self.contexts.get(context.spec_version)
+            if pooled_context is not None:
+                self.contexts.move_to_end(context.spec_version)
+                return pooled_context
+
+            self.contexts[context.spec_version] = context
+
+            while len(self.contexts) > self.max_size:
+                self.contexts.popitem(last=False)
+
+            return context
+
+    def clear(self):
+        with self.lock:
+            self.contexts.clear()
+
+    def __contains__(self, spec_version):
+        return spec_version in self.contexts
+
+    def __len__(self):
+        return len(self.contexts)
+
+
 class ScaleType(ScaleDecoder, ABC):
 
     scale_info_type: 'GenericRegistryType' = None
@@ -16,6 +16,7 @@
 
 import os
 import json
+from functools import lru_cache
 from typing import Optional
 
 import requests
@@ -62,6 +63,24 @@ def load_type_registry_preset(name: str, use_remote_preset: bool = False) -> Opt
             return None
 
 
+@lru_cache(maxsize=None)
+def load_cached_type_registry_preset(name: str) -> Optional[dict]:
+    """
+    Loads a type registry preset shipped with the local installed scalecodec package, parsed only once per process.
+    The returned dict is shared between all callers and must not be modified, use `load_type_registry_preset` to
+    obtain a private copy
+
+    Parameters
+    ----------
+    name
+
+    Returns
+    -------
+
+    """
+    return load_type_registry_preset(name)
+
+
 def load_type_registry_file(file_path: str) -> dict:
 
     with open(os.path.abspath(file_path), 'r') as fp:
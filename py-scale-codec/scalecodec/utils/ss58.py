@@ -21,13 +21,36 @@
     https://github.com/paritytech/substrate/wiki/External-Address-Format-(SS58)
 
 """
-from typing import Optional, Union
+from functools import lru_cache
+from string import hexdigits
+from typing import Optional, Union, Iterable, List
 
 import base58
 from hashlib import blake2b
 
 from scalecodec.base import ScaleBytes, RuntimeConfiguration
 
+# Maximum number of memoized results of both ss58_encode and ss58_decode
+SS58_CACHE_SIZE = 65536
+
+HEX_CHARACTERS = frozenset(hexdigits)
+
+
+def is_hex_account_id(value: str) -> bool:
+    """
+    Determines without decoding if given value is a hex encoded account ID rather than an SS58 address: either the
+    value is '0x' prefixed or it consists of 64 or 66 hex characters, lengths no SS58 address can have
+
+    Parameters
+    ----------
+    value: e.g. 0xd43593c715fdd31c61141abd04a99fd6822c8558854ccde39a5684e7a56da27d
+
+    Returns
+    -------
+    bool
+    """
+    return value.startswith('0x') or (len(value) in (64, 66) and HEX_CHARACTERS.issuperset(value))
+
 
 def ss58_decode(address: str, valid_ss58_format: Optional[int] = None) -> str:
     """
@@ -49,10 +72,18 @@ def ss58_decode(address: str, valid_ss58_format: Optional[int] = None) -> str:
     if address == '':
         raise ValueError("Empty address provided")
 
+    return _ss58_decode(address, valid_ss58_format)
+
+
+@lru_cache(maxsize=SS58_CACHE_SIZE)
+def _ss58_decode(address: str, valid_ss58_format: Optional[int]) -> str:
     checksum_prefix = b'SS58PRE'
 
     address_decoded = base58.b58decode(address)
 
+    if len(address_decoded) < 3:
+        raise ValueError("Invalid address length")
+
     if address_decoded[0] & 0b0100_0000:
         ss58_format_length = 2
         ss58_format = ((address_decoded[0] & 0b0011_1111) << 2) | (address_decoded[1] >> 6) | \
@@ -108,16 +139,23 @@ def ss58_encode(address: Union[str, bytes], ss58_format: int = 42) -> str:
     -------
 
     """
+    if type(address) is bytes:
+        address_bytes = address
+    elif type(address) is bytearray:
+        address_bytes = bytes(address)
+    else:
+        address_bytes = bytes.fromhex(address.replace('0x', ''))
+
+    return _ss58_encode(address_bytes, ss58_format)
+
+
+@lru_cache(maxsize=SS58_CACHE_SIZE)
+def _ss58_encode(address_bytes: bytes, ss58_format: int) -> str:
     checksum_prefix = b'SS58PRE'
 
     if ss58_format < 0 or ss58_format > 16383 or ss58_format in [46, 47]:
         raise ValueError("Invalid value for ss58_format")
 
-    if type(address) is bytes or type(address) is bytearray:
-        address_bytes = address
-    else:
-        address_bytes = bytes.fromhex(address.replace('0x', ''))
-
     if len(address_bytes) in [32, 33]:
         # Checksum size is 2 bytes for public key
         checksum_length = 2
@@ -141,6 +179,23 @@ def ss58_encode(address: Union[str, bytes], ss58_format: int = 42) -> str:
     return base58.b58encode(input_bytes + checksum[:checksum_length]).decode()
 
 
+def ss58_encode_batch(addresses: Iterable[Union[str, bytes, None]], ss58_format: int = 42) -> List[Optional[str]]:
+    """
+    Encodes a list of account IDs to Substrate addresses according to provided ss58_format. Recurring account IDs,
+    within the list or from earlier calls, are served from the memoization cache of `ss58_encode`
+
+    Parameters
+    ----------
+    addresses: account IDs as hex string or bytes, None values are passed through
+    ss58_format
+
+    Returns
+    -------
+    List of SS58 addresses in the same order as `addresses`
+    """
+    return [None if address is None else ss58_encode(address, ss58_format) for address in addresses]
+
+
 def ss58_encode_account_index(account_index: int, ss58_format: int = 42) -> str:
     """
     Encodes an AccountIndex to an Substrate address according to provided address_type
@@ -230,3 +285,39 @@ def is_valid_ss58_address(value: str, valid_ss58_format: Optional[int] = None) -
         return False
 
     return True
+
+
+def get_account_id_and_ss58_address(value: str, ss58_format: Optional[int] = None) -> tuple:
+    """
+    Resolves given SS58 address or hex account ID to both representations. Hex input is recognised with
+    `is_hex_account_id`, so only ambiguous values are tried as an SS58 address first
+
+    Parameters
+    ----------
+    value: SS58 address or hex account ID
+    ss58_format: required format of an SS58 address; SS58 addresses of another format are treated as hex input
+
+    Returns
+    -------
+    tuple of (account ID, SS58 address); a hex account ID is returned as provided and encoded with the default
+    ss58_format
+    """
+    if not is_hex_account_id(value):
+        try:
+            return ss58_decode(value, valid_ss58_format=ss58_format), value
+        except ValueError:
+            pass
+
+    return value, ss58_encode(value)
+
+
+def ss58_cache_info() -> dict:
+    """
+    Returns the hit and miss statistics of the encode and decode memoization caches
+    """
+    return {'encode': _ss58_encode.cache_info(), 'decode': _ss58_decode.cache_info()}
+
+
+def ss58_cache_clear():
+    _ss58_encode.cache_clear()
+    _ss58_decode.cache_clear()
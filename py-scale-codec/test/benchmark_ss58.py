@@ -0,0 +1,99 @@
+# Python SCALE Codec Library
+#
+# Copyright 2018-2021 Stichting Polkascan (Polkascan Foundation).
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+#  benchmark_ss58.py
+#
+#  Micro-benchmark of the SS58 codec on the key pairs of test_ss58.py, comparing uncached encoding/decoding with the
+#  memoized functions and ss58_encode_batch:
+#
+#      python -m test.benchmark_ss58 --rounds 10000
+
+import argparse
+import timeit
+
+from scalecodec.utils import ss58
+from test.test_ss58 import SS58TestCase
+
+
+def get_cases():
+    SS58TestCase.setUpClass()
+    return [SS58TestCase.alice_keypair] + SS58TestCase.subkey_pairs
+
+
+def report(name, seconds, operations):
+    print('{:<40}{:>12.3f}{:>14.0f}'.format(name, seconds * 1000, operations / seconds))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark SS58 encoding and decoding')
+    parser.add_argument('--rounds', type=int, default=10000, help='Number of passes over all test cases')
+    args = parser.parse_args()
+
+    cases = get_cases()
+    operations = args.rounds * len(cases)
+
+    public_keys = [(bytes.fromhex(case['public_key'][2:]), case['ss58_format']) for case in cases]
+    addresses = [(case['address'], case['ss58_format']) for case in cases]
+    hex_values = [case['public_key'] for case in cases]
+
+    def uncached_encode():
+        for address_bytes, ss58_format in public_keys:
+            ss58._ss58_encode.__wrapped__(address_bytes, ss58_format)
+
+    def cached_encode():
+        for address_bytes, ss58_format in public_keys:
+            ss58.ss58_encode(address_bytes, ss58_format)
+
+    def uncached_decode():
+        for address, ss58_format in addresses:
+            ss58._ss58_decode.__wrapped__(address, ss58_format)
+
+    def cached_decode():
+        for address, ss58_format in addresses:
+            ss58.ss58_decode(address, ss58_format)
+
+    def batch_encode():
+        ss58.ss58_encode_batch(hex_values)
+
+    def exception_discriminator():
+        for value in hex_values + [address for address, ss58_format in addresses]:
+            ss58.is_valid_ss58_address(value.replace('0x', ''))
+
+    def fast_discriminator():
+        for value in hex_values + [address for address, ss58_format in addresses]:
+            ss58.is_hex_account_id(value)
+
+    print('{} cases, {} rounds\n'.format(len(cases), args.rounds))
+    print('{:<40}{:>12}{:>14}'.format('benchmark', 'ms', 'ops/s'))
+
+    ss58.ss58_cache_clear()
+
+    for name, func, count in [
+        ('ss58_encode (uncached)', uncached_encode, operations),
+        ('ss58_encode (cached)', cached_encode, operations),
+        ('ss58_decode (uncached)', uncached_decode, operations),
+        ('ss58_decode (cached)', cached_decode, operations),
+        ('ss58_encode_batch', batch_encode, operations),
+        ('hex detection by SS58 decoding', exception_discriminator, operations * 2),
+        ('hex detection by is_hex_account_id', fast_discriminator, operations * 2),
+    ]:
+        report(name, timeit.timeit(func, number=args.rounds), count)
+
+    print('\n{}'.format(ss58.ss58_cache_info()))
+
+
+if __name__ == '__main__':
+    main()
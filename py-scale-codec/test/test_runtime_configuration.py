@@ -21,7 +21,7 @@ import unittest
 
 from scalecodec import Struct
 from scalecodec.base import RuntimeConfiguration, RuntimeConfigurationObject
-from scalecodec.type_registry import load_type_registry_preset
+from scalecodec.type_registry import load_type_registry_preset, load_cached_type_registry_preset
 
 
 class TestScaleDecoderClasses(unittest.TestCase):
@@ -121,5 +121,51 @@ class TestRuntimeIdCache(unittest.TestCase):
         self.assertGreater(runtime_config.get_runtime_id_from_upgrades(99999999998), 0)
 
 
+class TestTypeRegistrySnapshot(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.runtime_config = RuntimeConfigurationObject()
+        cls.runtime_config.update_type_registry(load_cached_type_registry_preset("metadata_types"))
+        cls.runtime_config.update_type_registry(load_cached_type_registry_preset("default"))
+        cls.runtime_config.update_type_registry(load_cached_type_registry_preset("kusama"))
+        cls.snapshot = cls.runtime_config.get_type_registry_snapshot()
+
+    def test_cached_preset_parsed_once(self):
+        self.assertIs(load_cached_type_registry_preset("kusama"), load_cached_type_registry_preset("kusama"))
+        self.assertEqual(load_type_registry_preset("kusama"), load_cached_type_registry_preset("kusama"))
+
+    def test_restore_snapshot(self):
+        runtime_config = RuntimeConfigurationObject(init_type_registry=False)
+        self.assertIsNone(runtime_config.get_decoder_class('AccountInfo'))
+
+        runtime_config.restore_type_registry_snapshot(self.snapshot)
+
+        self.assertIs(
+            self.runtime_config.get_decoder_class('AccountInfo'), runtime_config.get_decoder_class('AccountInfo')
+        )
+        self.assertEqual(1023, runtime_config.get_runtime_id_from_upgrades(54248))
+
+    def test_restored_snapshot_is_copy(self):
+        runtime_config = RuntimeConfigurationObject(init_type_registry=False)
+        runtime_config.restore_type_registry_snapshot(self.snapshot)
+
+        runtime_config.update_type_registry_types({'SnapshotTestType': 'u8'})
+        runtime_config.set_runtime_upgrades_head(99999999999)
+
+        self.assertIsNotNone(runtime_config.get_decoder_class('SnapshotTestType'))
+        self.assertIsNone(self.runtime_config.get_decoder_class('SnapshotTestType'))
+
+        for config in [self.runtime_config, RuntimeConfigurationObject(init_type_registry=False)]:
+            config.restore_type_registry_snapshot(self.snapshot)
+            self.assertIsNone(config.get_decoder_class('SnapshotTestType'))
+            self.assertIsNone(config.get_runtime_id_from_upgrades(99999999998))
+
+        self.assertIsNone(self.runtime_config.get_runtime_id_from_upgrades(99999999998))
+        self.assertNotIn(
+            [99999999999, -1], load_cached_type_registry_preset("kusama")['runtime_upgrades']
+        )
+
+
 if __name__ == '__main__':
     unittest.main()
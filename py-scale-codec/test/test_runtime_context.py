@@ -0,0 +1,141 @@
+# Python SCALE Codec Library
+#
+# Copyright 2018-2021 Stichting Polkascan (Polkascan Foundation).
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+#  test_runtime_context.py
+#
+
+import os
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from scalecodec.base import RuntimeConfigurationObject, ScaleBytes, RuntimeContext, RuntimeContextPool
+from scalecodec.type_registry import load_type_registry_file, load_type_registry_preset
+
+
+def create_runtime_context(spec_version, metadata_hex, ss58_format=42, scale_info=True):
+    runtime_config = RuntimeConfigurationObject(ss58_format=ss58_format, implements_scale_info=scale_info)
+    runtime_config.update_type_registry(load_type_registry_preset("metadata_types"))
+
+    if not scale_info:
+        runtime_config.update_type_registry(load_type_registry_preset("default"))
+        runtime_config.update_type_registry(load_type_registry_preset("kusama"))
+
+    metadata = runtime_config.create_scale_object('MetadataVersioned', data=ScaleBytes(metadata_hex))
+    metadata.decode()
+
+    if scale_info:
+        runtime_config.add_portable_registry(metadata)
+
+    runtime_config.set_active_spec_version_id(spec_version)
+
+    return RuntimeContext(spec_version, runtime_config, metadata)
+
+
+class TestRuntimeContext(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        module_path = os.path.dirname(__file__)
+        metadata_fixture_dict = load_type_registry_file(os.path.join(module_path, 'fixtures', 'metadata_hex.json'))
+
+        cls.legacy_context = create_runtime_context(2030, metadata_fixture_dict['V13'], scale_info=False)
+        cls.scale_info_context = create_runtime_context(9110, metadata_fixture_dict['V14'])
+        cls.kusama_context = create_runtime_context(9111, metadata_fixture_dict['V14'], ss58_format=2)
+
+    def test_implements_scale_info(self):
+        self.assertFalse(self.legacy_context.implements_scale_info)
+        self.assertTrue(self.scale_info_context.implements_scale_info)
+
+    def test_alternate_runtimes(self):
+        for context in [self.legacy_context, self.scale_info_context, self.legacy_context]:
+            obj = context.create_scale_object('u32', ScaleBytes('0x2a000000'))
+            self.assertIs(obj.runtime_config, context.runtime_config)
+            self.assertIs(obj.metadata, context.metadata)
+            self.assertEqual(42, obj.decode())
+
+    def test_decoder_class_cached(self):
+        self.assertIs(
+            self.scale_info_context.get_decoder_class('Vec<u8>'), self.scale_info_context.get_decoder_class('Vec<u8>')
+        )
+
+    def test_decode_extrinsic(self):
+        extrinsic = self.scale_info_context.decode_extrinsic('0x280403000b207eba5c8501')
+        self.assertEqual('Timestamp', extrinsic.value['call']['call_module'])
+        self.assertEqual(1672298004000, extrinsic.value['call']['call_args'][0]['value'])
+
+    def test_decode_empty_events(self):
+        self.assertEqual('Vec<EventRecord<Event, Hash>>', self.legacy_context.get_events_type_string())
+
+        for context in [self.legacy_context, self.scale_info_context]:
+            self.assertEqual([], context.decode_events(None).value)
+
+    def test_decode_log(self):
+        log_digest = self.scale_info_context.decode_log('0x0642414245340201000000ef55a50f00000000')
+        self.assertEqual(('0x42414245', '0x0201000000ef55a50f00000000'), log_digest.value['PreRuntime'])
+
+    def test_get_constant(self):
+        self.assertEqual(42, self.scale_info_context.get_constant('System', 'SS58Prefix').value)
+        self.assertIsNone(self.scale_info_context.get_constant('System', 'Unknown'))
+
+    def test_concurrent_decoding(self):
+        public_key = '0xd43593c715fdd31c61141abd04a99fd6822c8558854ccde39a5684e7a56da27d'
+        expected = {
+            self.scale_info_context: '5GrwvaEF5zXb26Fz9rcQpDWS57CtERHpNehXCPcNoHGKutQY',
+            self.kusama_context: 'HNZata7iMYWmk5RvZRTiAsSDhV8366zq2YGb3tLH5Upf74F'
+        }
+
+        def decode(context):
+            return context, context.decode_scale('AccountId', public_key)
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(executor.map(decode, [self.scale_info_context, self.kusama_context] * 50))
+
+        for context, address in results:
+            self.assertEqual(expected[context], address)
+
+
+class TestRuntimeContextPool(unittest.TestCase):
+
+    def create_context(self, spec_version):
+        return RuntimeContext(spec_version, RuntimeConfigurationObject(init_type_registry=False), None)
+
+    def test_evict_least_recently_used(self):
+        pool = RuntimeContextPool(max_size=2)
+        pool.add(self.create_context(1))
+        pool.add(self.create_context(2))
+
+        self.assertIsNotNone(pool.get(1))
+
+        pool.add(self.create_context(3))
+
+        self.assertEqual(2, len(pool))
+        self.assertIn(1, pool)
+        self.assertNotIn(2, pool)
+        self.assertIsNone(pool.get(2))
+
+    def test_add_existing_spec_version(self):
+        pool = RuntimeContextPool()
+        context = pool.add(self.create_context(1))
+
+        self.assertIs(context, pool.add(self.create_context(1)))
+        self.assertIs(context, pool.get(1))
+
+        pool.clear()
+        self.assertIsNone(pool.get(1))
+
+
+if __name__ == '__main__':
+    unittest.main()
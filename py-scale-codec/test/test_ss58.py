@@ -17,7 +17,8 @@
 import unittest
 
 from scalecodec.utils.ss58 import ss58_decode, ss58_encode, ss58_encode_account_index, ss58_decode_account_index, \
-    is_valid_ss58_address
+    is_valid_ss58_address, is_hex_account_id, ss58_encode_batch, get_account_id_and_ss58_address, ss58_cache_info, \
+    ss58_cache_clear
 
 
 class SS58TestCase(unittest.TestCase):
@@ -211,6 +212,75 @@ class SS58TestCase(unittest.TestCase):
         self.assertFalse(is_valid_ss58_address('d43593c715fdd31c61141abd04a99fd6822c8558854ccde39a5684e7a56da27d'))
         self.assertFalse(is_valid_ss58_address('incorrect_string'))
 
+    def test_is_hex_account_id(self):
+        self.assertTrue(is_hex_account_id(self.alice_keypair['public_key']))
+        self.assertTrue(is_hex_account_id(self.alice_keypair['public_key'][2:]))
+        self.assertTrue(is_hex_account_id('0x01'))
+        self.assertTrue(is_hex_account_id('03b9dc646dd71118e5f7fda681ad9eca36eb3ee96f344f582fbe7b5bcdebb13077'))
+
+        self.assertFalse(is_hex_account_id(self.alice_keypair['address']))
+        self.assertFalse(is_hex_account_id(self.alice_keypair['public_key'][2:-2]))
+        self.assertFalse(is_hex_account_id('3xygo'))
+
+        for subkey_pair in self.subkey_pairs:
+            self.assertFalse(is_hex_account_id(subkey_pair['address']))
+
+    def test_encode_batch(self):
+        public_keys = [subkey_pair['public_key'] for subkey_pair in self.subkey_pairs if subkey_pair['ss58_format'] == 42]
+
+        self.assertEqual(
+            [ss58_encode(public_key) for public_key in public_keys],
+            ss58_encode_batch(public_keys)
+        )
+        self.assertEqual(
+            ['g4b', None, 'g4b'],
+            ss58_encode_batch(['0x01', None, bytes([1])], ss58_format=2)
+        )
+
+    def test_encode_decode_cached(self):
+        ss58_cache_clear()
+
+        ss58_encode(self.alice_keypair['public_key'])
+        ss58_encode(bytearray.fromhex(self.alice_keypair['public_key'][2:]))
+        ss58_decode(self.alice_keypair['address'])
+        ss58_decode(self.alice_keypair['address'])
+
+        cache_info = ss58_cache_info()
+        self.assertEqual(1, cache_info['encode'].hits)
+        self.assertEqual(1, cache_info['encode'].misses)
+        self.assertEqual(1, cache_info['decode'].hits)
+        self.assertEqual(1, cache_info['decode'].misses)
+
+    def test_cached_decode_errors_not_cached(self):
+        for _ in range(2):
+            with self.assertRaises(ValueError) as cm:
+                ss58_decode('5GoKvZWG5ZPYL1WUovuHW3zJBWBP5eT8CbqjdRY4Q6iMaQub')
+
+            self.assertEqual('Invalid checksum', str(cm.exception))
+
+    def test_decode_too_short_address(self):
+        with self.assertRaises(ValueError) as cm:
+            ss58_decode('2')
+
+        self.assertEqual('Invalid address length', str(cm.exception))
+
+    def test_get_account_id_and_ss58_address(self):
+        self.assertEqual(
+            (self.alice_keypair['public_key'][2:], self.alice_keypair['address']),
+            get_account_id_and_ss58_address(self.alice_keypair['address'], ss58_format=42)
+        )
+        self.assertEqual(
+            (self.alice_keypair['public_key'], self.alice_keypair['address']),
+            get_account_id_and_ss58_address(self.alice_keypair['public_key'], ss58_format=42)
+        )
+        self.assertEqual(
+            (self.alice_keypair['public_key'][2:], self.alice_keypair['address']),
+            get_account_id_and_ss58_address(self.alice_keypair['public_key'][2:])
+        )
+
+        with self.assertRaises(ValueError):
+            get_account_id_and_ss58_address(self.alice_keypair['address'], ss58_format=2)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -204,7 +204,7 @@ setup(
     # projects.
     extras_require={  # Optional
         #'dev': ['check-manifest'],
-        'test': ['coverage', 'pytest'],
+        'test': ['coverage', 'pytest', 'requests-mock'],
     },
 
     # If there are data files included in your packages that need to be
@@ -20,8 +20,10 @@ from hashlib import blake2b
 import binascii
 import json
 import logging
+import queue
 import re
 import secrets
+import threading
 
 import nacl.bindings
 import nacl.public
@@ -31,9 +33,10 @@ from typing import Optional, Union
 from eth_keys.datatypes import PrivateKey
 from websocket import create_connection, WebSocketConnectionClosedException
 
-from scalecodec.base import ScaleDecoder, ScaleBytes, RuntimeConfigurationObject, ScaleType
+from scalecodec.base import ScaleDecoder, ScaleBytes, RuntimeConfigurationObject, ScaleType, RuntimeContext, \
+    RuntimeContextPool
 from scalecodec.types import GenericCall, GenericExtrinsic, Extrinsic
-from scalecodec.type_registry import load_type_registry_preset
+from scalecodec.type_registry import load_type_registry_preset, load_cached_type_registry_preset
 # from scalecodec.updater import update_type_registries
 
 from .key import extract_derive_path
@@ -43,6 +46,8 @@ from .exceptions import SubstrateRequestException, ConfigurationError, StorageFu
     ExtrinsicNotFound
 from .constants import *
 from .utils.ss58 import ss58_decode, ss58_encode, is_valid_ss58_address
+from .utils.caching import is_block_pinned_request
+from .utils.endpoints import RPCEndpointPool
 
 from bip39 import bip39_to_mini_secret, bip39_generate, bip39_validate
 import sr25519
@@ -52,6 +57,11 @@ __all__ = ['Keypair', 'KeypairType', 'SubstrateInterface', 'ExtrinsicReceipt', '
 
 logger = logging.getLogger(__name__)
 
+# Process wide caches shared by all SubstrateInterface instances: the chain name per node URL, used to auto discover
+# the type registry preset, and snapshots of the type registry built from the presets
+chain_name_cache = {}
+type_registry_snapshot_cache = {}
+
 
 class KeypairType:
     ED25519 = 0
@@ -487,19 +497,25 @@ class SubstrateInterface:
 
     def __init__(self, url=None, websocket=None, ss58_format=None, type_registry=None, type_registry_preset=None,
                  cache_region=None, runtime_config=None, use_remote_preset=False, ws_options=None,
-                 auto_discover=True, auto_reconnect=True):
+                 auto_discover=True, auto_reconnect=True, runtime_context_pool_size=8, rpc_cache=None,
+                 load_balancing='round_robin', endpoint_options=None):
         """
         A specialized class in interfacing with a Substrate node.
 
         Parameters
         ----------
-        url: the URL to the substrate node, either in format https://127.0.0.1:9933 or wss://127.0.0.1:9944
+        url: the URL to the substrate node, either in format https://127.0.0.1:9933 or wss://127.0.0.1:9944, or a list of
+        HTTP(S) URLs of nodes of the same chain to distribute requests over
         ss58_format: The address type which account IDs will be SS58-encoded to Substrate addresses. Defaults to 42, for Kusama the address type is 2
         type_registry: A dict containing the custom type registry in format: {'types': {'customType': 'u32'},..}
         type_registry_preset: The name of the predefined type registry shipped with the SCALE-codec, e.g. kusama
         cache_region: a Dogpile cache region as a central store for the metadata cache
         use_remote_preset: When True preset is downloaded from Github master, otherwise use files from local installed scalecodec package
         ws_options: dict of options to pass to the websocket-client create_connection function
+        runtime_context_pool_size: maximum number of runtime contexts kept by `get_runtime_context`
+        rpc_cache: an RPCResponseCache serving immutable RPC responses, e.g. of requests pinned to a block hash
+        load_balancing: 'round_robin' or 'least_outstanding', used when `url` is a list
+        endpoint_options: dict of options to pass to the RPCEndpointPool when `url` is a list, e.g. max_block_lag
         """
 
         if (not url and not websocket) or (url and websocket):
@@ -516,11 +532,13 @@ class SubstrateInterface:
         self.__ss58_format = None
 
         if not runtime_config:
-            runtime_config = RuntimeConfigurationObject()
+            # Type registry is initialized by reload_type_registry() below
+            runtime_config = RuntimeConfigurationObject(init_type_registry=False)
 
         self.runtime_config = runtime_config
 
         self.cache_region = cache_region
+        self.rpc_cache = rpc_cache
 
         if ss58_format is not None:
             self.ss58_format = ss58_format
@@ -529,6 +547,17 @@ class SubstrateInterface:
         self.type_registry = type_registry
 
         self.request_id = 1
+        self.endpoint_pool = None
+        # Serializes RPC requests, see `rpc_request`
+        self.rpc_lock = threading.RLock()
+
+        if type(url) in (list, tuple):
+            if any(endpoint_url[0:6] == 'wss://' or endpoint_url[0:5] == 'ws://' for endpoint_url in url):
+                raise ValueError("Multiple endpoints are only supported for HTTP(S) URLs")
+
+            self.endpoint_pool = RPCEndpointPool(url, strategy=load_balancing, **(endpoint_options or {}))
+            url = url[0]
+
         self.url = url
         self.websocket = None
 
@@ -569,6 +598,9 @@ class SubstrateInterface:
         self.metadata_cache = {}
         self.type_registry_cache = {}
 
+        # Immutable per spec version runtime contexts, see get_runtime_context()
+        self.runtime_contexts = RuntimeContextPool(max_size=runtime_context_pool_size)
+
         self.debug = False
 
         self.config = {
@@ -607,7 +639,10 @@ class SubstrateInterface:
     def rpc_request(self, method, params, result_handler=None):
         """
         Method that handles the actual RPC request to the Substrate node. The other implemented functions eventually
-        use this method to perform the request.
+        use this method to perform the request. With an `rpc_cache` set, immutable responses are served from the cache.
+
+        Requests are serialized by `rpc_lock`, so HTTP connections can be used by several threads, such as the page
+        prefetcher of `query_map_iter`.
 
         Parameters
         ----------
@@ -619,6 +654,39 @@ class SubstrateInterface:
         -------
         a dict with the parsed result of the request.
         """
+        with self.rpc_lock:
+            return self.__cached_rpc_request(method, params, result_handler)
+
+    def __cached_rpc_request(self, method, params, result_handler=None):
+
+        if self.rpc_cache is None or result_handler or not self.rpc_cache.is_cacheable(method, params):
+            return self.__send_rpc_request(method, params, result_handler)
+
+        if method == 'chain_getBlockHash' and not self.__is_finalized_block_number(params[0]):
+            # Block hash of a block number can still change until finalized
+            return self.__send_rpc_request(method, params)
+
+        response = self.rpc_cache.get(method, params)
+
+        if response is None:
+            response = self.__send_rpc_request(method, params)
+
+            if self.rpc_cache.is_cacheable_response(method, response):
+                self.rpc_cache.set(method, params, response)
+
+        return response
+
+    def __is_finalized_block_number(self, block_number):
+        if self.rpc_cache.requires_finality_refresh(block_number):
+            finalized_block_hash = self.__send_rpc_request("chain_getFinalizedHead", []).get('result')
+            header = self.rpc_request("chain_getHeader", [finalized_block_hash]).get('result')
+
+            if header:
+                self.rpc_cache.update_finalized_block_number(int(header['number'], 16))
+
+        return self.rpc_cache.is_finalized_block_number(block_number)
+
+    def __send_rpc_request(self, method, params, result_handler=None):
 
         request_id = self.request_id
         self.request_id += 1
@@ -641,7 +709,7 @@ class SubstrateInterface:
                     self.debug_message("Connection Closed; Trying to reconnecting...")
                     self.connect_websocket()
 
-                    return self.rpc_request(method=method, params=params, result_handler=result_handler)
+                    return self.__send_rpc_request(method=method, params=params, result_handler=result_handler)
                 else:
                     # websocket connection is externally created, re-raise exception
                     raise
@@ -697,13 +765,18 @@ class SubstrateInterface:
             if result_handler:
                 raise ConfigurationError("Result handlers only available for websockets (ws://) connections")
 
-            response = self.session.request("POST", self.url, data=json.dumps(payload), headers=self.default_headers)
+            if self.endpoint_pool:
+                json_body = self.__post_balanced_request(method, params, payload)
+            else:
+                response = self.session.request(
+                    "POST", self.url, data=json.dumps(payload), headers=self.default_headers
+                )
 
-            if response.status_code != 200:
-                raise SubstrateRequestException(
-                    "RPC request failed with HTTP status code {}".format(response.status_code))
+                if response.status_code != 200:
+                    raise SubstrateRequestException(
+                        "RPC request failed with HTTP status code {}".format(response.status_code))
 
-            json_body = response.json()
+                json_body = response.json()
 
             # Check if response has error
             if 'error' in json_body:
@@ -711,6 +784,96 @@ class SubstrateInterface:
 
         return json_body
 
+    def __post_balanced_request(self, method, params, payload):
+        """
+        Posts the payload to an endpoint selected by the endpoint pool; requests failing on transport or HTTP level are
+        retried on the other endpoints. Block hash pinned requests without result are retried once on the endpoint with
+        the highest best block, as the selected endpoint might not have imported the block yet.
+
+        Returns
+        -------
+        The JSON body of the response
+        """
+        if self.endpoint_pool.requires_health_check():
+            self.check_endpoint_health()
+
+        pinned = is_block_pinned_request(method, params)
+        tried_endpoints = []
+        failed_endpoints = []
+
+        while True:
+            endpoint = self.endpoint_pool.select(pinned=pinned, exclude=failed_endpoints)
+            started_at = self.endpoint_pool.start_request(endpoint)
+            tried_endpoints.append(endpoint)
+
+            error = None
+            try:
+                response = self.session.request(
+                    "POST", endpoint.url, data=json.dumps(payload), headers=self.default_headers,
+                    timeout=self.endpoint_pool.request_timeout
+                )
+
+                if response.status_code != 200:
+                    error = SubstrateRequestException(
+                        "RPC request failed with HTTP status code {}".format(response.status_code))
+                else:
+                    json_body = response.json()
+            except (requests.RequestException, ValueError) as e:
+                error = e
+
+            self.endpoint_pool.finish_request(endpoint, started_at, error=error is not None)
+
+            if error is None:
+                if pinned and (json_body.get('result') is None or 'error' in json_body):
+                    best_endpoint = self.endpoint_pool.select(pinned=False, exclude=tried_endpoints)
+
+                    if best_endpoint and (best_endpoint.best_block_number or 0) > (endpoint.best_block_number or 0):
+                        # The block might not be imported yet by a lagging endpoint
+                        self.debug_message('RPC request "{}" without result on {}, retrying on {}'.format(
+                            method, endpoint.url, best_endpoint.url
+                        ))
+                        pinned = False
+                        continue
+
+                return json_body
+
+            failed_endpoints.append(endpoint)
+
+            if len(failed_endpoints) == len(self.endpoint_pool):
+                # All endpoints failed, fail like a request to a single endpoint would
+                raise error
+
+            self.debug_message('RPC request "{}" failed on {}, retrying on another endpoint'.format(
+                method, endpoint.url
+            ))
+
+    def check_endpoint_health(self):
+        """
+        Retrieves the best block of every endpoint of the endpoint pool, marking endpoints that lag behind or can't be
+        reached as unhealthy
+        """
+        best_block_numbers = {}
+
+        for endpoint in self.endpoint_pool.endpoints:
+            payload = {"jsonrpc": "2.0", "method": "chain_getHeader", "params": [], "id": self.request_id}
+            self.request_id += 1
+
+            started_at = self.endpoint_pool.start_request(endpoint)
+
+            try:
+                response = self.session.request(
+                    "POST", endpoint.url, data=json.dumps(payload), headers=self.default_headers,
+                    timeout=self.endpoint_pool.health_check_timeout
+                )
+                best_block_numbers[endpoint] = int(response.json()['result']['number'], 16)
+            except (requests.RequestException, ValueError, KeyError, TypeError) as e:
+                self.debug_message('Health check of {} failed: {}'.format(endpoint.url, e))
+                self.endpoint_pool.finish_request(endpoint, started_at, error=True)
+            else:
+                self.endpoint_pool.finish_request(endpoint, started_at)
+
+        self.endpoint_pool.update_best_block_numbers(best_block_numbers)
+
     @property
     def name(self):
         if self.__name is None:
@@ -726,7 +889,12 @@ class SubstrateInterface:
     @property
     def chain(self):
         if self.__chain is None:
-            self.__chain = self.rpc_request("system_chain", []).get('result')
+            if self.url in chain_name_cache:
+                self.__chain = chain_name_cache[self.url]
+            else:
+                self.__chain = self.rpc_request("system_chain", []).get('result')
+                if self.url and self.__chain is not None:
+                    chain_name_cache[self.url] = self.__chain
         return self.__chain
 
     @property
@@ -1096,17 +1264,52 @@ class SubstrateInterface:
         self.block_hash = block_hash
         self.block_id = block_id
 
+        runtime_block_hash, runtime_info = self.__get_runtime_block_info(self.block_hash)
+
+        # Check if runtime state already set to current block
+        if runtime_info.get("specVersion") == self.runtime_version:
+            return
+
+        self.runtime_version = runtime_info.get("specVersion")
+        self.transaction_version = runtime_info.get("transactionVersion")
+
+        self.metadata_decoder = self.__get_runtime_metadata(self.runtime_version, runtime_block_hash)
+
+        # Update type registry
+        self.reload_type_registry(
+            use_remote_preset=self.config.get('use_remote_preset'),
+            auto_discover=self.config.get('auto_discover')
+        )
+
+        # Check if PortableRegistry is present in metadata (V14+), otherwise fall back on legacy type registry (<V14)
+        if self.implements_scaleinfo():
+            self.debug_message('Add PortableRegistry from metadata to type registry')
+            self.runtime_config.add_portable_registry(self.metadata_decoder)
+
+        # Set active runtime version
+        self.runtime_config.set_active_spec_version_id(self.runtime_version)
+
+        # Check and apply runtime constants
+        ss58_prefix_constant = self.get_constant("System", "SS58Prefix", block_hash=block_hash)
+
+        if ss58_prefix_constant:
+            self.ss58_format = ss58_prefix_constant.value
+
+    def __get_runtime_block_info(self, block_hash: str) -> tuple:
+        """
+        Returns the hash of the block of which the runtime applies to given block, with its runtime version info
+        """
         # In fact calls and storage functions are decoded against runtime of previous block, therefor retrieve
         # metadata and apply type registry of runtime of parent block
-        block_header = self.rpc_request('chain_getHeader', [self.block_hash])
+        block_header = self.rpc_request('chain_getHeader', [block_hash])
 
         if block_header['result'] is None:
-            raise BlockNotFound(f'Block not found for "{self.block_hash}"')
+            raise BlockNotFound(f'Block not found for "{block_hash}"')
 
         parent_block_hash = block_header['result']['parentHash']
 
         if parent_block_hash == '0x0000000000000000000000000000000000000000000000000000000000000000':
-            runtime_block_hash = self.block_hash
+            runtime_block_hash = block_hash
         else:
             runtime_block_hash = parent_block_hash
 
@@ -1115,54 +1318,136 @@ class SubstrateInterface:
         if runtime_info is None:
             raise SubstrateRequestException(f"No runtime information for block '{block_hash}'")
 
-        # Check if runtime state already set to current block
-        if runtime_info.get("specVersion") == self.runtime_version:
-            return
+        return runtime_block_hash, runtime_info
 
-        self.runtime_version = runtime_info.get("specVersion")
-        self.transaction_version = runtime_info.get("transactionVersion")
+    def __get_cached_metadata(self, spec_version: int):
 
-        if self.runtime_version not in self.metadata_cache and self.cache_region:
+        if spec_version not in self.metadata_cache and self.cache_region:
             # Try to retrieve metadata from Dogpile cache
-            cached_metadata = self.cache_region.get('METADATA_{}'.format(self.runtime_version))
+            cached_metadata = self.cache_region.get('METADATA_{}'.format(spec_version))
             if cached_metadata:
-                self.debug_message('Retrieved metadata for {} from Redis'.format(self.runtime_version))
-                self.metadata_cache[self.runtime_version] = cached_metadata
+                self.debug_message('Retrieved metadata for {} from Redis'.format(spec_version))
+                self.metadata_cache[spec_version] = cached_metadata
 
-        if self.runtime_version in self.metadata_cache:
+        if spec_version in self.metadata_cache:
             # Get metadata from cache
-            self.debug_message('Retrieved metadata for {} from memory'.format(self.runtime_version))
-            self.metadata_decoder = self.metadata_cache[self.runtime_version]
-        else:
-            self.metadata_decoder = self.get_block_metadata(block_hash=runtime_block_hash, decode=True)
-            self.debug_message('Retrieved metadata for {} from Substrate node'.format(self.runtime_version))
+            self.debug_message('Retrieved metadata for {} from memory'.format(spec_version))
+            return self.metadata_cache[spec_version]
+
+    def __get_runtime_metadata(self, spec_version: int, runtime_block_hash: str):
+
+        metadata_decoder = self.__get_cached_metadata(spec_version)
+
+        if metadata_decoder is None:
+            metadata_decoder = self.get_block_metadata(block_hash=runtime_block_hash, decode=True)
+            self.debug_message('Retrieved metadata for {} from Substrate node'.format(spec_version))
 
             # Update metadata cache
-            self.metadata_cache[self.runtime_version] = self.metadata_decoder
+            self.metadata_cache[spec_version] = metadata_decoder
 
             if self.cache_region:
-                self.debug_message('Stored metadata for {} in Redis'.format(self.runtime_version))
-                self.cache_region.set('METADATA_{}'.format(self.runtime_version), self.metadata_decoder)
+                self.debug_message('Stored metadata for {} in Redis'.format(spec_version))
+                self.cache_region.set('METADATA_{}'.format(spec_version), metadata_decoder)
 
-        # Update type registry
-        self.reload_type_registry(
-            use_remote_preset=self.config.get('use_remote_preset'),
-            auto_discover=self.config.get('auto_discover')
+        return metadata_decoder
+
+    def get_runtime_context(self, block_hash: str = None, spec_version: int = None) -> RuntimeContext:
+        """
+        Returns the `RuntimeContext` of the runtime that applies to given block_hash or spec_version (or chaintip if
+        both are omitted). Contexts are immutable and kept in a bounded pool per spec version, so unlike
+        `init_runtime` this does not modify the state of this SubstrateInterface, and SCALE data of multiple
+        runtimes can be decoded with their contexts at the same time, also from multiple threads.
+
+        The spec_version alone is sufficient when its metadata is already cached, otherwise the block_hash is used to
+        retrieve the runtime from the node. Note that RPC requests are not thread-safe, so retrieve contexts from one
+        thread and only share the retrieved contexts.
+
+        Parameters
+        ----------
+        block_hash
+        spec_version
+
+        Returns
+        -------
+        RuntimeContext
+        """
+        if spec_version is not None:
+            runtime_context = self.runtime_contexts.get(spec_version)
+            if runtime_context is not None:
+                return runtime_context
+
+        metadata_decoder = None
+        transaction_version = None
+
+        if spec_version is not None:
+            metadata_decoder = self.__get_cached_metadata(spec_version)
+
+        if metadata_decoder is None:
+            if not block_hash:
+                if spec_version is not None:
+                    raise ValueError(f'Metadata of spec version {spec_version} not cached, block_hash required')
+                block_hash = self.get_chain_head()
+
+            runtime_block_hash, runtime_info = self.__get_runtime_block_info(block_hash)
+            spec_version = runtime_info.get("specVersion")
+            transaction_version = runtime_info.get("transactionVersion")
+
+            runtime_context = self.runtime_contexts.get(spec_version)
+            if runtime_context is not None:
+                return runtime_context
+
+            metadata_decoder = self.__get_runtime_metadata(spec_version, runtime_block_hash)
+
+        return self.runtime_contexts.add(
+            self.create_runtime_context(spec_version, metadata_decoder, transaction_version=transaction_version)
         )
 
-        # Check if PortableRegistry is present in metadata (V14+), otherwise fall back on legacy type registry (<V14)
-        if self.implements_scaleinfo():
-            self.debug_message('Add PortableRegistry from metadata to type registry')
-            self.runtime_config.add_portable_registry(self.metadata_decoder)
+    def create_runtime_context(self, spec_version: int, metadata_decoder, transaction_version: int = None) \
+            -> RuntimeContext:
+        """
+        Creates a new `RuntimeContext` for given runtime, with a type registry of its own built from the type registry
+        presets and custom type registry of this SubstrateInterface. Use `get_runtime_context` to retrieve pooled
+        contexts instead.
 
-        # Set active runtime version
-        self.runtime_config.set_active_spec_version_id(self.runtime_version)
+        Parameters
+        ----------
+        spec_version
+        metadata_decoder: decoded metadata of the runtime
+        transaction_version
+
+        Returns
+        -------
+        RuntimeContext
+        """
+        implements_scaleinfo = metadata_decoder.portable_registry is not None
+
+        runtime_config = RuntimeConfigurationObject(init_type_registry=False)
+        runtime_config.restore_type_registry_snapshot(self.get_type_registry_snapshot(
+            use_remote_preset=self.config.get('use_remote_preset'),
+            auto_discover=self.config.get('auto_discover'),
+            implements_scaleinfo=implements_scaleinfo
+        ))
+
+        if self.type_registry:
+            runtime_config.update_type_registry(self.type_registry)
+
+        if implements_scaleinfo:
+            runtime_config.add_portable_registry(metadata_decoder)
+
+        runtime_config.set_active_spec_version_id(spec_version)
+        runtime_config.ss58_format = self.ss58_format
+
+        runtime_context = RuntimeContext(
+            spec_version, runtime_config, metadata_decoder, transaction_version=transaction_version
+        )
 
         # Check and apply runtime constants
-        ss58_prefix_constant = self.get_constant("System", "SS58Prefix", block_hash=block_hash)
+        ss58_prefix_constant = runtime_context.get_constant("System", "SS58Prefix")
 
         if ss58_prefix_constant:
-            self.ss58_format = ss58_prefix_constant.value
+            runtime_config.ss58_format = ss58_prefix_constant.value
+
+        return runtime_context
 
     def query_map(self, module: str, storage_function: str, params: Optional[list] = None, block_hash: str = None,
                   max_results: int = None, start_key: str = None, page_size: int = 100,
@@ -1203,6 +1488,124 @@ class SubstrateInterface:
         if params is None:
             params = []
 
+        storage_map = self.__prepare_storage_map(module, storage_function, params, block_hash)
+
+        if not start_key:
+            start_key = storage_map['prefix']
+
+        # Make sure if the max result is smaller than the page size, adjust the page size
+        if max_results is not None and max_results < page_size:
+            page_size = max_results
+
+        # Retrieve storage keys
+        response = self.rpc_request(
+            method="state_getKeysPaged", params=[storage_map['prefix'], page_size, start_key, block_hash]
+        )
+
+        if 'error' in response:
+            raise SubstrateRequestException(response['error']['message'])
+
+        result_keys = response.get('result')
+
+        result = []
+        last_key = None
+
+        if len(result_keys) > 0:
+
+            last_key = result_keys[-1]
+
+            # Retrieve corresponding value
+            response = self.rpc_request(method="state_queryStorageAt", params=[result_keys, block_hash])
+
+            if 'error' in response:
+                raise SubstrateRequestException(response['error']['message'])
+
+            changes = [item for result_group in response['result'] for item in result_group['changes']]
+
+            result = list(self.__decode_storage_map_changes(changes, storage_map, block_hash, ignore_decoding_errors))
+
+        return QueryMapResult(
+            records=result, page_size=page_size, module=module, storage_function=storage_function, params=params,
+            block_hash=block_hash, substrate=self, last_key=last_key, max_results=max_results,
+            ignore_decoding_errors=ignore_decoding_errors
+        )
+
+    def query_map_iter(self, module: str, storage_function: str, params: Optional[list] = None,
+                       block_hash: str = None, max_results: int = None, start_key: str = None, page_size: int = 1000,
+                       prefetch_pages: int = 1, ignore_decoding_errors: bool = True):
+        """
+        Streaming variant of `query_map` for scans of complete storage maps, e.g. System.Account. Key-value pairs are
+        yielded page by page, while the next `prefetch_pages` pages are retrieved in a background thread over a
+        separate connection to the node. At most `prefetch_pages` + 1 pages are held in memory.
+
+        Example:
+
+        ```
+        for account, account_info in substrate.query_map_iter('System', 'Account', page_size=1000):
+            print(f"Free balance of account '{account.value}': {account_info.value['data']['free']}")
+        ```
+
+        Parameters
+        ----------
+        module: The module name in the metadata, e.g. System or Balances.
+        storage_function: The storage function name, e.g. Account or Locks.
+        params: The input parameters in case of for example a `DoubleMap` storage function
+        block_hash: Optional block hash for result at given block, when left to None the chain tip at the start of
+            the scan will be used for all pages.
+        max_results: the maximum of results required, if set the query will stop fetching results when number is reached
+        start_key: The storage key used as offset for the results, for pagination purposes
+        page_size: The results are fetched from the node RPC in chunks of this size
+        prefetch_pages: Number of pages to retrieve ahead, 0 to retrieve pages on demand over the connection of this
+            instance. Prefetching is not available when the instance was created with an external websocket.
+        ignore_decoding_errors: When set this will catch all decoding errors, set the item to None and continue decoding
+
+        Returns
+        -------
+        Generator of [key, value] pairs, the same items as records of `QueryMapResult`
+        """
+
+        if block_hash is None:
+            # Retrieve chain tip
+            block_hash = self.get_chain_head()
+
+        if params is None:
+            params = []
+
+        storage_map = self.__prepare_storage_map(module, storage_function, params, block_hash)
+
+        if max_results is not None and max_results < page_size:
+            page_size = max_results
+
+        page_params = {
+            'prefix': storage_map['prefix'],
+            'start_key': start_key or storage_map['prefix'],
+            'page_size': page_size,
+            'block_hash': block_hash,
+            'max_results': max_results
+        }
+
+        if prefetch_pages > 0 and self.url and not self.websocket:
+            # Requests over HTTP are serialized by rpc_lock, so pages are retrieved through the endpoint pool and cache
+            pages = StoragePagePrefetcher(self.url, prefetch_pages=prefetch_pages, rpc_request=self.rpc_request,
+                                          **page_params)
+        elif prefetch_pages > 0 and self.url:
+            pages = StoragePagePrefetcher(self.url, ws_options=self.ws_options, prefetch_pages=prefetch_pages,
+                                          **page_params)
+        else:
+            pages = iter_storage_pages(self.rpc_request, **page_params)
+
+        try:
+            for changes in pages:
+                yield from self.__decode_storage_map_changes(changes, storage_map, block_hash, ignore_decoding_errors)
+        finally:
+            pages.close()
+
+    def __prepare_storage_map(self, module: str, storage_function: str, params: list, block_hash: str) -> dict:
+        """
+        Retrieves the storage function from the metadata and encodes given params (in place) to generate the storage
+        key prefix of the map
+        """
+
         self.init_runtime(block_hash=block_hash)
 
         # Retrieve storage module and function from metadata
@@ -1238,77 +1641,65 @@ class SubstrateInterface:
             hashers=key_hashers
         )
 
-        if not start_key:
-            start_key = prefix
-
-        # Make sure if the max result is smaller than the page size, adjust the page size
-        if max_results is not None and max_results < page_size:
-            page_size = max_results
-
-        # Retrieve storage keys
-        response = self.rpc_request(method="state_getKeysPaged", params=[prefix, page_size, start_key, block_hash])
-
-        if 'error' in response:
-            raise SubstrateRequestException(response['error']['message'])
+        key_hasher = key_hashers[len(params)]
 
-        result_keys = response.get('result')
-
-        result = []
-        last_key = None
+        if key_hasher == "Blake2_128Concat":
+            concat_hash_len = 32
+        elif key_hasher == "Twox64Concat":
+            concat_hash_len = 16
+        elif key_hasher == "Identity":
+            concat_hash_len = 0
+        else:
+            raise ValueError('Unsupported hash type')
 
-        def concat_hash_len(key_hasher: str) -> int:
-            if key_hasher == "Blake2_128Concat":
-                return 32
-            elif key_hasher == "Twox64Concat":
-                return 16
-            elif key_hasher == "Identity":
-                return 0
-            else:
-                raise ValueError('Unsupported hash type')
+        return {
+            'prefix': prefix,
+            'key_type': param_types[len(params)],
+            'key_offset': len(prefix) + concat_hash_len,
+            'value_type': value_type
+        }
 
-        if len(result_keys) > 0:
+    def __decode_storage_map_changes(self, changes: list, storage_map: dict, block_hash: str,
+                                     ignore_decoding_errors: bool = True):
+        """
+        Decodes [storage_key, value] changes of a storage map to [key, value] pairs of SCALE objects. Decoder classes
+        are resolved once per call instead of once per item.
+        """
 
-            last_key = result_keys[-1]
+        # Make sure the runtime of the block is active, in case it was changed between pages
+        self.init_runtime(block_hash=block_hash)
 
-            # Retrieve corresponding value
-            response = self.rpc_request(method="state_queryStorageAt", params=[result_keys, block_hash])
+        key_decoder_class = self.runtime_config.get_decoder_class(storage_map['key_type'])
+        value_decoder_class = self.runtime_config.get_decoder_class(storage_map['value_type'])
 
-            if 'error' in response:
-                raise SubstrateRequestException(response['error']['message'])
+        for storage_key, value in changes:
+            try:
+                item_key = self.__decode_with_class(
+                    key_decoder_class, storage_map['key_type'], '0x' + storage_key[storage_map['key_offset']:]
+                )
+            except Exception:
+                if not ignore_decoding_errors:
+                    raise
+                item_key = None
 
-            for result_group in response['result']:
-                for item in result_group['changes']:
-                    try:
-                        item_key = self.decode_scale(
-                            type_string=param_types[len(params)],
-                            scale_bytes='0x' + item[0][len(prefix) + concat_hash_len(key_hashers[len(params)]):],
-                            return_scale_obj=True,
-                            block_hash=block_hash
-                        )
-                    except Exception:
-                        if not ignore_decoding_errors:
-                            raise
-                        item_key = None
+            try:
+                item_value = self.__decode_with_class(value_decoder_class, storage_map['value_type'], value)
+            except Exception:
+                if not ignore_decoding_errors:
+                    raise
+                item_value = None
 
-                    try:
-                        item_value = self.decode_scale(
-                            type_string=value_type,
-                            scale_bytes=item[1],
-                            return_scale_obj=True,
-                            block_hash=block_hash
-                        )
-                    except Exception:
-                        if not ignore_decoding_errors:
-                            raise
-                        item_value = None
+            yield [item_key, item_value]
 
-                    result.append([item_key, item_value])
+    def __decode_with_class(self, decoder_class, type_string: str, scale_bytes: str) -> ScaleType:
+        if not decoder_class:
+            raise NotImplementedError('Decoder class for "{}" not found'.format(type_string))
 
-        return QueryMapResult(
-            records=result, page_size=page_size, module=module, storage_function=storage_function, params=params,
-            block_hash=block_hash, substrate=self, last_key=last_key, max_results=max_results,
-            ignore_decoding_errors=ignore_decoding_errors
+        obj = decoder_class(
+            data=ScaleBytes(scale_bytes), metadata=self.metadata_decoder, runtime_config=self.runtime_config
         )
+        obj.decode()
+        return obj
 
     def query(self, module: str, storage_function: str, params: list = None, block_hash: str = None,
               subscription_handler: callable = None, raw_storage_key: bytes = None) -> Optional[ScaleType]:
@@ -1507,13 +1898,14 @@ class SubstrateInterface:
         obj = self.query(module, storage_function, params=params, block_hash=block_hash)
         return {'result': obj.value if obj else None}
 
-    def get_events(self, block_hash: str = None) -> list:
+    def get_events(self, block_hash: str = None, runtime_context: RuntimeContext = None) -> list:
         """
         Convenience method to get events for a certain block (storage call for module 'System' and function 'Events')
 
         Parameters
         ----------
         block_hash
+        runtime_context: Decode the events with given `RuntimeContext` instead of initializing the runtime of the block
 
         Returns
         -------
@@ -1524,6 +1916,10 @@ class SubstrateInterface:
         if not block_hash:
             block_hash = self.get_chain_head()
 
+        if runtime_context:
+            storage_data = self.get_storage_by_key(block_hash, self.generate_storage_hash("System", "Events"))
+            return runtime_context.decode_events(storage_data).elements
+
         storage_obj = self.query(module="System", storage_function="Events", block_hash=block_hash)
         if storage_obj:
             events += storage_obj.elements
@@ -2784,7 +3180,8 @@ class SubstrateInterface:
         if block:
             return {'block': block}
 
-    def decode_scale(self, type_string, scale_bytes, block_hash=None, return_scale_obj=False):
+    def decode_scale(self, type_string, scale_bytes, block_hash=None, return_scale_obj=False,
+                     runtime_context: RuntimeContext = None):
         """
         Helper function to decode arbitrary SCALE-bytes (e.g. 0x02000000) according to given RUST type_string
         (e.g. BlockNumber). The relevant versioning information of the type (if defined) will be applied if block_hash
@@ -2796,11 +3193,15 @@ class SubstrateInterface:
         scale_bytes
         block_hash
         return_scale_obj: if True the SCALE object itself is returned, otherwise the serialized dict value of the object
+        runtime_context: Decode with given `RuntimeContext` instead of initializing the runtime of block_hash
 
         Returns
         -------
 
         """
+        if runtime_context:
+            return runtime_context.decode_scale(type_string, scale_bytes, return_scale_obj=return_scale_obj)
+
         self.init_runtime(block_hash=block_hash)
 
         if type(scale_bytes) == str:
@@ -3069,27 +3470,131 @@ class SubstrateInterface:
         Reload type registry and preset used to instantiate the SubtrateInterface object. Useful to periodically apply
         changes in type definitions when a runtime upgrade occurred
 
+        The type registry built from local presets is cached per process as a snapshot, so only the first instance
+        for a combination of presets builds it; later instances and reloads restore a copy of the snapshot. Remote
+        presets are downloaded again on every reload, so updated definitions are applied.
+
+        Parameters
+        ----------
+        use_remote_preset: When True preset is downloaded from Github master, otherwise use files from local installed scalecodec package
+        auto_discover
+
+        Returns
+        -------
+
+        """
+        snapshot = self.get_type_registry_snapshot(use_remote_preset=use_remote_preset, auto_discover=auto_discover)
+        self.runtime_config.restore_type_registry_snapshot(snapshot)
+
+        if self.type_registry:
+            # Load type registries in runtime configuration
+            self.runtime_config.update_type_registry(self.type_registry)
+
+    def get_type_registry_snapshot(self, use_remote_preset: bool = True, auto_discover: bool = True,
+                                   implements_scaleinfo: bool = None) -> dict:
+        """
+        Returns the snapshot of the type registry built from the presets, excluding the custom type registry. The
+        snapshot of local presets is built on first use and cached per process, remote presets are downloaded and
+        built on every call.
+
         Parameters
         ----------
         use_remote_preset: When True preset is downloaded from Github master, otherwise use files from local installed scalecodec package
         auto_discover
+        implements_scaleinfo: Whether the runtime has a PortableRegistry in its metadata, defaults to the current runtime
+
+        Returns
+        -------
+        dict
+        """
+        if implements_scaleinfo is None:
+            implements_scaleinfo = self.implements_scaleinfo()
+
+        snapshot_key = self.get_type_registry_snapshot_key(
+            use_remote_preset, auto_discover, implements_scaleinfo=implements_scaleinfo
+        )
+        # Remote presets can change at any time, use_remote_preset is meant to pick up these changes
+        cached_snapshot = None if use_remote_preset else type_registry_snapshot_cache.get(snapshot_key)
+
+        if cached_snapshot is None:
+            runtime_config = RuntimeConfigurationObject()
+            runtime_config.implements_scale_info = implements_scaleinfo
+
+            # Load metadata types in runtime configuration
+            runtime_config.update_type_registry(
+                self.__load_type_registry_preset("metadata_types", use_remote_preset=use_remote_preset)
+            )
+            self.apply_type_registry_presets(
+                use_remote_preset=use_remote_preset, auto_discover=auto_discover, apply_custom_type_registry=False,
+                runtime_config=runtime_config, implements_scaleinfo=implements_scaleinfo
+            )
+
+            snapshot = runtime_config.get_type_registry_snapshot()
+
+            if not use_remote_preset:
+                type_registry_snapshot_cache[snapshot_key] = (snapshot, self.type_registry_preset)
+        else:
+            snapshot, type_registry_preset = cached_snapshot
+            self.debug_message(f"Restored type registry snapshot for preset {type_registry_preset}")
+
+            self.type_registry_preset = type_registry_preset
+
+        return snapshot
+
+    def get_type_registry_snapshot_key(self, use_remote_preset: bool = True, auto_discover: bool = True,
+                                       implements_scaleinfo: bool = None) -> tuple:
+        """
+        Returns the key of the cached type registry snapshot, consisting of everything the type registry built by
+        `apply_type_registry_presets` depends on, except the custom type registry
 
         Returns
         -------
+        tuple
+        """
+        if self.type_registry_preset is not None:
+            type_registry_preset = self.type_registry_preset
+        elif auto_discover:
+            # Outcome of auto discovery only depends on the chain name
+            type_registry_preset = ('chain', self.chain)
+        else:
+            type_registry_preset = None
+
+        if implements_scaleinfo is None:
+            implements_scaleinfo = self.implements_scaleinfo()
 
+        return implements_scaleinfo, type_registry_preset, use_remote_preset
+
+    @staticmethod
+    def clear_type_registry_cache():
+        """
+        Clears the process wide cache of chain names and type registry snapshots, e.g. after type registry presets
+        are updated
         """
-        self.runtime_config.clear_type_registry()
+        chain_name_cache.clear()
+        type_registry_snapshot_cache.clear()
+        load_cached_type_registry_preset.cache_clear()
+
+    @staticmethod
+    def __load_type_registry_preset(name: str, use_remote_preset: bool = False) -> Optional[dict]:
+        if use_remote_preset:
+            return load_type_registry_preset(name=name, use_remote_preset=use_remote_preset)
+        # Parsed once per process; only read by update_type_registry()
+        return load_cached_type_registry_preset(name)
+
+    def apply_type_registry_presets(self, use_remote_preset: bool = True, auto_discover: bool = True,
+                                    apply_custom_type_registry: bool = True,
+                                    runtime_config: RuntimeConfigurationObject = None,
+                                    implements_scaleinfo: bool = None):
 
-        self.runtime_config.implements_scale_info = self.implements_scaleinfo()
+        if runtime_config is None:
+            runtime_config = self.runtime_config
 
-        # Load metadata types in runtime configuration
-        self.runtime_config.update_type_registry(load_type_registry_preset(name="metadata_types"))
-        self.apply_type_registry_presets(use_remote_preset=use_remote_preset, auto_discover=auto_discover)
+        if implements_scaleinfo is None:
+            implements_scaleinfo = self.implements_scaleinfo()
 
-    def apply_type_registry_presets(self, use_remote_preset: bool = True, auto_discover: bool = True):
         if self.type_registry_preset is not None:
             # Load type registry according to preset
-            type_registry_preset_dict = load_type_registry_preset(
+            type_registry_preset_dict = self.__load_type_registry_preset(
                 name=self.type_registry_preset, use_remote_preset=use_remote_preset
             )
 
@@ -3100,7 +3605,7 @@ class SubstrateInterface:
             # Try to auto discover type registry preset by chain name
             type_registry_name = self.chain.lower().replace(' ', '-')
             try:
-                type_registry_preset_dict = load_type_registry_preset(type_registry_name)
+                type_registry_preset_dict = self.__load_type_registry_preset(type_registry_name)
                 self.debug_message(f"Auto set type_registry_preset to {type_registry_name} ...")
                 self.type_registry_preset = type_registry_name
             except ValueError:
@@ -3111,18 +3616,18 @@ class SubstrateInterface:
 
         if type_registry_preset_dict:
             # Load type registries in runtime configuration
-            if self.implements_scaleinfo() is False:
+            if implements_scaleinfo is False:
                 # Only runtime with no embedded types in metadata need the default set of explicit defined types
-                self.runtime_config.update_type_registry(
-                    load_type_registry_preset("default", use_remote_preset=use_remote_preset)
+                runtime_config.update_type_registry(
+                    self.__load_type_registry_preset("default", use_remote_preset=use_remote_preset)
                 )
 
             if self.type_registry_preset != "default":
-                self.runtime_config.update_type_registry(type_registry_preset_dict)
+                runtime_config.update_type_registry(type_registry_preset_dict)
 
-        if self.type_registry:
+        if apply_custom_type_registry and self.type_registry:
             # Load type registries in runtime configuration
-            self.runtime_config.update_type_registry(self.type_registry)
+            runtime_config.update_type_registry(self.type_registry)
 
 
 class ExtrinsicReceipt:
@@ -3528,3 +4033,183 @@ class QueryMapResult:
 
     def __getitem__(self, item):
         return self.records[item]
+
+
+def iter_storage_pages(rpc_request: callable, prefix: str, start_key: str, page_size: int, block_hash: str,
+                       max_results: int = None):
+    """
+    Retrieves consecutive pages of storage keys with given prefix and their values at given block
+
+    Parameters
+    ----------
+    rpc_request: function to perform an RPC request with, e.g. `SubstrateInterface.rpc_request`
+    prefix: storage key prefix of the map
+    start_key: storage key used as offset
+    page_size
+    block_hash
+    max_results: stop after this number of keys
+
+    Returns
+    -------
+    Generator of lists with [storage_key, value] changes
+    """
+    result_count = 0
+
+    while max_results is None or result_count < max_results:
+
+        if max_results is not None:
+            page_size = min(page_size, max_results - result_count)
+
+        response = rpc_request("state_getKeysPaged", [prefix, page_size, start_key, block_hash])
+
+        if 'error' in response:
+            raise SubstrateRequestException(response['error']['message'])
+
+        result_keys = response.get('result')
+
+        if not result_keys:
+            return
+
+        response = rpc_request("state_queryStorageAt", [result_keys, block_hash])
+
+        if 'error' in response:
+            raise SubstrateRequestException(response['error']['message'])
+
+        yield [item for result_group in response['result'] for item in result_group['changes']]
+
+        if len(result_keys) < page_size:
+            return
+
+        result_count += len(result_keys)
+        start_key = result_keys[-1]
+
+
+class StoragePagePrefetcher:
+
+    def __init__(self, url: str, prefix: str, start_key: str, page_size: int, block_hash: str,
+                 max_results: int = None, prefetch_pages: int = 1, ws_options: dict = None, rpc_request=None):
+        """
+        Iterates over the pages of `iter_storage_pages`, which are retrieved in a background thread, so retrieval of
+        the next pages overlaps with processing of the current page. A websocket connection of a SubstrateInterface
+        instance can't be shared with the thread, as it isn't thread-safe, so pages are then retrieved over a dedicated
+        connection to the node.
+
+        Parameters
+        ----------
+        url: the URL to the substrate node, used for a dedicated connection when `rpc_request` is not given
+        prefix: storage key prefix of the map
+        start_key: storage key used as offset
+        page_size
+        block_hash
+        max_results: stop after this number of keys
+        prefetch_pages: maximum number of retrieved pages waiting to be processed
+        ws_options: dict of options to pass to the websocket-client create_connection function
+        rpc_request: thread-safe function performing the RPC requests, e.g. `rpc_request` of a SubstrateInterface
+            connected over HTTP, which is serialized by its `rpc_lock` and applies its endpoint pool and RPC cache
+        """
+        self.url = url
+        self.ws_options = ws_options or {}
+        self.external_rpc_request = rpc_request
+        self.page_params = {
+            'prefix': prefix,
+            'start_key': start_key,
+            'page_size': page_size,
+            'block_hash': block_hash,
+            'max_results': max_results
+        }
+
+        self.request_id = 0
+        self.websocket = None
+        self.session = None
+
+        self.pages = queue.Queue(maxsize=max(prefetch_pages, 1))
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def rpc_request(self, method: str, params: list) -> dict:
+        self.request_id += 1
+
+        payload = {
+            "jsonrpc": "2.0",
+            "method": method,
+            "params": params,
+            "id": self.request_id
+        }
+
+        if self.websocket:
+            self.websocket.send(json.dumps(payload))
+
+            while True:
+                message = json.loads(self.websocket.recv())
+                if message.get('id') == self.request_id:
+                    break
+        else:
+            response = self.session.post(
+                self.url, data=json.dumps(payload), headers={'content-type': "application/json"}
+            )
+
+            if response.status_code != 200:
+                raise SubstrateRequestException(
+                    "RPC request failed with HTTP status code {}".format(response.status_code))
+
+            message = response.json()
+
+        if 'error' in message:
+            raise SubstrateRequestException(message['error']['message'])
+
+        return message
+
+    def put(self, item) -> bool:
+        # Wait for room in the queue, unless iteration is stopped by the consumer
+        while not self.stopped.is_set():
+            try:
+                self.pages.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def run(self):
+        try:
+            if self.external_rpc_request:
+                rpc_request = self.external_rpc_request
+            else:
+                if self.url[0:6] == 'wss://' or self.url[0:5] == 'ws://':
+                    self.websocket = create_connection(self.url, **self.ws_options)
+                else:
+                    self.session = requests.Session()
+                rpc_request = self.rpc_request
+
+            for page in iter_storage_pages(rpc_request, **self.page_params):
+                if not self.put(page):
+                    return
+
+            self.put(None)
+
+        except Exception as e:
+            self.put(e)
+
+        finally:
+            if self.websocket:
+                self.websocket.close()
+            if self.session:
+                self.session.close()
+
+    def __iter__(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run, name='storage-page-prefetcher', daemon=True)
+            self.thread.start()
+
+        while True:
+            page = self.pages.get()
+
+            if page is None:
+                return
+
+            if isinstance(page, Exception):
+                raise page
+
+            yield page
+
+    def close(self):
+        self.stopped.set()
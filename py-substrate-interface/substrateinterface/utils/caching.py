@@ -14,6 +14,13 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
 from functools import lru_cache
 
 
@@ -39,3 +46,261 @@ def block_dependent_lru_cache(maxsize=10, typed=False, block_arg_index=None):
 
         return wrapper
     return decorator
+
+
+# RPC methods whose response never changes for a given block hash, with the index of the block hash parameter.
+# Requests without block hash refer to the chain head and are never cached.
+IMMUTABLE_RPC_METHODS = {
+    'chain_getBlock': 0,
+    'chain_getHeader': 0,
+    'chain_getRuntimeVersion': 0,
+    'state_getRuntimeVersion': 0,
+    'state_getMetadata': 0,
+    'state_getStorage': 1,
+    'state_getStorageAt': 1,
+    'state_getKeys': 1,
+    'state_getKeysPaged': 3,
+    'state_queryStorageAt': 1
+}
+
+# RPC methods of which a null result is immutable as well, e.g. an empty storage value at given block
+NULLABLE_RPC_METHODS = ('state_getStorage', 'state_getStorageAt')
+
+
+def is_block_pinned_request(method, params):
+    """
+    Returns True when given RPC request is pinned to a block hash and its response therefore never changes
+    """
+    if method not in IMMUTABLE_RPC_METHODS:
+        return False
+
+    hash_index = IMMUTABLE_RPC_METHODS[method]
+    return len(params) > hash_index and params[hash_index] is not None
+
+
+class MemoryCacheBackend:
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        """
+        In-memory LRU cache backend, evicting least recently used entries when the total size of the stored values
+        exceeds `max_bytes`
+
+        Parameters
+        ----------
+        max_bytes: size budget of the stored values
+        """
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.__entries = OrderedDict()
+        self.__lock = threading.Lock()
+
+    def get(self, key):
+        with self.__lock:
+            value = self.__entries.get(key)
+            if value is not None:
+                self.__entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        if len(value) > self.max_bytes:
+            return
+
+        with self.__lock:
+            previous_value = self.__entries.pop(key, None)
+            if previous_value is not None:
+                self.size -= len(previous_value)
+
+            self.__entries[key] = value
+            self.size += len(value)
+
+            while self.size > self.max_bytes:
+                evicted_key, evicted_value = self.__entries.popitem(last=False)
+                self.size -= len(evicted_value)
+
+    def clear(self):
+        with self.__lock:
+            self.__entries.clear()
+            self.size = 0
+
+    def __len__(self):
+        return len(self.__entries)
+
+
+class DiskCacheBackend:
+
+    def __init__(self, path):
+        """
+        Local disk cache backend, storing every entry in a file named after the hash of its key
+
+        Parameters
+        ----------
+        path: cache directory, created when it does not exist
+        """
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+    def get_file_path(self, key):
+        digest = hashlib.sha256(key.encode()).hexdigest()
+        return os.path.join(self.path, digest[0:2], digest[2:])
+
+    def get(self, key):
+        try:
+            with open(self.get_file_path(key), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def set(self, key, value):
+        file_path = self.get_file_path(key)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+
+        # Write to a temporary file first, so concurrent readers never see a partially written entry
+        tmp_file_path = '{}.{}.tmp'.format(file_path, uuid.uuid4().hex)
+        with open(tmp_file_path, 'wb') as f:
+            f.write(value)
+        os.replace(tmp_file_path, file_path)
+
+
+class RedisCacheBackend:
+
+    def __init__(self, url=None, connection=None, prefix='substrate_rpc:', expiration_time=None):
+        """
+        Redis cache backend, to share the cache between processes and hosts. Requires the `redis` package.
+
+        Parameters
+        ----------
+        url: Redis URL, e.g. redis://localhost:6379/0
+        connection: existing Redis connection, instead of `url`
+        prefix: prefix of the Redis keys
+        expiration_time: seconds after which entries expire, None to keep them
+        """
+        if connection is None:
+            from redis import Redis
+            connection = Redis.from_url(url)
+
+        self.connection = connection
+        self.prefix = prefix
+        self.expiration_time = expiration_time
+
+    def get(self, key):
+        return self.connection.get(self.prefix + key)
+
+    def set(self, key, value):
+        self.connection.set(self.prefix + key, value, ex=self.expiration_time)
+
+
+class RPCResponseCache:
+
+    def __init__(self, backends, namespace='', finality_refresh_interval=6):
+        """
+        Cache of RPC responses that are immutable once retrieved: requests pinned to a block hash (see
+        `IMMUTABLE_RPC_METHODS`) and `chain_getBlockHash` requests of finalized block numbers. Entries are looked up
+        in given backends in order; a hit in a later backend is stored in the earlier ones, so e.g. a
+        MemoryCacheBackend can be placed in front of a shared RedisCacheBackend.
+
+        Parameters
+        ----------
+        backends: list of cache backends (MemoryCacheBackend, DiskCacheBackend, RedisCacheBackend)
+        namespace: prefix of the cache keys; use a namespace per chain when backends are shared between chains
+        finality_refresh_interval: minimum number of seconds between retrievals of the finalized block number
+        """
+        self.backends = backends
+        self.namespace = namespace
+        self.finality_refresh_interval = finality_refresh_interval
+
+        self.finalized_block_number = None
+        self.finalized_block_number_updated_at = None
+
+        self.hits = Counter()
+        self.misses = Counter()
+
+    def get_key(self, method, params):
+        return '{}{}:{}'.format(self.namespace, method, json.dumps(params, separators=(',', ':')))
+
+    def get(self, method, params):
+        """
+        Returns the cached response of given request, or None when not cached
+        """
+        key = self.get_key(method, params)
+
+        for index, backend in enumerate(self.backends):
+            value = backend.get(key)
+            if value is not None:
+                for previous_backend in self.backends[0:index]:
+                    previous_backend.set(key, value)
+
+                self.hits[method] += 1
+                return json.loads(value)
+
+        self.misses[method] += 1
+
+    def set(self, method, params, response):
+        """
+        Stores given response in all backends
+        """
+        key = self.get_key(method, params)
+        value = json.dumps(response, separators=(',', ':')).encode()
+
+        for backend in self.backends:
+            backend.set(key, value)
+
+    def is_cacheable(self, method, params):
+        """
+        Returns True when the response of given request is immutable, apart from the finality of block numbers
+        which is checked by `is_finalized_block_number`
+        """
+        if method in IMMUTABLE_RPC_METHODS:
+            return is_block_pinned_request(method, params)
+
+        if method == 'chain_getBlockHash':
+            return len(params) == 1 and type(params[0]) is int
+
+        return False
+
+    def is_cacheable_response(self, method, response):
+        return response.get('result') is not None or \
+            ('result' in response and method in NULLABLE_RPC_METHODS)
+
+    def requires_finality_refresh(self, block_number):
+        """
+        Returns True when given block number is beyond the last known finalized block number and the finalized block
+        number wasn't retrieved in the last `finality_refresh_interval` seconds
+        """
+        if self.finalized_block_number is not None and block_number <= self.finalized_block_number:
+            return False
+
+        return self.finalized_block_number_updated_at is None or \
+            time.monotonic() - self.finalized_block_number_updated_at >= self.finality_refresh_interval
+
+    def update_finalized_block_number(self, block_number):
+        self.finalized_block_number = max(block_number, self.finalized_block_number or 0)
+        self.finalized_block_number_updated_at = time.monotonic()
+
+    def is_finalized_block_number(self, block_number):
+        return self.finalized_block_number is not None and block_number <= self.finalized_block_number
+
+    def stats(self):
+        """
+        Returns the number of hits and misses and the hit rate, in total and per RPC method
+        """
+        methods = {}
+        for method in set(self.hits) | set(self.misses):
+            methods[method] = {
+                'hits': self.hits[method],
+                'misses': self.misses[method],
+                'hit_rate': self.hits[method] / (self.hits[method] + self.misses[method])
+            }
+
+        hits = sum(self.hits.values())
+        misses = sum(self.misses.values())
+
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': hits / (hits + misses) if hits + misses else None,
+            'methods': methods
+        }
+
+    def reset_stats(self):
+        self.hits.clear()
+        self.misses.clear()
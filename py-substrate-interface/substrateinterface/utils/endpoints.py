@@ -0,0 +1,236 @@
+# Python Substrate Interface Library
+#
+# Copyright 2018-2021 Stichting Polkascan (Polkascan Foundation).
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+import time
+
+LOAD_BALANCING_STRATEGIES = ('round_robin', 'least_outstanding')
+
+
+class RPCEndpoint:
+
+    def __init__(self, url):
+        """
+        Request statistics and health of a single RPC endpoint
+
+        Parameters
+        ----------
+        url: HTTP(S) URL of the node
+        """
+        self.url = url
+
+        self.requests = 0
+        self.errors = 0
+        self.consecutive_errors = 0
+        self.outstanding = 0
+        # Exponentially weighted moving average of the request duration in seconds
+        self.latency = None
+
+        self.best_block_number = None
+        self.lagging = False
+        self.ejected_until = None
+
+    def is_ejected(self, now):
+        return self.ejected_until is not None and now < self.ejected_until
+
+    def is_healthy(self, now):
+        return not self.lagging and not self.is_ejected(now)
+
+    def stats(self, now):
+        return {
+            'url': self.url,
+            'healthy': self.is_healthy(now),
+            'ejected': self.is_ejected(now),
+            'lagging': self.lagging,
+            'requests': self.requests,
+            'errors': self.errors,
+            'outstanding': self.outstanding,
+            'latency_ms': round(self.latency * 1000, 2) if self.latency is not None else None,
+            'best_block_number': self.best_block_number
+        }
+
+    def __repr__(self):
+        return '<RPCEndpoint(url={})>'.format(self.url)
+
+
+class RPCEndpointPool:
+
+    def __init__(self, urls, strategy='round_robin', max_consecutive_errors=3, ejection_time=30, max_block_lag=5,
+                 health_check_interval=10, latency_decay=0.2, request_timeout=30, health_check_timeout=5):
+        """
+        Distributes RPC requests over several nodes of the same chain, keeping track of their latency, errors and best
+        block. Endpoints are ejected for `ejection_time` seconds after `max_consecutive_errors` failed requests, and
+        while their best block lags more than `max_block_lag` blocks behind the best endpoint.
+
+        Requests pinned to a block hash are balanced over all healthy endpoints. Other requests depend on the chain
+        head of the node and are sent to the healthy endpoint with the highest best block, so consecutive head lookups
+        stay consistent.
+
+        Parameters
+        ----------
+        urls: list of HTTP(S) URLs of the nodes
+        strategy: 'round_robin' or 'least_outstanding' (fewest requests in flight, then lowest latency)
+        max_consecutive_errors: number of failed requests in a row after which an endpoint is ejected
+        ejection_time: seconds an endpoint stays ejected
+        max_block_lag: maximum number of blocks the best block of a healthy endpoint lags behind
+        health_check_interval: seconds between retrievals of the best blocks, see `requires_health_check`
+        latency_decay: weight of the most recent request in the latency average
+        request_timeout: seconds to wait for a response before the request is retried on another endpoint
+        health_check_timeout: seconds to wait for the best block of an endpoint
+        """
+        if not urls:
+            raise ValueError('At least one endpoint URL is required')
+
+        if strategy not in LOAD_BALANCING_STRATEGIES:
+            raise ValueError('Unknown load balancing strategy "{}", expected one of {}'.format(
+                strategy, ', '.join(LOAD_BALANCING_STRATEGIES)
+            ))
+
+        self.endpoints = [RPCEndpoint(url) for url in urls]
+        self.strategy = strategy
+        self.max_consecutive_errors = max_consecutive_errors
+        self.ejection_time = ejection_time
+        self.max_block_lag = max_block_lag
+        self.health_check_interval = health_check_interval
+        self.latency_decay = latency_decay
+        self.request_timeout = request_timeout
+        self.health_check_timeout = health_check_timeout
+
+        self.health_checked_at = None
+
+        self.__next_index = 0
+        self.__lock = threading.Lock()
+
+    @property
+    def urls(self):
+        return [endpoint.url for endpoint in self.endpoints]
+
+    def select(self, pinned=True, exclude=()):
+        """
+        Selects the endpoint for the next request
+
+        Parameters
+        ----------
+        pinned: True when the request is pinned to a block hash and can be served by any healthy endpoint
+        exclude: endpoints that already failed for this request
+
+        Returns
+        -------
+        RPCEndpoint, an unhealthy one when no healthy endpoints are left, or None when all are excluded
+        """
+        now = time.monotonic()
+
+        with self.__lock:
+            candidates = [endpoint for endpoint in self.endpoints if endpoint not in exclude]
+
+            if not candidates:
+                return None
+
+            healthy = [endpoint for endpoint in candidates if endpoint.is_healthy(now)]
+
+            if not healthy:
+                # Better to try an unhealthy endpoint than to fail; prefer the one ejected first
+                return min(candidates, key=lambda endpoint: endpoint.ejected_until or 0)
+
+            if not pinned:
+                return max(healthy, key=lambda endpoint: endpoint.best_block_number or 0)
+
+            if self.strategy == 'least_outstanding':
+                return min(healthy, key=lambda endpoint: (endpoint.outstanding, endpoint.latency or 0))
+
+            endpoint = healthy[self.__next_index % len(healthy)]
+            self.__next_index += 1
+            return endpoint
+
+    def start_request(self, endpoint):
+        """
+        Registers a request in flight to given endpoint
+
+        Returns
+        -------
+        start time of the request, to pass to `finish_request`
+        """
+        with self.__lock:
+            endpoint.outstanding += 1
+            endpoint.requests += 1
+
+        return time.monotonic()
+
+    def finish_request(self, endpoint, started_at, error=False):
+        """
+        Registers the outcome of a request to given endpoint, ejecting it after too many consecutive errors
+        """
+        now = time.monotonic()
+        duration = now - started_at
+
+        with self.__lock:
+            endpoint.outstanding -= 1
+
+            if endpoint.latency is None:
+                endpoint.latency = duration
+            else:
+                endpoint.latency += self.latency_decay * (duration - endpoint.latency)
+
+            if error:
+                endpoint.errors += 1
+                endpoint.consecutive_errors += 1
+
+                if endpoint.consecutive_errors >= self.max_consecutive_errors:
+                    endpoint.ejected_until = now + self.ejection_time
+            else:
+                endpoint.consecutive_errors = 0
+                endpoint.ejected_until = None
+
+    def requires_health_check(self):
+        return self.health_checked_at is None or \
+            time.monotonic() - self.health_checked_at >= self.health_check_interval
+
+    def update_best_block_numbers(self, best_block_numbers):
+        """
+        Updates the best blocks of the endpoints and marks endpoints lagging behind the best endpoint
+
+        Parameters
+        ----------
+        best_block_numbers: dict of RPCEndpoint and best block number, endpoints that couldn't be reached omitted
+        """
+        with self.__lock:
+            for endpoint, block_number in best_block_numbers.items():
+                endpoint.best_block_number = block_number
+
+            known_block_numbers = [
+                endpoint.best_block_number for endpoint in self.endpoints if endpoint.best_block_number is not None
+            ]
+
+            if known_block_numbers:
+                max_block_number = max(known_block_numbers)
+
+                for endpoint in self.endpoints:
+                    endpoint.lagging = endpoint.best_block_number is not None and \
+                        endpoint.best_block_number < max_block_number - self.max_block_lag
+
+            self.health_checked_at = time.monotonic()
+
+    def stats(self):
+        """
+        Returns the request statistics and health of all endpoints
+        """
+        now = time.monotonic()
+
+        with self.__lock:
+            return [endpoint.stats(now) for endpoint in self.endpoints]
+
+    def __len__(self):
+        return len(self.endpoints)
@@ -0,0 +1,289 @@
+# Python Substrate Interface Library
+#
+# Copyright 2018-2021 Stichting Polkascan (Polkascan Foundation).
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+import requests_mock
+
+from substrateinterface import SubstrateInterface
+from substrateinterface.utils.caching import RPCResponseCache, MemoryCacheBackend, DiskCacheBackend, \
+    RedisCacheBackend, is_block_pinned_request
+
+BLOCK_HASH = '0x' + '01' * 32
+FINALIZED_BLOCK_HASH = '0x' + '0a' * 32
+
+
+class FakeRedis:
+
+    def __init__(self):
+        self.values = {}
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def set(self, key, value, ex=None):
+        self.values[key] = value
+
+
+class TestBlockPinnedRequests(unittest.TestCase):
+
+    def test_pinned_requests(self):
+        self.assertTrue(is_block_pinned_request('chain_getBlock', [BLOCK_HASH]))
+        self.assertTrue(is_block_pinned_request('state_getStorageAt', ['0x00', BLOCK_HASH]))
+        self.assertTrue(is_block_pinned_request('state_getKeysPaged', ['0x00', 100, None, BLOCK_HASH]))
+
+    def test_head_requests(self):
+        self.assertFalse(is_block_pinned_request('chain_getBlock', []))
+        self.assertFalse(is_block_pinned_request('chain_getHeader', [None]))
+        self.assertFalse(is_block_pinned_request('state_getStorageAt', ['0x00']))
+        self.assertFalse(is_block_pinned_request('state_getKeysPaged', ['0x00', 100, None]))
+
+    def test_mutable_methods(self):
+        self.assertFalse(is_block_pinned_request('chain_getFinalizedHead', []))
+        self.assertFalse(is_block_pinned_request('system_health', [BLOCK_HASH]))
+
+
+class TestRPCResponseCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = RPCResponseCache([MemoryCacheBackend()], namespace='test:')
+
+    def test_is_cacheable(self):
+        self.assertTrue(self.cache.is_cacheable('state_getStorageAt', ['0x00', BLOCK_HASH]))
+        self.assertTrue(self.cache.is_cacheable('chain_getBlockHash', [5]))
+
+        self.assertFalse(self.cache.is_cacheable('state_getStorageAt', ['0x00']))
+        self.assertFalse(self.cache.is_cacheable('chain_getBlockHash', []))
+        self.assertFalse(self.cache.is_cacheable('chain_getBlockHash', ['0x05']))
+        self.assertFalse(self.cache.is_cacheable('chain_getFinalizedHead', []))
+
+    def test_null_results(self):
+        self.assertTrue(self.cache.is_cacheable_response('state_getStorageAt', {'result': None}))
+        self.assertTrue(self.cache.is_cacheable_response('state_getStorage', {'result': None}))
+
+        # Unknown blocks and block numbers beyond the chain head
+        self.assertFalse(self.cache.is_cacheable_response('chain_getBlock', {'result': None}))
+        self.assertFalse(self.cache.is_cacheable_response('chain_getBlockHash', {'result': None}))
+        self.assertFalse(self.cache.is_cacheable_response('state_getStorageAt', {'error': {'message': 'Error'}}))
+
+    def test_get_set(self):
+        self.assertIsNone(self.cache.get('chain_getBlock', [BLOCK_HASH]))
+
+        self.cache.set('chain_getBlock', [BLOCK_HASH], {'result': {'block': {}}})
+
+        self.assertEqual({'result': {'block': {}}}, self.cache.get('chain_getBlock', [BLOCK_HASH]))
+        self.assertIsNone(self.cache.get('chain_getBlock', ['0x' + '02' * 32]))
+        self.assertEqual(1, self.cache.stats()['hits'])
+        self.assertEqual(2, self.cache.stats()['misses'])
+
+    def test_namespace(self):
+        backend = MemoryCacheBackend()
+        RPCResponseCache([backend], namespace='kusama:').set('chain_getBlock', [BLOCK_HASH], {'result': 1})
+
+        self.assertIsNone(RPCResponseCache([backend], namespace='polkadot:').get('chain_getBlock', [BLOCK_HASH]))
+
+    def test_refill_earlier_backends(self):
+        memory = MemoryCacheBackend()
+        redis = RedisCacheBackend(connection=FakeRedis())
+
+        with tempfile.TemporaryDirectory() as path:
+            disk = DiskCacheBackend(path)
+            RPCResponseCache([disk]).set('chain_getBlock', [BLOCK_HASH], {'result': 1})
+
+            cache = RPCResponseCache([memory, redis, disk])
+            self.assertEqual({'result': 1}, cache.get('chain_getBlock', [BLOCK_HASH]))
+
+        key = cache.get_key('chain_getBlock', [BLOCK_HASH])
+        self.assertEqual(b'{"result":1}', memory.get(key))
+        self.assertEqual(b'{"result":1}', redis.get(key))
+
+    def test_refill_stops_at_hit(self):
+        memory = MemoryCacheBackend()
+        redis = RedisCacheBackend(connection=FakeRedis())
+        disk = MagicMock()
+
+        RPCResponseCache([redis]).set('chain_getBlock', [BLOCK_HASH], {'result': 1})
+        RPCResponseCache([memory, redis, disk]).get('chain_getBlock', [BLOCK_HASH])
+
+        self.assertEqual(1, len(memory))
+        disk.get.assert_not_called()
+        disk.set.assert_not_called()
+
+    def test_finality(self):
+        self.assertFalse(self.cache.is_finalized_block_number(5))
+        self.assertTrue(self.cache.requires_finality_refresh(5))
+
+        self.cache.update_finalized_block_number(10)
+
+        self.assertTrue(self.cache.is_finalized_block_number(10))
+        self.assertFalse(self.cache.is_finalized_block_number(11))
+        self.assertFalse(self.cache.requires_finality_refresh(10))
+        # Refreshed at most once per finality_refresh_interval
+        self.assertFalse(self.cache.requires_finality_refresh(11))
+
+        with patch('substrateinterface.utils.caching.time.monotonic', return_value=10 ** 9):
+            self.assertTrue(self.cache.requires_finality_refresh(11))
+
+        # Finalized block number never decreases
+        self.cache.update_finalized_block_number(8)
+        self.assertTrue(self.cache.is_finalized_block_number(10))
+
+
+class TestMemoryCacheBackend(unittest.TestCase):
+
+    def test_byte_budget(self):
+        backend = MemoryCacheBackend(max_bytes=10)
+
+        backend.set('a', b'1234')
+        backend.set('b', b'1234')
+        self.assertEqual(8, backend.size)
+
+        backend.set('c', b'1234')
+
+        self.assertEqual(8, backend.size)
+        self.assertIsNone(backend.get('a'))
+        self.assertEqual(b'1234', backend.get('c'))
+
+    def test_evicts_least_recently_used(self):
+        backend = MemoryCacheBackend(max_bytes=10)
+
+        backend.set('a', b'1234')
+        backend.set('b', b'1234')
+        backend.get('a')
+        backend.set('c', b'1234')
+
+        self.assertEqual(b'1234', backend.get('a'))
+        self.assertIsNone(backend.get('b'))
+
+    def test_replace_value(self):
+        backend = MemoryCacheBackend(max_bytes=10)
+
+        backend.set('a', b'1234')
+        backend.set('a', b'12')
+
+        self.assertEqual(2, backend.size)
+        self.assertEqual(1, len(backend))
+
+    def test_value_larger_than_budget(self):
+        backend = MemoryCacheBackend(max_bytes=10)
+        backend.set('a', b'1234')
+        backend.set('b', b'12345678901')
+
+        self.assertIsNone(backend.get('b'))
+        self.assertEqual(b'1234', backend.get('a'))
+
+    def test_clear(self):
+        backend = MemoryCacheBackend()
+        backend.set('a', b'1234')
+        backend.clear()
+
+        self.assertEqual(0, backend.size)
+        self.assertIsNone(backend.get('a'))
+
+
+class TestDiskCacheBackend(unittest.TestCase):
+
+    def test_get_set(self):
+        with tempfile.TemporaryDirectory() as path:
+            backend = DiskCacheBackend(path)
+            self.assertIsNone(backend.get('a'))
+
+            backend.set('a', b'1234')
+            self.assertEqual(b'1234', DiskCacheBackend(path).get('a'))
+
+
+class TestCachedRPCRequests(unittest.TestCase):
+
+    url = 'http://node/'
+
+    def setUp(self):
+        self.mocker = requests_mock.Mocker()
+        self.mocker.start()
+        self.addCleanup(self.mocker.stop)
+        self.mocker.post(self.url, json=self.respond)
+
+        self.rpc_cache = RPCResponseCache([MemoryCacheBackend()])
+        self.substrate = SubstrateInterface(
+            url=self.url, type_registry_preset='kusama', auto_discover=False, rpc_cache=self.rpc_cache
+        )
+
+    @staticmethod
+    def respond(request, context):
+        payload = json.loads(request.body)
+        method, params = payload['method'], payload['params']
+
+        if method == 'state_getStorageAt':
+            result = '0x01' if params[0] == '0x01' else None
+        elif method == 'chain_getBlock':
+            result = {'block': {}} if params and params[0] == BLOCK_HASH else None
+        elif method == 'chain_getFinalizedHead':
+            result = FINALIZED_BLOCK_HASH
+        elif method == 'chain_getHeader':
+            result = {'number': hex(10)}
+        elif method == 'chain_getBlockHash':
+            result = '0x{:064x}'.format(params[0])
+        else:
+            result = None
+
+        return {'jsonrpc': '2.0', 'id': payload['id'], 'result': result}
+
+    def count_requests(self, method):
+        return len([
+            request for request in self.mocker.request_history if json.loads(request.body)['method'] == method
+        ])
+
+    def test_pinned_request_cached(self):
+        for _ in range(3):
+            self.assertEqual('0x01', self.substrate.rpc_request('state_getStorageAt', ['0x01', BLOCK_HASH])['result'])
+            self.assertEqual({'block': {}}, self.substrate.rpc_request('chain_getBlock', [BLOCK_HASH])['result'])
+
+        self.assertEqual(1, self.count_requests('state_getStorageAt'))
+        self.assertEqual(1, self.count_requests('chain_getBlock'))
+
+    def test_head_request_not_cached(self):
+        for _ in range(3):
+            self.substrate.rpc_request('state_getStorageAt', ['0x01'])
+            self.substrate.rpc_request('chain_getBlock', [])
+
+        self.assertEqual(3, self.count_requests('state_getStorageAt'))
+        self.assertEqual(3, self.count_requests('chain_getBlock'))
+
+    def test_null_results(self):
+        unknown_block_hash = '0x' + '02' * 32
+
+        for _ in range(3):
+            self.assertIsNone(self.substrate.rpc_request('state_getStorageAt', ['0x02', BLOCK_HASH])['result'])
+            self.assertIsNone(self.substrate.rpc_request('chain_getBlock', [unknown_block_hash])['result'])
+
+        self.assertEqual(1, self.count_requests('state_getStorageAt'))
+        self.assertEqual(3, self.count_requests('chain_getBlock'))
+
+    def test_block_hash_cached_when_finalized(self):
+        for _ in range(3):
+            self.substrate.rpc_request('chain_getBlockHash', [10])
+            self.substrate.rpc_request('chain_getBlockHash', [11])
+
+        self.assertEqual(1 + 3, self.count_requests('chain_getBlockHash'))
+        # The finalized head is retrieved once per finality_refresh_interval
+        self.assertEqual(1, self.count_requests('chain_getFinalizedHead'))
+        self.assertEqual(10, self.rpc_cache.finalized_block_number)
+
+
+if __name__ == '__main__':
+    unittest.main()
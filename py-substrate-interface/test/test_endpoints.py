@@ -0,0 +1,270 @@
+# Python Substrate Interface Library
+#
+# Copyright 2018-2021 Stichting Polkascan (Polkascan Foundation).
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import threading
+import time
+import unittest
+
+import requests
+import requests_mock
+
+from substrateinterface import SubstrateInterface
+from substrateinterface.base import StoragePagePrefetcher
+from substrateinterface.exceptions import SubstrateRequestException
+from substrateinterface.utils.endpoints import RPCEndpointPool
+
+BLOCK_HASH = '0x' + '01' * 32
+
+
+class TestRPCEndpointPool(unittest.TestCase):
+
+    def setUp(self):
+        self.pool = RPCEndpointPool(['http://node-1', 'http://node-2', 'http://node-3'], max_consecutive_errors=2)
+        self.node_1, self.node_2, self.node_3 = self.pool.endpoints
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            RPCEndpointPool([])
+
+        with self.assertRaises(ValueError):
+            RPCEndpointPool(['http://node-1'], strategy='random')
+
+    def test_round_robin(self):
+        selected = [self.pool.select() for _ in range(6)]
+        self.assertEqual([self.node_1, self.node_2, self.node_3] * 2, selected)
+
+    def test_least_outstanding(self):
+        pool = RPCEndpointPool(['http://node-1', 'http://node-2'], strategy='least_outstanding')
+        node_1, node_2 = pool.endpoints
+        node_1.latency = 0.2
+        node_2.latency = 0.1
+
+        self.assertEqual(node_2, pool.select())
+
+        pool.start_request(node_2)
+        self.assertEqual(node_1, pool.select())
+
+    def test_not_pinned_selects_best_block(self):
+        self.pool.update_best_block_numbers({self.node_1: 100, self.node_2: 102, self.node_3: 101})
+
+        self.assertEqual(self.node_2, self.pool.select(pinned=False))
+        self.assertEqual(self.node_3, self.pool.select(pinned=False, exclude=[self.node_2]))
+
+    def test_exclude(self):
+        self.assertEqual(self.node_3, self.pool.select(exclude=[self.node_1, self.node_2]))
+        self.assertIsNone(self.pool.select(exclude=self.pool.endpoints))
+
+    def test_ejection(self):
+        self.pool.finish_request(self.node_1, self.pool.start_request(self.node_1), error=True)
+        self.assertFalse(self.pool.stats()[0]['ejected'])
+
+        self.pool.finish_request(self.node_1, self.pool.start_request(self.node_1), error=True)
+
+        self.assertTrue(self.pool.stats()[0]['ejected'])
+        self.assertEqual(2, self.pool.stats()[0]['errors'])
+        self.assertNotIn(self.node_1, [self.pool.select() for _ in range(4)])
+
+    def test_successful_request_restores_endpoint(self):
+        for _ in range(2):
+            self.pool.finish_request(self.node_1, self.pool.start_request(self.node_1), error=True)
+
+        self.pool.finish_request(self.node_1, self.pool.start_request(self.node_1))
+
+        self.assertTrue(self.pool.stats()[0]['healthy'])
+        self.assertEqual(0, self.node_1.consecutive_errors)
+
+    def test_all_unhealthy_selects_first_ejected(self):
+        for endpoint in [self.node_2, self.node_1, self.node_3]:
+            for _ in range(2):
+                self.pool.finish_request(endpoint, self.pool.start_request(endpoint), error=True)
+
+        self.assertEqual(self.node_2, self.pool.select())
+
+    def test_lagging_endpoint(self):
+        self.pool.update_best_block_numbers({self.node_1: 100, self.node_2: 94, self.node_3: 95})
+
+        self.assertTrue(self.node_2.lagging)
+        self.assertFalse(self.node_3.lagging)
+        self.assertNotIn(self.node_2, [self.pool.select() for _ in range(4)])
+
+        # Unreachable endpoints keep their last best block
+        self.pool.update_best_block_numbers({self.node_2: 100})
+        self.assertFalse(self.node_2.lagging)
+
+    def test_requires_health_check(self):
+        self.assertTrue(self.pool.requires_health_check())
+        self.pool.update_best_block_numbers({})
+        self.assertFalse(self.pool.requires_health_check())
+
+
+class TestBalancedRequests(unittest.TestCase):
+
+    urls = ['http://node-1/', 'http://node-2/', 'http://node-3/']
+
+    def setUp(self):
+        self.best_block_numbers = {url: 100 for url in self.urls}
+        self.storage = {url: {BLOCK_HASH: '0x01'} for url in self.urls}
+
+        self.active_requests = 0
+        self.max_active_requests = 0
+
+        self.mocker = requests_mock.Mocker()
+        self.mocker.start()
+        self.addCleanup(self.mocker.stop)
+
+        for url in self.urls:
+            self.mocker.post(url, json=self.create_callback(url))
+
+        self.substrate = SubstrateInterface(
+            url=self.urls, type_registry_preset='kusama', auto_discover=False,
+            endpoint_options={'request_timeout': 7, 'health_check_timeout': 3}
+        )
+        self.node_1, self.node_2, self.node_3 = self.substrate.endpoint_pool.endpoints
+
+    def create_callback(self, url):
+        def callback(request, context):
+            payload = json.loads(request.body)
+
+            self.active_requests += 1
+            self.max_active_requests = max(self.active_requests, self.max_active_requests)
+            time.sleep(0.001)
+            self.active_requests -= 1
+
+            if payload['method'] == 'chain_getHeader':
+                result = {'number': hex(self.best_block_numbers[url])}
+            elif payload['method'] == 'state_getStorageAt':
+                result = self.storage[url].get(payload['params'][1])
+            elif payload['method'] == 'state_getKeysPaged':
+                result = ['0x0a', '0x0b'] if payload['params'][2] is None else []
+            elif payload['method'] == 'state_queryStorageAt':
+                result = [{'block': BLOCK_HASH, 'changes': [[key, '0x01'] for key in payload['params'][0]]}]
+            else:
+                result = None
+
+            return {'jsonrpc': '2.0', 'id': payload['id'], 'result': result}
+
+        return callback
+
+    def requests_to(self, url, method):
+        return [
+            request for request in self.mocker.request_history
+            if request.url == url and json.loads(request.body)['method'] == method
+        ]
+
+    def test_health_check(self):
+        self.best_block_numbers['http://node-2/'] = 90
+
+        self.substrate.rpc_request('state_getStorageAt', ['0x00', BLOCK_HASH])
+
+        self.assertEqual([100, 90, 100], [
+            endpoint.best_block_number for endpoint in self.substrate.endpoint_pool.endpoints
+        ])
+        self.assertTrue(self.node_2.lagging)
+        self.assertEqual([3, 3, 3], [
+            request.timeout for url in self.urls for request in self.requests_to(url, 'chain_getHeader')
+        ])
+
+    def test_balanced_over_endpoints(self):
+        for _ in range(6):
+            self.assertEqual('0x01', self.substrate.rpc_request('state_getStorageAt', ['0x00', BLOCK_HASH])['result'])
+
+        for url in self.urls:
+            storage_requests = self.requests_to(url, 'state_getStorageAt')
+            self.assertEqual(2, len(storage_requests))
+            self.assertEqual(7, storage_requests[0].timeout)
+
+    def test_failover(self):
+        self.mocker.post('http://node-1/', status_code=500)
+        self.mocker.post('http://node-2/', exc=requests.exceptions.ConnectTimeout)
+
+        for _ in range(3):
+            self.assertEqual('0x01', self.substrate.rpc_request('state_getStorageAt', ['0x00', BLOCK_HASH])['result'])
+
+        self.assertEqual(3, len(self.requests_to('http://node-3/', 'state_getStorageAt')))
+        self.assertGreater(self.node_1.errors, 0)
+        self.assertGreater(self.node_2.errors, 0)
+
+    def test_all_endpoints_fail(self):
+        self.substrate.check_endpoint_health()
+
+        for url in self.urls:
+            self.mocker.post(url, status_code=502)
+
+        with self.assertRaises(SubstrateRequestException):
+            self.substrate.rpc_request('state_getStorageAt', ['0x00', BLOCK_HASH])
+
+    def test_invalid_json_fails_over(self):
+        self.substrate.check_endpoint_health()
+        self.mocker.post('http://node-1/', text='<html>Bad gateway</html>')
+
+        for _ in range(3):
+            self.assertEqual('0x01', self.substrate.rpc_request('state_getStorageAt', ['0x00', BLOCK_HASH])['result'])
+
+        self.assertGreater(self.node_1.errors, 0)
+
+    def test_unknown_block_retried_on_best_endpoint(self):
+        # Within max_block_lag, but node-1 and node-2 didn't import the block yet
+        self.best_block_numbers.update({'http://node-1/': 98, 'http://node-2/': 99})
+        new_block_hash = '0x' + '02' * 32
+        self.storage['http://node-3/'][new_block_hash] = '0x02'
+
+        for _ in range(3):
+            response = self.substrate.rpc_request('state_getStorageAt', ['0x00', new_block_hash])
+            self.assertEqual('0x02', response['result'])
+
+        # Storage that is empty on the best endpoint costs at most one retry
+        self.assertIsNone(self.substrate.rpc_request('state_getStorageAt', ['0x01', new_block_hash + '00'])['result'])
+        self.assertLessEqual(len(self.mocker.request_history), 3 + 3 * 2 + 2)
+
+    def test_unpinned_request_to_best_endpoint(self):
+        self.best_block_numbers['http://node-2/'] = 101
+
+        for _ in range(3):
+            self.substrate.rpc_request('chain_getFinalizedHead', [])
+
+        self.assertEqual(3, len(self.requests_to('http://node-2/', 'chain_getFinalizedHead')))
+
+    def test_requests_serialized_between_threads(self):
+        def request_storage():
+            for _ in range(20):
+                self.substrate.rpc_request('state_getStorageAt', ['0x00', BLOCK_HASH])
+
+        threads = [threading.Thread(target=request_storage) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(1, self.max_active_requests)
+        self.assertEqual(83, sum(endpoint.requests for endpoint in self.substrate.endpoint_pool.endpoints))
+        self.assertEqual(0, sum(endpoint.outstanding for endpoint in self.substrate.endpoint_pool.endpoints))
+
+    def test_prefetcher_uses_endpoint_pool(self):
+        pages = StoragePagePrefetcher(
+            self.urls[0], prefix='0x00', start_key=None, page_size=2, block_hash=BLOCK_HASH,
+            rpc_request=self.substrate.rpc_request
+        )
+
+        self.assertEqual([[['0x0a', '0x01'], ['0x0b', '0x01']]], list(pages))
+        self.assertEqual(
+            len(self.mocker.request_history),
+            sum(endpoint.requests for endpoint in self.substrate.endpoint_pool.endpoints)
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -151,6 +151,44 @@ class QueryMapTestCase(unittest.TestCase):
 
         self.assertEqual(4, result_count)
 
+    def test_query_map_iter_result_exhausted(self):
+        records = list(self.kusama_substrate.query_map_iter(
+            module='Claims', storage_function='Claims', prefetch_pages=0,
+            block_hash='0x2e8047826d028f5cc092f5e694860efbd4f74ee1535424cdf3626a175867db62'
+        ))
+
+        self.assertEqual(4, len(records))
+        self.assertEqual(45880000000000, records[0][1].value)
+        self.assertEqual('0x00000a9c44f24e314127af63ae55b864a28d7aee', records[0][0].value)
+        self.assertEqual('0x00010b75619f666c3f172f0d1c7fa86d02adcf9c', records[3][0].value)
+
+    def test_query_map_iter_prefetch(self):
+        block_hash = "0x587a1e69871c09f2408d724ceebbe16edc4a69139b5df9786e1057c4d041af73"
+
+        result = self.kusama_substrate.query_map('System', 'Account', page_size=2, max_results=5, block_hash=block_hash)
+
+        records = list(self.kusama_substrate.query_map_iter(
+            'System', 'Account', page_size=2, max_results=5, prefetch_pages=2, block_hash=block_hash
+        ))
+
+        self.assertEqual(5, len(records))
+        self.assertEqual(
+            [[key.value, value.value] for key, value in result],
+            [[key.value, value.value] for key, value in records]
+        )
+
+    def test_query_map_iter_close(self):
+        result = self.kusama_substrate.query_map_iter(
+            'System', 'Account', page_size=2, prefetch_pages=1,
+            block_hash="0x587a1e69871c09f2408d724ceebbe16edc4a69139b5df9786e1057c4d041af73"
+        )
+
+        record = next(result)
+        self.assertEqual(type(record[0]), GenericAccountId)
+
+        # Closing the generator stops the prefetch thread
+        result.close()
+
     def test_non_existing_query_map(self):
         with self.assertRaises(ValueError) as cm:
             self.kusama_substrate.query_map("Unknown", "StorageFunction")